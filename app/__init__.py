@@ -1,35 +1,57 @@
-import os
 from flask import Flask, render_template
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from dotenv import load_dotenv
+from config import Config
+from .engine import engine_options, configure_engines
+from .routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 migrate = Migrate()
 
-def create_app():
+def create_app(config_overrides=None):
     load_dotenv()
     app = Flask(__name__)
 
-    # Config
-    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///ticket_system.db')
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Config: config.Config (environment / .env), then any overrides
+    app.config.from_object(Config)
+    app.config.update(config_overrides or {})
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+    from . import routing
+    routing.configure(app, engine_options)
 
     # Extensions
     db.init_app(app)
     login_manager.init_app(app)
     migrate.init_app(app, db)
+    with app.app_context():
+        configure_engines(app, db.engines.values())
     login_manager.login_view = 'auth.login'
 
     # Models
-    from .models import User
+    from .search import register_search_index
+    register_search_index()
+
+    # {% cache %} fragments in templates
+    from . import fragments
+    fragments.init_app(app)
+
+    # Live dashboard updates (CHANGEFEED_PORT)
+    from . import changefeed
+    changefeed.init_app(app)
+
+    # Request instrumentation (PERF_ENABLED); installed before the blueprints' hooks
+    from . import perf
+    perf.init_app(app)
+
+    from .auth.principal import load_principal
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        # cached principal; the User row is only loaded if a handler needs it
+        return load_principal(user_id)
 
     # Blueprints
     from .auth.routes import auth_bp
@@ -38,12 +60,14 @@ def create_app():
     from .comments.routes import comments_bp
     from .ratings.routes import ratings_bp
     from .reports.routes import reports_bp
+    from .api.routes import api_bp
     app.register_blueprint(auth_bp)
     app.register_blueprint(tickets_bp)
     app.register_blueprint(dashboard_bp)
     app.register_blueprint(comments_bp)
     app.register_blueprint(ratings_bp)
     app.register_blueprint(reports_bp)
+    app.register_blueprint(api_bp)
 
     # home route
     @app.route('/')
@@ -55,4 +79,9 @@ def create_app():
     def forbidden(_e):
         return render_template('errors/unauthorized.html'), 403
 
+    @app.errorhandler(503)
+    def unavailable(e):
+        headers = [h for h in e.get_headers() if h[0] == 'Retry-After']
+        return render_template('errors/unavailable.html', message=e.description), 503, headers
+
     return app
@@ -0,0 +1,107 @@
+"""Sparse fieldsets for the JSON API.
+
+Clients pick the fields they need with ``?fields=ticket_id,title,status``.
+Only the columns behind those fields are SELECTed (``load_only``); status and
+category names come from the reference-data cache and the requester /
+technician names from one batched user query per response, so no field costs
+a join or a query per ticket.
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
+from .. import db, refdata
+from ..models import Ticket, User
+
+# field -> the Ticket column it needs
+TICKET_FIELDS = {
+    'ticket_id': 'ticket_id',
+    'title': 'title',
+    'description': 'description',
+    'location': 'location',
+    'category_id': 'category_id',
+    'category': 'category_id',
+    'status_id': 'status_id',
+    'status': 'status_id',
+    'requester_id': 'requester_id',
+    'requester': 'requester_id',
+    'technician_id': 'technician_id',
+    'technician': 'technician_id',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+LIST_FIELDS = ('ticket_id', 'title', 'location', 'status', 'category', 'requester_id', 'technician_id',
+               'created_at', 'updated_at')
+# detail-only extras, loaded with their own query
+DETAIL_EXTRAS = ('comments', 'rating')
+DETAIL_FIELDS = tuple(TICKET_FIELDS) + DETAIL_EXTRAS
+
+USER_FIELDS = ('requester', 'technician')
+
+
+class FieldError(ValueError):
+    pass
+
+
+def parse_fields(raw, default, allowed=TICKET_FIELDS):
+    """The requested field names, in order, or ``default`` when ``raw`` is empty."""
+    if not raw:
+        return list(default)
+    fields = []
+    for name in raw.split(','):
+        name = name.strip()
+        if not name or name in fields:
+            continue
+        if name not in allowed:
+            raise FieldError(f"unknown field '{name}'; valid fields: {', '.join(allowed)}")
+        fields.append(name)
+    return fields or list(default)
+
+
+def load_fields(fields, model=Ticket):
+    """``load_only`` option for the ticket columns ``fields`` need (``model``: ``Ticket`` or ``ArchivedTicket``)."""
+    columns = {TICKET_FIELDS[f] for f in fields if f in TICKET_FIELDS}
+    # the id is always needed to key comments, users and cursors
+    columns.add('ticket_id')
+    return load_only(*[getattr(model, c) for c in sorted(columns)])
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def user_map(tickets, fields):
+    """``{user_id: {...}}`` for the requesters/technicians ``fields`` ask for, in one query."""
+    wanted = [f for f in USER_FIELDS if f in fields]
+    ids = {getattr(t, f'{f}_id') for t in tickets for f in wanted} - {None}
+    if not ids:
+        return {}
+    rows = db.session.execute(select(User.user_id, User.first_name, User.last_name).where(User.user_id.in_(ids)))
+    return {row.user_id: dict(user_id=row.user_id, first_name=row.first_name, last_name=row.last_name)
+            for row in rows}
+
+
+def ticket_dict(ticket, fields, users=None):
+    out = {}
+    for field in fields:
+        if field == 'status':
+            out[field] = refdata.status_name(ticket.status_id)
+        elif field == 'category':
+            category = refdata.category(ticket.category_id) if ticket.category_id else None
+            out[field] = category.category_name if category else None
+        elif field in USER_FIELDS:
+            user_id = getattr(ticket, f'{field}_id')
+            out[field] = (users or {}).get(user_id) if user_id else None
+        elif field in TICKET_FIELDS:
+            value = getattr(ticket, field)
+            out[field] = _iso(value) if field in ('created_at', 'updated_at') else value
+    return out
+
+
+def comment_dict(row):
+    return dict(comment_id=row.comment_id, user_id=row.user_id, author=f'{row.first_name} {row.last_name}',
+                comment_text=row.comment_text, created_at=_iso(row.created_at))
+
+
+def rating_dict(rating):
+    if rating is None:
+        return None
+    return dict(rating_value=rating.rating_value, feedback=rating.feedback, created_at=_iso(rating.created_at))
@@ -0,0 +1,232 @@
+"""Versioned JSON API (``/api/v1``).
+
+Uses the same login session as the HTML pages and the same access rules:
+requesters see their own tickets, technicians the ones assigned to them and
+managers everything. Errors are JSON ``{"error": ...}`` with the HTTP status.
+"""
+from flask import Blueprint, current_app, jsonify, request, url_for
+from flask_login import current_user
+from sqlalchemy import select
+from werkzeug.exceptions import HTTPException
+from ..models import Ticket, Comment, Rating, User, ArchivedTicket, ArchivedComment, ArchivedRating
+from ..queries import TicketFilter
+from ..tickets import lifecycle, assignment
+from ..utils import keyset_paginate, paginate, is_manager, is_technician
+from .. import db, refdata
+from .fields import (FieldError, TICKET_FIELDS, LIST_FIELDS, DETAIL_FIELDS, parse_fields, load_fields, user_map,
+                     ticket_dict, comment_dict, rating_dict)
+
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_MAX_PAGE_SIZE = 200
+DEFAULT_MAX_BATCH = 500
+
+# live tables first, then the archive (see tickets/archive.py)
+DETAIL_MODELS = ((Ticket, Comment, Rating), (ArchivedTicket, ArchivedComment, ArchivedRating))
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400, **extra):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+@api_bp.errorhandler(ApiError)
+def api_error(e):
+    return jsonify(error=str(e), **e.extra), e.status
+
+
+@api_bp.errorhandler(HTTPException)
+def http_error(e):
+    return jsonify(error=e.description), e.code
+
+
+@api_bp.before_request
+def require_login():
+    if not current_user.is_authenticated:
+        raise ApiError('authentication required', 401)
+
+
+def _visible(query):
+    # same scoping as the dashboards
+    if is_manager():
+        return query
+    if is_technician():
+        return query.filter(Ticket.technician_id == current_user.user_id)
+    return query.filter(Ticket.requester_id == current_user.user_id)
+
+
+def _can_view(ticket):
+    return is_manager() or current_user.user_id in (ticket.requester_id, ticket.technician_id)
+
+
+def _fields(default, allowed=TICKET_FIELDS):
+    try:
+        return parse_fields(request.args.get('fields'), default, allowed)
+    except FieldError as e:
+        raise ApiError(str(e))
+
+
+def _json_items(key):
+    body = request.get_json(silent=True)
+    items = body.get(key) if isinstance(body, dict) else None
+    if not isinstance(items, list) or not items:
+        raise ApiError(f'expected a JSON object with a non-empty "{key}" list')
+    limit = current_app.config.get('API_MAX_BATCH', DEFAULT_MAX_BATCH)
+    if len(items) > limit:
+        raise ApiError(f'at most {limit} {key} per request', 413)
+    return items
+
+
+def _text(item, name, errors, max_length=None):
+    value = item.get(name) if isinstance(item, dict) else None
+    if not isinstance(value, str) or not value.strip():
+        errors.append(f'{name} is required')
+        return None
+    if max_length and len(value) > max_length:
+        errors.append(f'{name} is longer than {max_length} characters')
+    return value
+
+
+@api_bp.route('/tickets')
+def list_tickets():
+    """Tickets visible to the user, filtered and sorted like the dashboards.
+
+    Args: the dashboard filters (status, unassigned, q, category_id, start,
+    end, sort), ``fields``, ``limit``, ``cursor`` (or ``page`` for
+    sort=relevance) and ``total=1`` to include the match count.
+    """
+    fields = _fields(LIST_FIELDS)
+    limit = max(1, min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+                       current_app.config.get('API_MAX_PAGE_SIZE', DEFAULT_MAX_PAGE_SIZE)))
+    filters = TicketFilter(request.args)
+    query, sort_keys = filters.apply(_visible(Ticket.query.options(load_fields(fields))))
+    if sort_keys is None:
+        pagination = paginate(query, request.args.get('page', 1, type=int), limit)
+    else:
+        count_key = ('api', current_user.user_id, filters.key(include_sort=False))
+        pagination = keyset_paginate(query, sort_keys, request.args.get('cursor'), limit,
+                                     with_total=request.args.get('total', type=int) == 1, count_key=count_key)
+    tickets = pagination['items']
+    users = user_map(tickets, fields)
+    args = {k: v for k, v in request.args.items() if k not in ('cursor', 'page')}
+    links = {}
+    if pagination['next_cursor']:
+        links['next'] = url_for('api.list_tickets', cursor=pagination['next_cursor'], **args)
+    if pagination['prev_cursor']:
+        links['prev'] = url_for('api.list_tickets', cursor=pagination['prev_cursor'], **args)
+    if pagination['page']:
+        if pagination['has_next']:
+            links['next'] = url_for('api.list_tickets', page=pagination['page'] + 1, **args)
+        if pagination['has_prev']:
+            links['prev'] = url_for('api.list_tickets', page=pagination['page'] - 1, **args)
+    return jsonify(tickets=[ticket_dict(t, fields, users) for t in tickets], total=pagination['total'],
+                   links=links)
+
+
+@api_bp.route('/tickets/<int:ticket_id>')
+def get_ticket(ticket_id):
+    """One ticket with its comments (oldest first) and rating; ``fields`` applies here too.
+
+    Falls back to the archive like the detail page; ``archived`` tells which.
+    """
+    fields = _fields(DETAIL_FIELDS, DETAIL_FIELDS)
+    for archived, (ticket_model, comment_model, rating_model) in enumerate(DETAIL_MODELS):
+        ticket = (ticket_model.query
+                  .options(load_fields(fields + ['requester_id', 'technician_id'], ticket_model))
+                  .filter(ticket_model.ticket_id == ticket_id).first())
+        if ticket is not None:
+            break
+    else:
+        raise ApiError('ticket not found', 404)
+    if not _can_view(ticket):
+        raise ApiError('not authorized to view this ticket', 403)
+    out = ticket_dict(ticket, fields, user_map([ticket], fields))
+    if 'comments' in fields:
+        rows = db.session.execute(
+            select(comment_model.comment_id, comment_model.user_id, comment_model.comment_text,
+                   comment_model.created_at, User.first_name, User.last_name)
+            .join(User, comment_model.user_id == User.user_id)
+            .where(comment_model.ticket_id == ticket_id)
+            .order_by(comment_model.created_at, comment_model.comment_id))
+        out['comments'] = [comment_dict(row) for row in rows]
+    if 'rating' in fields:
+        out['rating'] = rating_dict(db.session.scalar(select(rating_model).where(rating_model.ticket_id == ticket_id)))
+    return jsonify(ticket=out, archived=bool(archived))
+
+
+@api_bp.route('/tickets/batch', methods=['POST'])
+def create_tickets():
+    """Create every ticket in ``{"tickets": [{title, description, location, category_id}, ...]}`` or none.
+
+    Invalid items are reported as ``errors: [{index, errors}]`` with status 422.
+    """
+    items = _json_items('tickets')
+    pending_id = refdata.status_id('Pending')
+    tickets, problems = [], []
+    for index, item in enumerate(items):
+        errors = []
+        title = _text(item, 'title', errors, 255)
+        description = _text(item, 'description', errors)
+        location = _text(item, 'location', errors, 255)
+        category_id = item.get('category_id') if isinstance(item, dict) else None
+        if not isinstance(category_id, int) or isinstance(category_id, bool) or not refdata.category(category_id):
+            errors.append('category_id must be an existing category id')
+        if errors:
+            problems.append(dict(index=index, errors=errors))
+            continue
+        tickets.append(Ticket(title=title, description=description, location=location, category_id=category_id,
+                              requester_id=current_user.user_id, status_id=pending_id))
+    if problems:
+        raise ApiError('invalid tickets, nothing was created', 422, errors=problems)
+
+    db.session.add_all(tickets)
+    db.session.flush()
+    lifecycle.tickets_created(tickets)
+    for ticket in tickets:
+        assignment.assign_new(ticket)
+    # serialized before the commit expires the objects (which would reload each one)
+    fields = _fields(LIST_FIELDS)
+    users = user_map(tickets, fields)
+    created = [ticket_dict(t, fields, users) for t in tickets]
+    db.session.commit()
+    return jsonify(tickets=created), 201
+
+
+@api_bp.route('/comments/batch', methods=['POST'])
+def create_comments():
+    """Add every comment in ``{"comments": [{ticket_id, comment_text}, ...]}`` or none."""
+    items = _json_items('comments')
+    ticket_ids = {item.get('ticket_id') for item in items if isinstance(item, dict)}
+    ticket_ids = {t for t in ticket_ids if isinstance(t, int) and not isinstance(t, bool)}
+    # one query for every referenced ticket's access columns
+    tickets = {row.ticket_id: row for row in db.session.execute(
+        select(Ticket.ticket_id, Ticket.requester_id, Ticket.technician_id).where(Ticket.ticket_id.in_(ticket_ids))
+    )} if ticket_ids else {}
+    comments, problems = [], []
+    for index, item in enumerate(items):
+        errors = []
+        text = _text(item, 'comment_text', errors)
+        ticket = tickets.get(item.get('ticket_id')) if isinstance(item, dict) else None
+        if ticket is None:
+            errors.append('ticket_id must be an existing ticket id')
+        elif not _can_view(ticket):
+            errors.append('not authorized to comment on this ticket')
+        if errors:
+            problems.append(dict(index=index, errors=errors))
+            continue
+        comments.append(Comment(ticket_id=ticket.ticket_id, user_id=current_user.user_id, comment_text=text))
+    if problems:
+        raise ApiError('invalid comments, nothing was created', 422, errors=problems)
+
+    db.session.add_all(comments)
+    db.session.flush()
+    for ticket_id in {c.ticket_id for c in comments}:
+        lifecycle.comment_added(tickets[ticket_id])
+    author = f'{current_user.first_name} {current_user.last_name}'
+    created = [dict(comment_id=c.comment_id, ticket_id=c.ticket_id, user_id=c.user_id, author=author,
+                    comment_text=c.comment_text, created_at=c.created_at.isoformat()) for c in comments]
+    db.session.commit()
+    return jsonify(comments=created), 201
@@ -0,0 +1,100 @@
+"""Password hashing on a process pool.
+
+PBKDF2/scrypt are deliberately CPU-bound. Run inline they hold a WSGI worker
+(and the GIL around the Python parts) for the whole hash, so a login burst
+stalls every other page. With ``PASSWORD_HASH_WORKERS`` > 0 hashes are sent to
+a pool of that many processes and login throughput scales with the number of
+cores. ``PASSWORD_HASH_METHOD`` selects the werkzeug method; stored hashes made
+with other parameters are upgraded on the next successful login. If the pool
+is so backed up that a hash does not start and finish within
+``PASSWORD_HASH_TIMEOUT`` seconds, the request gets a 503 with ``Retry-After``.
+"""
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_TIMEOUT = 30
+RETRY_AFTER = 5
+
+_pool = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+_method_prefixes = {}
+
+
+def _executor(workers):
+    global _pool, _pool_size
+    if _pool is None or _pool_size != workers:
+        with _pool_lock:
+            if _pool is None or _pool_size != workers:
+                if _pool is not None:
+                    _pool.shutdown(wait=False)
+                # spawn: forking a multi-threaded WSGI server is not safe
+                _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+                _pool_size = workers
+    return _pool
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+atexit.register(shutdown)
+
+
+def _run(fn, *args):
+    workers = current_app.config.get('PASSWORD_HASH_WORKERS', 0)
+    if not workers:
+        return fn(*args)
+    timeout = current_app.config.get('PASSWORD_HASH_TIMEOUT', DEFAULT_TIMEOUT)
+    future = _executor(workers).submit(fn, *args)
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        # the pool is backed up: drop the hash if it has not started yet and
+        # turn the client away rather than adding more CPU work here
+        future.cancel()
+        raise ServiceUnavailable('Too many sign-ins at the moment, please try again shortly.',
+                                 retry_after=RETRY_AFTER)
+    except BrokenProcessPool:
+        # a worker died; start a fresh pool next time and hash inline now
+        shutdown()
+        return fn(*args)
+
+
+def _method():
+    return current_app.config.get('PASSWORD_HASH_METHOD') or None
+
+
+def hash_password(password):
+    method = _method()
+    if method:
+        return _run(generate_password_hash, password, method)
+    return _run(generate_password_hash, password)
+
+
+def verify_password(pwhash, password):
+    return _run(check_password_hash, pwhash, password)
+
+
+def _method_prefix(method):
+    # canonical "method:params" werkzeug writes for ``method``, e.g. "scrypt:32768:8:1"
+    prefix = _method_prefixes.get(method)
+    if prefix is None:
+        sample = generate_password_hash('', method) if method else generate_password_hash('')
+        prefix = _method_prefixes[method] = sample.split('$', 1)[0]
+    return prefix
+
+
+def needs_rehash(pwhash):
+    """True if ``pwhash`` was made with other parameters than the configured ones."""
+    return pwhash.split('$', 1)[0] != _method_prefix(_method())
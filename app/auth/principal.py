@@ -0,0 +1,107 @@
+"""Cached session principal for Flask-Login.
+
+``load_user`` runs on every authenticated request. Instead of loading the
+full ``User`` row each time, the loader keeps the few columns requests and
+templates actually read (id, email, role, names, active flag) in a bounded
+TTL/LRU cache and wraps them in a ``Principal``. Anything else falls through
+to the ORM object, which is loaded only then. Commits that modify a user evict
+that user's entry, but only in the process that made them: other worker
+processes keep serving the old role or active flag until the entry expires,
+so ``USER_CACHE_TTL`` is kept short (0 turns the cache off).
+"""
+from collections import namedtuple
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from .. import db
+from ..cache import TTLCache
+from ..models import User
+
+UserSnapshot = namedtuple('UserSnapshot', 'user_id email role first_name last_name is_active')
+
+DEFAULT_CACHE_SIZE = 4096
+DEFAULT_CACHE_TTL = 30
+
+
+class Principal(UserMixin):
+    """The logged-in user as seen by request handlers and templates."""
+
+    def __init__(self, snapshot):
+        self.__dict__['_snapshot'] = snapshot
+        self.__dict__['_user'] = None
+        self.__dict__.update(snapshot._asdict())
+
+    def get_id(self):
+        return str(self.user_id)
+
+    @property
+    def is_active(self):
+        return bool(self._snapshot.is_active)
+
+    @property
+    def user(self):
+        """The ``User`` ORM object, loaded on first use."""
+        if self._user is None:
+            self.__dict__['_user'] = db.session.get(User, self.user_id)
+        return self._user
+
+    def __getattr__(self, name):
+        # only reached for attributes that are not cached (password_hash, relationships, ...)
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+
+def _cache():
+    cache = current_app.extensions.get('user_principals')
+    if cache is None:
+        cache = current_app.extensions.setdefault('user_principals', TTLCache(
+            maxsize=current_app.config.get('USER_CACHE_SIZE', DEFAULT_CACHE_SIZE),
+            ttl=current_app.config.get('USER_CACHE_TTL', DEFAULT_CACHE_TTL)))
+    return cache
+
+
+def load_principal(user_id):
+    """Flask-Login user loader."""
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    cache = _cache()
+    snapshot = cache.get(user_id)
+    if snapshot is None:
+        row = db.session.execute(
+            select(User.user_id, User.email, User.role, User.first_name, User.last_name, User.is_active)
+            .where(User.user_id == user_id)
+        ).first()
+        if row is None:
+            return None
+        snapshot = UserSnapshot(*row)
+        if cache.ttl > 0:
+            cache.set(user_id, snapshot)
+    return Principal(snapshot)
+
+
+def invalidate(user_id):
+    if has_app_context():
+        _cache().pop(user_id)
+
+
+# Evict users written by a commit (role, active flag, names, deletion)
+@event.listens_for(Session, 'after_flush')
+def _note_user_writes(session, _flush_context):
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, User) and obj.user_id is not None:
+            session.info.setdefault('dirty_user_ids', set()).add(obj.user_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _evict_after_commit(session):
+    for user_id in session.info.pop('dirty_user_ids', ()):
+        invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_rolled_back_writes(session, _previous_transaction):
+    session.info.pop('dirty_user_ids', None)
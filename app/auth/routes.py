@@ -35,6 +35,10 @@ def login():
         if not user or not user.check_password(form.password.data):
             flash('Invalid credentials.', 'danger')
             return redirect(url_for('auth.login'))
+        # Upgrade hashes made with older parameters while we have the password
+        if user.password_needs_rehash():
+            user.set_password(form.password.data)
+            db.session.commit()
         login_user(user)
         flash('Logged in successfully.', 'success')
         # Role-based default redirect if no explicit 'next'
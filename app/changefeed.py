@@ -0,0 +1,280 @@
+"""Live ticket changes for the dashboards, as Server-Sent Events.
+
+The ticket lifecycle hooks queue a small event (created, assigned, status,
+comment) on the session; once the transaction commits the events go to the
+change feed. The feed is an asyncio server on its own thread and port
+(``CHANGEFEED_PORT``): every open dashboard is one coroutine and one queue,
+not a thread, so thousands of idle subscribers cost little. Subscribers are
+authenticated with their session cookie and only get events for tickets their
+role can see and that may match the filters in the stream's query string. The
+page then fetches just those rows (``/dashboard/<role>/rows``) instead of
+reloading.
+
+The feed is in-process: events committed by another process (a second web
+worker, ``database/auto_assign.py``) are not seen by this one's subscribers.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+from flask import current_app, has_app_context, request
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from . import db
+from .queries import TicketFilter
+
+log = logging.getLogger(__name__)
+
+PATH = '/events'
+HISTORY = 1000  # events kept for clients reconnecting with Last-Event-ID
+QUEUE_SIZE = 200  # undelivered events per subscriber before it is told to reload
+MAX_HEADER_BYTES = 16 * 1024
+DEFAULT_HEARTBEAT = 15
+
+
+def ticket_event(kind, ticket, **before):
+    """Feed payload for ``ticket`` (a Ticket or any object with its columns; missing ones are unknown).
+
+    ``before`` holds the ``technician_id``/``status_id`` the change replaced.
+    """
+    technician_id = getattr(ticket, 'technician_id', None)
+    status_id = getattr(ticket, 'status_id', None)
+    return dict(type=kind, ticket_id=ticket.ticket_id, requester_id=getattr(ticket, 'requester_id', None),
+                category_id=getattr(ticket, 'category_id', None), technician_id=technician_id,
+                status_id=status_id, previous_technician_id=before.get('technician_id', technician_id),
+                previous_status_id=before.get('status_id', status_id))
+
+
+def publish(*events):
+    """Queue events on the session; they are sent once it commits (and dropped on rollback)."""
+    if has_app_context() and 'changefeed' in current_app.extensions:
+        db.session.info.setdefault('changefeed_events', []).extend(events)
+
+
+def _may_match(wanted, *values):
+    # None is unknown (e.g. a comment from the API batch carries no status)
+    return wanted is None or wanted in values or None in values
+
+
+class Subscriber:
+    def __init__(self, user_id, role, status_id=None, category_id=None, unassigned=False):
+        self.user_id = user_id
+        self.role = role
+        self.status_id = status_id
+        self.category_id = category_id
+        self.unassigned = unassigned
+        self.queue = asyncio.Queue()
+        self.overflowed = False
+
+    def wants(self, change):
+        technicians = (change['technician_id'], change['previous_technician_id'])
+        if self.role == 'requester' and change['requester_id'] != self.user_id:
+            return False
+        if self.role == 'technician' and self.user_id not in technicians:
+            return False
+        if self.unassigned and None not in technicians:
+            return False
+        # before or after the change: a ticket that leaves the filter must leave the page too
+        return (_may_match(self.status_id, change['status_id'], change['previous_status_id'])
+                and _may_match(self.category_id, change['category_id']))
+
+    def send(self, event_id, change):
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= QUEUE_SIZE:
+            # a stalled client: drop its backlog and tell it to start over
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+        else:
+            self.queue.put_nowait((event_id, change))
+
+
+class ChangeFeed:
+    def __init__(self, app, host, port, heartbeat=DEFAULT_HEARTBEAT):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.heartbeat = heartbeat
+        self.loop = None
+        self.subscribers = set()
+        self.history = deque(maxlen=HISTORY)
+        # ids are "<epoch>-<seq>", so a client of a restarted server is noticed
+        self.epoch = format(int(time.time()), 'x')
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._started = None
+
+    def ensure_started(self):
+        """Start the server thread on first use; False if it could not listen."""
+        with self._lock:
+            if self._started is None:
+                ready = threading.Event()
+                threading.Thread(target=self._run, args=(ready,), name='changefeed', daemon=True).start()
+                ready.wait(10)
+                self._started = self.loop is not None
+            return self._started
+
+    def _run(self, ready):
+        loop = asyncio.new_event_loop()
+        try:
+            server = loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port, limit=MAX_HEADER_BYTES))
+        except OSError as e:
+            log.warning('change feed could not listen on %s:%s: %s', self.host, self.port, e)
+            loop.close()
+            ready.set()
+            return
+        self.port = server.sockets[0].getsockname()[1]
+        self.loop = loop
+        ready.set()
+        loop.run_forever()
+
+    def publish(self, events):
+        """Thread-safe: hand committed events to the subscribers."""
+        if self.loop is not None and events:
+            self.loop.call_soon_threadsafe(self._dispatch, events)
+
+    def _dispatch(self, events):
+        for change in events:
+            seq = next(self._seq)
+            self.history.append((seq, change))
+            for subscriber in self.subscribers:
+                if subscriber.wants(change):
+                    subscriber.send(f'{self.epoch}-{seq}', change)
+
+    def _replay(self, subscriber, last_event_id):
+        """Queue what a reconnecting client missed; False if that is no longer known."""
+        epoch, _, seq = last_event_id.partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return False
+        seq = int(seq)
+        if self.history and self.history[0][0] > seq + 1:
+            return False
+        for change_seq, change in self.history:
+            if change_seq > seq and subscriber.wants(change):
+                subscriber.send(f'{self.epoch}-{change_seq}', change)
+        return True
+
+    def _authenticate(self, headers, query, peer):
+        # Runs on an executor thread: Flask-Login loads the user from the cookies
+        # exactly as it would for a page request
+        environ = {'REMOTE_ADDR': peer[0] if peer else ''}
+        forwarded = {name: headers[name.lower()] for name in ('Cookie', 'User-Agent') if name.lower() in headers}
+        with self.app.test_request_context(PATH, query_string=query, headers=forwarded, environ_base=environ):
+            user = current_user._get_current_object()
+            if not user.is_authenticated or not user.is_active:
+                return None
+            filters = TicketFilter(request.args)
+            return Subscriber(user.user_id, getattr(user.role, 'value', user.role), filters.status_id,
+                              filters.category_id, bool(filters.unassigned))
+
+    async def _handle(self, reader, writer):
+        try:
+            await self._serve(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+            pass
+        except Exception:
+            log.exception('change feed connection failed')
+        finally:
+            writer.close()
+
+    async def _serve(self, reader, writer):
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 10)
+        request_line, *lines = head.decode('latin-1').split('\r\n')
+        parts = request_line.split(' ')
+        headers = {}
+        for line in lines:
+            name, sep, value = line.partition(':')
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        url = urlsplit(parts[1]) if len(parts) == 3 else None
+        if url is None or parts[0] != 'GET' or url.path != PATH:
+            return await _respond(writer, '404 Not Found')
+        # another site's page must not read the stream with our user's cookie
+        origin = headers.get('origin')
+        cors = []
+        if origin:
+            if urlsplit(origin).hostname != urlsplit('//' + headers.get('host', '')).hostname:
+                return await _respond(writer, '403 Forbidden')
+            cors = [('Access-Control-Allow-Origin', origin), ('Access-Control-Allow-Credentials', 'true'),
+                    ('Vary', 'Origin')]
+        subscriber = await asyncio.get_running_loop().run_in_executor(
+            None, self._authenticate, headers, url.query, writer.get_extra_info('peername'))
+        if subscriber is None:
+            return await _respond(writer, '401 Unauthorized', cors)
+
+        await _respond(writer, '200 OK', cors + [('Content-Type', 'text/event-stream'),
+                                                 ('Cache-Control', 'no-cache'), ('X-Accel-Buffering', 'no')],
+                       b'retry: 5000\n\n')
+        last_event_id = headers.get('last-event-id')
+        if last_event_id and not self._replay(subscriber, last_event_id):
+            subscriber.queue.put_nowait(None)
+        self.subscribers.add(subscriber)
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(subscriber.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    # keeps proxies from closing the connection and finds dead clients
+                    writer.write(b': ping\n\n')
+                else:
+                    if item is None:
+                        writer.write(b'event: reset\ndata: {}\n\n')
+                        await writer.drain()
+                        return
+                    event_id, change = item
+                    data = json.dumps(dict(type=change['type'], ticket_id=change['ticket_id']))
+                    writer.write(f'id: {event_id}\nevent: ticket\ndata: {data}\n\n'.encode())
+                await writer.drain()
+        finally:
+            self.subscribers.discard(subscriber)
+
+
+async def _respond(writer, status, headers=(), body=b''):
+    lines = [f'HTTP/1.1 {status}', *(f'{name}: {value}' for name, value in headers)]
+    if not status.startswith('200'):
+        lines.append('Content-Length: 0')
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+
+
+def init_app(app):
+    port = app.config.get('CHANGEFEED_PORT')
+    if port:
+        app.extensions['changefeed'] = ChangeFeed(app, app.config.get('CHANGEFEED_HOST', '127.0.0.1'), port,
+                                                  app.config.get('CHANGEFEED_HEARTBEAT', DEFAULT_HEARTBEAT))
+
+
+def stream_url():
+    """Event stream URL for the current page, or None when the feed is off or could not start."""
+    feed = current_app.extensions.get('changefeed')
+    if feed is None or not feed.ensure_started():
+        return None
+    public = current_app.config.get('CHANGEFEED_URL')
+    if public:
+        return public
+    host = urlsplit('//' + request.host).hostname
+    if ':' in host:
+        host = f'[{host}]'
+    return f'{request.scheme}://{host}:{feed.port}{PATH}'
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_after_commit(session):
+    events = session.info.pop('changefeed_events', None)
+    if events and has_app_context():
+        feed = current_app.extensions.get('changefeed')
+        if feed is not None:
+            feed.publish(events)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_rolled_back_events(session, _previous_transaction):
+    session.info.pop('changefeed_events', None)
@@ -0,0 +1,50 @@
+"""Comment threads, one page at a time.
+
+Ticket detail shows the newest ``COMMENTS_PAGE_SIZE`` comments, oldest at the
+top. Older pages and comments added since the page was rendered are fetched
+as HTML fragments from ``/tickets/<id>/comments`` with opaque keyset cursors
+over ``(created_at, comment_id)`` (the ``idx_comments_ticket_created``
+index), so a long thread costs one bounded query per page, never an OFFSET.
+Authors of a page are looked up in a single query.
+"""
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import select
+from .. import db
+from ..models import User
+from ..utils import SortKey, keyset_paginate, keyset_cursor
+
+DEFAULT_PAGE_SIZE = 20
+
+# comments: oldest first; older: cursor of the page before them, or None;
+# newer: cursor for the comments after the newest one shown; more_newer (when
+# loading with a ``newer`` cursor): another page of newer comments is waiting
+Thread = namedtuple('Thread', 'comments authors older newer more_newer')
+
+
+def sort_keys(model):
+    return [SortKey(model.created_at, True), SortKey(model.comment_id, True)]
+
+
+def authors(comments):
+    """``{user_id: (first_name, last_name, role)}`` for the authors of ``comments``."""
+    ids = {c.user_id for c in comments}
+    if not ids:
+        return {}
+    rows = db.session.execute(
+        select(User.user_id, User.first_name, User.last_name, User.role).where(User.user_id.in_(ids)))
+    return {user_id: (first, last, role) for user_id, first, last, role in rows}
+
+
+def load(model, ticket_id, cursor=None):
+    """A page of ``model`` (``Comment`` or ``ArchivedComment``) comments of the ticket.
+
+    Without a cursor this is the newest page; ``Thread.older`` and
+    ``Thread.newer`` are the cursors to pass next.
+    """
+    per_page = current_app.config.get('COMMENTS_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    page = keyset_paginate(model.query.filter(model.ticket_id == ticket_id), sort_keys(model), cursor, per_page)
+    # pages run newest first; show each one oldest first
+    comments = page['items'][::-1]
+    newer = keyset_cursor('prev', [comments[-1].created_at, comments[-1].comment_id]) if comments else cursor
+    return Thread(comments, authors(comments), page['next_cursor'], newer, page['has_prev'])
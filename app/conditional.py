@@ -0,0 +1,124 @@
+"""Conditional GETs (ETag / 304 Not Modified) for the ticket pages.
+
+A view decorated with ``@conditional(version)`` first runs ``version(**view_args)``,
+one small indexed query returning a tuple that changes whenever anything the
+page shows changes (latest ``updated_at``, row and comment counts, ...). The
+ETag hashes that tuple with the user and the template files, so when the
+browser revalidates with a matching ``If-None-Match`` the page is answered
+with 304 before the view's own queries and template render run.
+
+Responses carry ``Cache-Control: private, no-cache``: browsers keep the page
+but always revalidate, shared caches never store it. Requests with flashed
+messages waiting get no ETag, since the page will show (and consume) them.
+"""
+import hashlib
+import os
+from functools import wraps
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import func, select
+from . import db
+from .models import Ticket, TicketEvent, Comment, Rating, User, Role, ArchivedTicket
+
+
+def templates_token(app):
+    """Changes whenever a template file does; deploying new templates must not keep serving the old pages."""
+    token = app.extensions.get('templates_token')
+    if token is None:
+        digest = hashlib.sha1()
+        for root, _dirs, files in os.walk(os.path.join(app.root_path, app.template_folder)):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                digest.update(f'{path}:{os.path.getmtime(path)}'.encode())
+        token = app.extensions.setdefault('templates_token', digest.hexdigest()[:12])
+    return token
+
+
+def make_etag(parts):
+    user = (current_user.user_id, getattr(current_user.role, 'value', current_user.role), current_user.first_name) \
+        if current_user.is_authenticated else None
+    raw = repr((request.endpoint, user, templates_token(current_app), tuple(parts)))
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def conditional(version):
+    """Answer GET/HEAD with 304 when the client's ETag matches ``version``'s current value.
+
+    ``version`` gets the view's keyword arguments and returns a tuple, or None
+    to skip conditional handling (e.g. the ticket does not exist).
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if (request.method not in ('GET', 'HEAD') or not current_app.config.get('ETAGS_ENABLED', True)
+                    or session.get('_flashes')):
+                return fn(*args, **kwargs)
+            parts = version(**kwargs)
+            if parts is None:
+                return fn(*args, **kwargs)
+            etag = make_etag(parts)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+            return response
+        return wrapper
+    return decorator
+
+
+def _latest_event():
+    # every assignment and status change appends an event, so this id moves
+    # even when updated_at does not (MySQL TIMESTAMP only has whole seconds)
+    return select(func.max(TicketEvent.event_id)).scalar_subquery()
+
+
+def _tickets_version(*where):
+    return tuple(db.session.execute(
+        select(func.count(), func.max(Ticket.updated_at), func.max(Ticket.ticket_id), _latest_event())
+        .where(*where)).one())
+
+
+def requester_version(**_kwargs):
+    return _tickets_version(Ticket.requester_id == current_user.user_id)
+
+
+def technician_version(**_kwargs):
+    return _tickets_version(Ticket.technician_id == current_user.user_id)
+
+
+def manager_version(**_kwargs):
+    technicians = (User.role == Role.technician, User.is_active.is_(True))
+    return tuple(db.session.execute(select(
+        select(func.max(Ticket.updated_at)).scalar_subquery(),
+        select(func.count()).select_from(Ticket).scalar_subquery(),
+        _latest_event(),
+        # the technician dropdown
+        select(func.count()).select_from(User).where(*technicians).scalar_subquery(),
+        select(func.max(User.updated_at)).where(*technicians).scalar_subquery(),
+    )).one())
+
+
+def ticket_version(ticket_id, **_kwargs):
+    """Ticket, comment and rating state of one ticket, or None if it does not exist.
+
+    Archived tickets no longer change, so the time they were archived is their version.
+    """
+    of_ticket = Comment.ticket_id == ticket_id
+    row = db.session.execute(
+        # status/technician too: MySQL DATETIME only has whole seconds
+        select(Ticket.updated_at, Ticket.status_id, Ticket.technician_id,
+               select(func.count()).select_from(Comment).where(of_ticket).scalar_subquery(),
+               select(func.max(Comment.created_at)).where(of_ticket).scalar_subquery(),
+               Rating.rating_value, Rating.feedback)
+        .outerjoin(Rating, Rating.ticket_id == Ticket.ticket_id)
+        .where(Ticket.ticket_id == ticket_id)
+    ).first()
+    if row is None:
+        archived_at = db.session.scalar(select(ArchivedTicket.archived_at).where(ArchivedTicket.ticket_id == ticket_id))
+        return ('archived', archived_at) if archived_at is not None else None
+    return tuple(row)
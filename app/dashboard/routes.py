@@ -1,123 +1,100 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, Response, current_app, render_template, request, redirect, url_for, flash, stream_with_context
 from flask_login import login_required, current_user
-from ..models import Ticket, TicketStatus, User, Role
-from ..utils import role_required, is_requester, is_technician, is_manager, paginate
-from .. import db
+from ..models import Ticket, ArchivedTicket, User, Role
+from ..utils import role_required, is_requester, is_technician, is_manager, paginate, keyset_paginate, apply_order
+from ..queries import ticket_listing, TicketFilter, MANAGER_FILTERS, REQUESTER_FILTERS, TECHNICIAN_FILTERS
+from ..exports import ticket_csv_chunks, gzip_chunks
+from ..tickets import lifecycle, bulk, assignment, archive
+from ..fragments import digest
+from ..conditional import conditional, requester_version, technician_version, manager_version
+from .. import db, refdata, changefeed
 
 dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 
-@dashboard_bp.route('/requester')
-@login_required
-@role_required(Role.requester)
-def requester_dashboard():
-    status_filter = request.args.get('status')
-    keyword = request.args.get('q', type=str)
-    category_id = request.args.get('category_id', type=int)
-    start_date = request.args.get('start')
-    end_date = request.args.get('end')
-    sort = request.args.get('sort', default='created_desc')
-
-    page = request.args.get('page', type=int, default=1)
-    per_page = 10
-
-    q = Ticket.query.filter_by(requester_id=current_user.user_id)
+MAX_LIVE_ROWS = 100
 
-    if status_filter:
-        status = TicketStatus.query.filter_by(status_name=status_filter).first()
-        if status:
-            q = q.filter(Ticket.status_id == status.status_id)
+def paginate_tickets(q, filters, per_page):
+    # Cursor pagination by default; an explicit ?page= (old links) or relevance sort uses offsets
+    q, sort_keys = filters.apply(q)
+    page = request.args.get('page', type=int)
+    if sort_keys is None or page:
+        if sort_keys:
+            q = apply_order(q, sort_keys)
+        return paginate(q, page or 1, per_page)
+    count_key = (request.endpoint, current_user.user_id, filters.model.__tablename__, filters.key(include_sort=False))
+    return keyset_paginate(q, sort_keys, request.args.get('cursor'), per_page, with_total=True, count_key=count_key)
 
-    if keyword:
-        like = f"%{keyword}%"
-        q = q.filter((Ticket.title.ilike(like)) | (Ticket.description.ilike(like)))
+def live_context(filters):
+    # New tickets go on top only where they belong there: first page, newest first
+    first_page = not request.args.get('cursor') and not request.args.get('page')
+    return dict(live_url=changefeed.stream_url(), live_prepend=first_page and filters.sort == 'created_desc')
 
-    if category_id:
-        q = q.filter(Ticket.category_id == category_id)
+def live_rows(q, filters, template, **context):
+    """Rows of the ``?ids=`` tickets that still match the page's filters, for live updates."""
+    ids = [int(i) for i in request.args.get('ids', '').split(',') if i.isdigit()][:MAX_LIVE_ROWS]
+    tickets = filters.apply(q.filter(Ticket.ticket_id.in_(ids)))[0].all() if ids else []
+    return render_template(template, tickets=tickets, **context)
 
-    if start_date:
-        try:
-            from datetime import datetime
-            sd = datetime.fromisoformat(start_date)
-            q = q.filter(Ticket.created_at >= sd)
-        except ValueError:
-            pass
-    if end_date:
-        try:
-            from datetime import datetime
-            ed = datetime.fromisoformat(end_date)
-            q = q.filter(Ticket.created_at <= ed)
-        except ValueError:
-            pass
+def technician_choices():
+    technicians = User.query.filter_by(role=Role.technician, is_active=True).all()
+    return dict(technicians=technicians,
+                technicians_key=digest((u.user_id, u.first_name, u.last_name) for u in technicians))
 
-    if sort == 'created_asc':
-        q = q.order_by(Ticket.created_at.asc())
-    elif sort == 'status':
-        # join status for sorting by name
-        q = q.join(TicketStatus, Ticket.status_id == TicketStatus.status_id).order_by(TicketStatus.status_name.asc(), Ticket.created_at.desc())
-    elif sort == 'category':
-        from ..models import Category
-        q = q.join(Category, Ticket.category_id == Category.category_id, isouter=True).order_by(Category.category_name.asc().nulls_last(), Ticket.created_at.desc())
-    else:
-        q = q.order_by(Ticket.created_at.desc())
+@dashboard_bp.route('/requester')
+@login_required
+@role_required(Role.requester)
+@conditional(requester_version)
+def requester_dashboard():
+    filters = TicketFilter(request.args, REQUESTER_FILTERS)
+    per_page = 10
 
-    pagination = paginate(q, page, per_page)
-    statuses = TicketStatus.query.all()
-    from ..models import Category
-    categories = Category.query.all()
+    q = ticket_listing('status', 'technician').filter_by(requester_id=current_user.user_id)
+    pagination = paginate_tickets(q, filters, per_page)
     return render_template(
         'dashboard/requester.html',
         pagination=pagination,
         tickets=pagination['items'],
-        statuses=statuses,
-        categories=categories,
-        status_filter=status_filter,
-        keyword=keyword,
-        category_id=category_id,
-        start_date=start_date,
-        end_date=end_date,
-        sort=sort,
+        statuses=refdata.statuses(),
+        categories=refdata.categories(),
+        status_filter=filters.status,
+        keyword=filters.keyword,
+        category_id=filters.category_id,
+        start_date=filters.raw['start'],
+        end_date=filters.raw['end'],
+        sort=filters.sort,
     )
 
 @dashboard_bp.route('/technician')
 @login_required
 @role_required(Role.technician)
+@conditional(technician_version)
 def technician_dashboard():
-    # Filters
-    status_filter = request.args.get('status')
-    keyword = request.args.get('q', type=str)
-    category_id = request.args.get('category_id', type=int)
-
-    page = request.args.get('page', type=int, default=1)
+    filters = TicketFilter(request.args, TECHNICIAN_FILTERS)
     per_page = 10
 
-    q = Ticket.query.filter(Ticket.technician_id == current_user.user_id)
-
-    if status_filter:
-        status = TicketStatus.query.filter_by(status_name=status_filter).first()
-        if status:
-            q = q.filter(Ticket.status_id == status.status_id)
-
-    if category_id:
-        q = q.filter(Ticket.category_id == category_id)
-
-    if keyword:
-        like = f"%{keyword}%"
-        q = q.filter((Ticket.title.ilike(like)) | (Ticket.description.ilike(like)))
-
-    q = q.order_by(Ticket.created_at.desc())
-
-    pagination = paginate(q, page, per_page)
-    statuses = TicketStatus.query.order_by(TicketStatus.status_name.asc()).all()
-    from ..models import Category
-    categories = Category.query.order_by(Category.category_name.asc()).all()
+    q = ticket_listing('status').filter(Ticket.technician_id == current_user.user_id)
+    pagination = paginate_tickets(q, filters, per_page)
+    statuses = sorted(refdata.statuses(), key=lambda s: s.status_name)
+    categories = sorted(refdata.categories(), key=lambda c: c.category_name)
     return render_template('dashboard/technician.html',
+                           statuses_key=digest(statuses),
                            pagination=pagination,
                            tickets=pagination['items'],
                            statuses=statuses,
                            categories=categories,
-                           status=status_filter,
-                           category_id=category_id,
-                           q=keyword)
+                           status=filters.status,
+                           category_id=filters.category_id,
+                           q=filters.keyword,
+                           **live_context(filters))
+
+@dashboard_bp.route('/technician/rows')
+@login_required
+@role_required(Role.technician)
+def technician_rows():
+    statuses = sorted(refdata.statuses(), key=lambda s: s.status_name)
+    q = ticket_listing('status').filter(Ticket.technician_id == current_user.user_id)
+    return live_rows(q, TicketFilter(request.args, TECHNICIAN_FILTERS), 'dashboard/_technician_rows.html',
+                     statuses=statuses, statuses_key=digest(statuses))
 
 @dashboard_bp.route('/technician/<int:ticket_id>/status', methods=['POST'])
 @login_required
@@ -129,13 +106,13 @@ def technician_update_status(ticket_id):
     if ticket.technician_id != current_user.user_id:
         flash('You can only update your assigned tickets.', 'danger')
         return redirect(url_for('dashboard.technician_dashboard'))
-    status = TicketStatus.query.filter_by(status_name=new_status).first()
+    status = refdata.status_by_name(new_status)
     if not status:
         flash('Invalid status.', 'warning')
         return redirect(url_for('dashboard.technician_dashboard'))
     # Ensure linear status flow: Pending -> In Progress -> Resolved -> Closed
-    order = ['Pending', 'In Progress', 'Resolved', 'Closed']
-    current_name = ticket.status.status_name if ticket.status else 'Pending'
+    order = lifecycle.WORKFLOW
+    current_name = refdata.status_name(ticket.status_id) or 'Pending'
     try:
         cur_idx = order.index(current_name)
         new_idx = order.index(status.status_name)
@@ -147,115 +124,81 @@ def technician_update_status(ticket_id):
     if new_idx < cur_idx or new_idx > cur_idx + 1:
         flash('Cannot skip steps or move backward. Follow workflow.', 'warning')
         return redirect(url_for('dashboard.technician_dashboard'))
+    previous_status_id = ticket.status_id
     ticket.status_id = status.status_id
+    lifecycle.ticket_status_changed(ticket, previous_status_id, current_user.user_id)
     db.session.commit()
     flash('Status updated.', 'success')
     return redirect(url_for('dashboard.technician_dashboard'))
 
+def bulk_redirect(endpoint):
+    # Back to the dashboard page the form was on, filters included
+    next_url = request.form.get('next') or ''
+    if next_url.startswith(url_for(endpoint)):
+        return redirect(next_url)
+    return redirect(url_for(endpoint))
+
+def flash_bulk_result(result, verb):
+    if result.updated:
+        flash(f'{verb} {len(result.updated)} ticket(s).', 'success')
+    if result.failed:
+        shown = [f'#{ticket_id} {reason}' for ticket_id, reason in list(result.failed.items())[:10]]
+        more = len(result.failed) - len(shown)
+        flash(f'{len(result.failed)} ticket(s) not changed: ' + '; '.join(shown) + (f' and {more} more' if more else ''),
+              'warning')
+
+def run_bulk(operation, verb, *args, **kwargs):
+    try:
+        ticket_ids = bulk.parse_ticket_ids(request.form.getlist('ticket_ids'))
+        result = operation(ticket_ids, *args, actor_id=current_user.user_id, **kwargs)
+    except bulk.BulkError as e:
+        flash(str(e), 'warning')
+    else:
+        flash_bulk_result(result, verb)
+
+@dashboard_bp.route('/technician/bulk/advance', methods=['POST'])
+@login_required
+@role_required(Role.technician)
+def technician_bulk_advance():
+    run_bulk(bulk.advance, 'Advanced', technician_id=current_user.user_id)
+    return bulk_redirect('dashboard.technician_dashboard')
+
 @dashboard_bp.route('/manager')
 @login_required
 @role_required(Role.manager)
+@conditional(manager_version)
 def manager_dashboard():
-    status_filter = request.args.get('status')
-    unassigned = request.args.get('unassigned', type=int)
-    keyword = request.args.get('q', type=str)
-    category_id = request.args.get('category_id', type=int)
-    start_date = request.args.get('start')
-    end_date = request.args.get('end')
-    sort = request.args.get('sort', default='created_desc')
-    page = request.args.get('page', type=int, default=1)
-    per_page = 10
-    q = Ticket.query
-    if status_filter:
-        status = TicketStatus.query.filter_by(status_name=status_filter).first()
-        if status:
-            q = q.filter(Ticket.status_id == status.status_id)
-    if unassigned:
-        q = q.filter(Ticket.technician_id.is_(None))
-    if keyword:
-        like = f"%{keyword}%"
-        q = q.filter((Ticket.title.ilike(like)) | (Ticket.description.ilike(like)))
-    if category_id:
-        q = q.filter(Ticket.category_id == category_id)
-    if start_date:
-        try:
-            from datetime import datetime
-            sd = datetime.fromisoformat(start_date)
-            q = q.filter(Ticket.created_at >= sd)
-        except ValueError:
-            pass
-    if end_date:
-        try:
-            from datetime import datetime
-            ed = datetime.fromisoformat(end_date)
-            q = q.filter(Ticket.created_at <= ed)
-        except ValueError:
-            pass
-    if sort == 'created_asc':
-        q = q.order_by(Ticket.created_at.asc())
-    elif sort == 'status':
-        q = q.join(TicketStatus, Ticket.status_id == TicketStatus.status_id).order_by(TicketStatus.status_name.asc(), Ticket.created_at.desc())
-    elif sort == 'category':
-        from ..models import Category
-        q = q.join(Category, Ticket.category_id == Category.category_id, isouter=True).order_by(Category.category_name.asc().nulls_last(), Ticket.created_at.desc())
+    # ?archived=1 browses tickets moved to the archive (read-only, no live updates)
+    archived = request.args.get('archived', type=int) == 1
+    if archived:
+        filters = TicketFilter(request.args, MANAGER_FILTERS, model=ArchivedTicket)
+        q = archive.listing('status', 'technician')
     else:
-        q = q.order_by(Ticket.created_at.desc())
-    pagination = paginate(q, page, per_page)
-    statuses = TicketStatus.query.all()
-    technicians = User.query.filter_by(role=Role.technician, is_active=True).all()
-    from ..models import Category
-    categories = Category.query.all()
-    return render_template('dashboard/manager.html', pagination=pagination, tickets=pagination['items'], statuses=statuses, technicians=technicians,
-                           categories=categories, status_filter=status_filter, unassigned=unassigned, keyword=keyword,
-                           category_id=category_id, start_date=start_date, end_date=end_date, sort=sort)
+        filters = TicketFilter(request.args, MANAGER_FILTERS)
+        q = ticket_listing('status', 'technician')
+    per_page = 10
+    pagination = paginate_tickets(q, filters, per_page)
+    live = dict(live_url=None) if archived else live_context(filters)
+    return render_template('dashboard/manager.html', pagination=pagination, tickets=pagination['items'], statuses=refdata.statuses(),
+                           workloads=assignment.workloads(), auto_assign=assignment.mode(), archived=archived,
+                           categories=refdata.categories(), status_filter=filters.status,
+                           unassigned=filters.unassigned, keyword=filters.keyword, category_id=filters.category_id,
+                           start_date=filters.raw['start'], end_date=filters.raw['end'], sort=filters.sort,
+                           **technician_choices(), **live)
+
+@dashboard_bp.route('/manager/rows')
+@login_required
+@role_required(Role.manager)
+def manager_rows():
+    return live_rows(ticket_listing('status', 'technician'), TicketFilter(request.args, MANAGER_FILTERS),
+                     'dashboard/_manager_rows.html', **technician_choices())
 
 @dashboard_bp.route('/manager/export.csv')
 @login_required
 @role_required(Role.manager)
 def manager_export_csv():
-    # Use current filters 
-    status_filter = request.args.get('status')
-    unassigned = request.args.get('unassigned', type=int)
-    keyword = request.args.get('q', type=str)
-    category_id = request.args.get('category_id', type=int)
-    start_date = request.args.get('start')
-    end_date = request.args.get('end')
-    sort = request.args.get('sort', default='created_desc')
-    q = Ticket.query
-    if status_filter:
-        status = TicketStatus.query.filter_by(status_name=status_filter).first()
-        if status:
-            q = q.filter(Ticket.status_id == status.status_id)
-    if unassigned:
-        q = q.filter(Ticket.technician_id.is_(None))
-    if keyword:
-        like = f"%{keyword}%"
-        q = q.filter((Ticket.title.ilike(like)) | (Ticket.description.ilike(like)))
-    if category_id:
-        q = q.filter(Ticket.category_id == category_id)
-    if start_date:
-        try:
-            from datetime import datetime
-            sd = datetime.fromisoformat(start_date)
-            q = q.filter(Ticket.created_at >= sd)
-        except ValueError:
-            pass
-    if end_date:
-        try:
-            from datetime import datetime
-            ed = datetime.fromisoformat(end_date)
-            q = q.filter(Ticket.created_at <= ed)
-        except ValueError:
-            pass
-    if sort == 'created_asc':
-        q = q.order_by(Ticket.created_at.asc())
-    elif sort == 'status':
-        q = q.join(TicketStatus, Ticket.status_id == TicketStatus.status_id).order_by(TicketStatus.status_name.asc(), Ticket.created_at.desc())
-    elif sort == 'category':
-        from ..models import Category
-        q = q.join(Category, Ticket.category_id == Category.category_id, isouter=True).order_by(Category.category_name.asc().nulls_last(), Ticket.created_at.desc())
-    else:
-        q = q.order_by(Ticket.created_at.desc())
+    # Use current filters
+    q = TicketFilter(request.args, MANAGER_FILTERS).ordered(Ticket.query)
 
     # Log report
     from ..models import ReportLog
@@ -263,27 +206,13 @@ def manager_export_csv():
     db.session.add(log)
     db.session.commit()
 
-    # Export as CSV
-    import csv
-    from io import StringIO
-    si = StringIO()
-    writer = csv.writer(si)
-    writer.writerow(['ID','Title','Status','Category','Requester','Technician','Created'])
-    rows = q.all()
-    for t in rows:
-        writer.writerow([
-            t.ticket_id,
-            t.title,
-            t.status.status_name if t.status else '',
-            t.category.category_name if t.category else '',
-            t.requester.first_name if t.requester else '',
-            t.technician.first_name if t.technician else '',
-            t.created_at.strftime('%Y-%m-%d %H:%M')
-        ])
-    from flask import Response
-    return Response(si.getvalue(), mimetype='text/csv', headers={
-        'Content-Disposition': 'attachment; filename="tickets.csv"'
-    })
+    # Stream the CSV in batches instead of building it in memory
+    chunks = ticket_csv_chunks(q, current_app.config.get('CSV_EXPORT_BATCH_SIZE', 1000))
+    headers = {'Content-Disposition': 'attachment; filename="tickets.csv"', 'Vary': 'Accept-Encoding'}
+    if current_app.config.get('CSV_EXPORT_GZIP', True) and 'gzip' in request.accept_encodings:
+        chunks = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(chunks), mimetype='text/csv', headers=headers)
 
 @dashboard_bp.route('/manager/<int:ticket_id>/assign', methods=['POST'])
 @login_required
@@ -292,12 +221,42 @@ def manager_assign(ticket_id):
     tech_id = request.form.get('technician_id', type=int)
     ticket = Ticket.query.get_or_404(ticket_id)
     if tech_id:
+        previous_technician_id = ticket.technician_id
         ticket.technician_id = tech_id
-        in_progress = TicketStatus.query.filter_by(status_name='In Progress').first()
-        if in_progress and ticket.status and ticket.status.status_name == 'Pending':
-            ticket.status_id = in_progress.status_id
+        lifecycle.ticket_assigned(ticket, previous_technician_id, current_user.user_id)
+        in_progress_id = refdata.status_id('In Progress')
+        if in_progress_id and ticket.status_id is not None and ticket.status_id == refdata.status_id('Pending'):
+            ticket.status_id = in_progress_id
+            lifecycle.ticket_status_changed(ticket, refdata.status_id('Pending'), current_user.user_id)
         db.session.commit()
         flash('Technician assigned.', 'success')
     else:
         flash('Select a technician.', 'warning')
     return redirect(url_for('dashboard.manager_dashboard'))
+
+@dashboard_bp.route('/manager/bulk/assign', methods=['POST'])
+@login_required
+@role_required(Role.manager)
+def manager_bulk_assign():
+    run_bulk(bulk.assign, 'Assigned', request.form.get('technician_id', type=int))
+    return bulk_redirect('dashboard.manager_dashboard')
+
+@dashboard_bp.route('/manager/bulk/advance', methods=['POST'])
+@login_required
+@role_required(Role.manager)
+def manager_bulk_advance():
+    run_bulk(bulk.advance, 'Advanced')
+    return bulk_redirect('dashboard.manager_dashboard')
+
+@dashboard_bp.route('/manager/auto-assign', methods=['POST'])
+@login_required
+@role_required(Role.manager)
+def manager_auto_assign():
+    try:
+        assigned, left = assignment.assign_pending(actor_id=current_user.user_id)
+    except bulk.BulkError as e:
+        flash(str(e), 'warning')
+    else:
+        flash(f'Auto-assigned {assigned} ticket(s).' + (f' {left} still unassigned.' if left else ''),
+              'success' if assigned else 'info')
+    return bulk_redirect('dashboard.manager_dashboard')
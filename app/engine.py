@@ -0,0 +1,63 @@
+"""Engine and connection pool settings built from the app config.
+
+``engine_options`` turns the ``DB_*`` settings into ``create_engine`` options
+(pool size/overflow/timeout/recycle, pre-ping, a per-statement time limit on
+MySQL and PostgreSQL). ``configure_engines`` applies the ``SQLITE_*`` pragmas
+to every new SQLite connection.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(config, uri=None):
+    """``SQLALCHEMY_ENGINE_OPTIONS`` for ``uri`` (default: the configured database)."""
+    url = make_url(uri or config['SQLALCHEMY_DATABASE_URI'])
+    options = {'pool_pre_ping': config.get('DB_POOL_PRE_PING', True)}
+    if _is_memory_sqlite(url):
+        # single shared connection (StaticPool); pool sizing does not apply
+        return options
+    options.update(
+        pool_size=config.get('DB_POOL_SIZE', 10),
+        max_overflow=config.get('DB_MAX_OVERFLOW', 20),
+        pool_timeout=config.get('DB_POOL_TIMEOUT', 30),
+        pool_recycle=config.get('DB_POOL_RECYCLE', 1800),
+    )
+    timeout_ms = config.get('DB_STATEMENT_TIMEOUT_MS', 0)
+    backend = url.get_backend_name()
+    if timeout_ms and backend == 'mysql':
+        # applies to SELECTs; the server aborts them after timeout_ms
+        options['connect_args'] = {'init_command': f'SET SESSION max_execution_time={int(timeout_ms)}'}
+    elif timeout_ms and backend == 'postgresql':
+        options['connect_args'] = {'options': f'-c statement_timeout={int(timeout_ms)}'}
+    return options
+
+
+def _sqlite_pragmas(config):
+    pragmas = [
+        ('journal_mode', config.get('SQLITE_JOURNAL_MODE')),
+        ('synchronous', config.get('SQLITE_SYNCHRONOUS')),
+        ('cache_size', config.get('SQLITE_CACHE_SIZE')),
+        ('busy_timeout', config.get('SQLITE_BUSY_TIMEOUT_MS')),
+    ]
+    return [f'PRAGMA {name}={value}' for name, value in pragmas if value not in (None, '')]
+
+
+def configure_engines(app, engines):
+    """Install the SQLite connection pragmas on ``engines``."""
+    statements = _sqlite_pragmas(app.config)
+    for engine in engines:
+        if engine.dialect.name != 'sqlite' or not statements:
+            continue
+
+        @event.listens_for(engine, 'connect')
+        def _set_pragmas(dbapi_connection, _record, statements=statements):
+            cursor = dbapi_connection.cursor()
+            try:
+                for statement in statements:
+                    cursor.execute(statement)
+            finally:
+                cursor.close()
@@ -0,0 +1,55 @@
+"""Ticket CSV export as a stream of chunks.
+
+Rows are read from the database ``batch_size`` at a time and written out as
+they arrive, so memory stays flat however many tickets are exported.
+"""
+import csv
+import zlib
+from io import StringIO
+from . import refdata
+from .queries import export_rows
+
+CSV_HEADER = ['ID', 'Title', 'Status', 'Category', 'Requester', 'Technician', 'Created']
+DEFAULT_BATCH_SIZE = 1000
+
+
+def ticket_csv_chunks(query, batch_size=DEFAULT_BATCH_SIZE, stats=None):
+    """Yield the CSV export of an ordered ticket query as UTF-8 byte chunks.
+
+    When given, ``stats['rows']`` is set to the number of tickets written.
+    """
+    buf = StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_HEADER)
+    # yield_per streams from a server-side cursor where the driver has one
+    rows = export_rows(query).yield_per(batch_size)
+    n = 0
+    for n, (ticket_id, title, status_id, category_id, requester_name, technician_name, created_at) in enumerate(rows, 1):
+        category = refdata.category(category_id)
+        writer.writerow([
+            ticket_id,
+            title,
+            refdata.status_name(status_id) or '',
+            category.category_name if category else '',
+            requester_name or '',
+            technician_name or '',
+            created_at.strftime('%Y-%m-%d %H:%M') if created_at else '',
+        ])
+        if n % batch_size == 0:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode('utf-8')
+    if stats is not None:
+        stats['rows'] = n
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip-compress a stream of byte chunks on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,252 @@
+"""Cache for rendered template fragments.
+
+Templates wrap the parts worth keeping in ``{% cache name, ticket_id, ... %}``
+... ``{% endcache %}``. The key is the fragment name, the ticket, the ticket's
+cache generation and the remaining arguments (``updated_at``, role, ...), so
+a ticket change renders fresh HTML on its own. Commits that write a ticket,
+its comments or its rating also bump the generation, which orphans every
+cached fragment of that ticket; ORM writes are picked up by a flush listener,
+set-based ``update()`` statements go through ``note_ticket_writes``.
+
+``FRAGMENT_CACHE`` picks the backend: ``memory`` (default; an LRU bounded by
+``FRAGMENT_CACHE_MAX_BYTES`` per process), ``filesystem`` (files under
+``FRAGMENT_CACHE_DIR`` shared by all workers on the host, pruned to the same
+size) or ``off``. ``register_backend`` adds others. Hits and misses are
+counted per fragment name for the perf page.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import uuid
+from collections import defaultdict
+from flask import current_app, has_app_context
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from . import db
+from .cache import SizedLRUCache
+from .conditional import templates_token
+from .models import Ticket, Comment, Rating
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+class MemoryBackend:
+    def __init__(self, max_bytes):
+        self._cache = SizedLRUCache(max_bytes)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value):
+        self._cache.set(key, value)
+
+    def clear(self):
+        self._cache.clear()
+
+    def info(self):
+        return dict(entries=len(self._cache), bytes=self._cache.size, evictions=self._cache.evictions)
+
+
+class FileSystemBackend:
+    """One file per fragment; reads refresh the mtime, pruning deletes the least recently used files."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._written = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                value = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return value
+
+    def set(self, key, value):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(value)
+        # atomic, so other workers never read half a file
+        os.replace(tmp, self._path(key))
+        with self._lock:
+            self._written += len(value)
+            prune = self._written > self.max_bytes // 10
+            if prune:
+                self._written = 0
+        if prune:
+            self.prune()
+
+    def _entries(self):
+        with os.scandir(self.directory) as it:
+            return [(e.stat().st_mtime, e.stat().st_size, e.path) for e in it
+                    if e.is_file() and not e.name.endswith('.tmp')]
+
+    def prune(self):
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes * 0.9:
+                break
+
+    def clear(self):
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def info(self):
+        entries = self._entries()
+        return dict(entries=len(entries), bytes=sum(size for _, size, _ in entries), evictions=self.evictions)
+
+
+BACKENDS = {
+    'memory': lambda app: MemoryBackend(app.config.get('FRAGMENT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)),
+    'filesystem': lambda app: FileSystemBackend(
+        app.config.get('FRAGMENT_CACHE_DIR') or os.path.join(app.instance_path, 'fragments'),
+        app.config.get('FRAGMENT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)),
+}
+
+
+def register_backend(name, factory):
+    """Make ``FRAGMENT_CACHE=name`` use ``factory(app)`` (an object with get/set/clear/info)."""
+    BACKENDS[name] = factory
+
+
+def digest(parts):
+    return hashlib.sha1(repr(tuple(parts)).encode()).hexdigest()[:16]
+
+
+class FragmentCache:
+    def __init__(self, backend, version=''):
+        self.backend = backend
+        # part of every key, so fragments rendered by older templates are never served
+        self.version = version
+        self._stats = defaultdict(lambda: [0, 0])  # name -> [hits, misses]
+
+    def _generation(self, ticket_id):
+        key = f'gen:{ticket_id}'
+        generation = self.backend.get(key)
+        if generation is None:
+            # a new random value: fragments cached under an evicted generation stay unreachable
+            generation = uuid.uuid4().hex[:12]
+            self.backend.set(key, generation)
+        return generation
+
+    def render(self, name, ticket_id, vary, render):
+        generation = self._generation(ticket_id) if ticket_id is not None else ''
+        key = f'frag:{self.version}:{name}:{ticket_id}:{generation}:{digest(vary)}'
+        html = self.backend.get(key)
+        stats = self._stats[name]
+        if html is None:
+            stats[1] += 1
+            html = str(render())
+            self.backend.set(key, html)
+        else:
+            stats[0] += 1
+        return html
+
+    def invalidate_ticket(self, ticket_id):
+        self.backend.set(f'gen:{ticket_id}', uuid.uuid4().hex[:12])
+
+    def clear(self):
+        self.backend.clear()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self._stats.clear()
+
+    def stats(self):
+        """``[(name, hits, misses, hit rate)]`` and the backend's info dict."""
+        rows = [(name, hits, misses, hits / (hits + misses) if hits + misses else 0.0)
+                for name, (hits, misses) in sorted(self._stats.items())]
+        return rows, self.backend.info()
+
+
+class FragmentCacheExtension(Extension):
+    """``{% cache name, ticket_id, *vary %}...{% endcache %}``."""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.List(args)]), [], [], body).set_lineno(lineno)
+
+    def _render(self, args, caller):
+        cache = current_app.extensions.get('fragments')
+        if cache is None:
+            return caller()
+        name, ticket_id, *vary = args + [None] * (2 - len(args))
+        return Markup(cache.render(name, ticket_id, vary, caller))
+
+
+def init_app(app):
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    name = (app.config.get('FRAGMENT_CACHE') or 'memory').lower()
+    if name != 'off':
+        app.extensions['fragments'] = FragmentCache(BACKENDS[name](app), templates_token(app))
+
+
+def fragment_cache():
+    return current_app.extensions.get('fragments') if has_app_context() else None
+
+
+def invalidate_ticket(ticket_id):
+    cache = fragment_cache()
+    if cache is not None:
+        cache.invalidate_ticket(ticket_id)
+
+
+def note_ticket_writes(ticket_ids, session=None):
+    """Bump these tickets' generations when the session commits.
+
+    For writes the flush listener below cannot see: Core ``update()``/``insert()``
+    statements such as the bulk actions and auto-assignment.
+    """
+    session = session or db.session
+    session.info.setdefault('fragment_ticket_ids', set()).update(ticket_ids)
+
+
+# Comments and ratings are not part of the ticket row's updated_at, and
+# updated_at has whole seconds on MySQL; bump the ticket's generation after
+# any commit that wrote one
+@event.listens_for(Session, 'after_flush')
+def _note_ticket_writes(session, _flush_context):
+    note_ticket_writes((obj.ticket_id for obj in (*session.new, *session.dirty, *session.deleted)
+                        if isinstance(obj, (Comment, Rating, Ticket)) and obj.ticket_id is not None), session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    for ticket_id in session.info.pop('fragment_ticket_ids', ()):
+        invalidate_ticket(ticket_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_rolled_back_writes(session, _previous_transaction):
+    session.info.pop('fragment_ticket_ids', None)
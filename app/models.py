@@ -1,8 +1,8 @@
 from datetime import datetime
 from enum import Enum
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 from . import db
+from .auth import hashing
 
 class Role(str, Enum):
     requester = 'requester'
@@ -28,10 +28,13 @@ class User(UserMixin, db.Model):
         return str(self.user_id)
 
     def set_password(self, password: str):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hashing.hash_password(password)
 
     def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
+        return hashing.verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self) -> bool:
+        return hashing.needs_rehash(self.password_hash)
 
 class Category(db.Model):
     __tablename__ = 'categories'
@@ -61,6 +64,17 @@ class Ticket(db.Model):
     category = db.relationship('Category')
     status = db.relationship('TicketStatus')
 
+    # Dashboards filter on one of these columns, then order by created_at
+    __table_args__ = (
+        db.Index('idx_tickets_created', 'created_at'),
+        db.Index('idx_tickets_requester_created', 'requester_id', 'created_at'),
+        db.Index('idx_tickets_technician_status_created', 'technician_id', 'status_id', 'created_at'),
+        db.Index('idx_tickets_status_created', 'status_id', 'created_at'),
+        db.Index('idx_tickets_category_created', 'category_id', 'created_at'),
+        # newest change first: the manager dashboard's ETag version (app/conditional.py)
+        db.Index('idx_tickets_updated', 'updated_at'),
+    )
+
 class Comment(db.Model):
     __tablename__ = 'comments'
     comment_id = db.Column(db.Integer, primary_key=True)
@@ -69,6 +83,11 @@ class Comment(db.Model):
     comment_text = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('idx_comments_ticket_id', 'ticket_id'),
+        db.Index('idx_comments_ticket_created', 'ticket_id', 'created_at'),
+    )
+
 class Rating(db.Model):
     __tablename__ = 'ratings'
     rating_id = db.Column(db.Integer, primary_key=True)
@@ -76,6 +95,93 @@ class Rating(db.Model):
     rating_value = db.Column(db.Integer, nullable=False)
     feedback = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # the ticket's technician and category when first rated, credited in the rating aggregates
+    technician_id = db.Column(db.Integer, db.ForeignKey('users.user_id'))
+    category_id = db.Column(db.Integer)
+
+# Closed tickets moved out of the live tables, ids kept (see tickets/archive.py)
+class ArchivedTicket(db.Model):
+    __tablename__ = 'tickets_archive'
+    ticket_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    title = db.Column(db.String(255), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    location = db.Column(db.String(255), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.category_id'))
+    status_id = db.Column(db.Integer, db.ForeignKey('ticket_status.status_id'))
+    requester_id = db.Column(db.Integer, db.ForeignKey('users.user_id'))
+    technician_id = db.Column(db.Integer, db.ForeignKey('users.user_id'))
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    category = db.relationship('Category')
+    status = db.relationship('TicketStatus')
+    requester = db.relationship('User', foreign_keys=[requester_id])
+    technician = db.relationship('User', foreign_keys=[technician_id])
+
+    # the manager's archive view: same filters and orderings as the dashboard
+    __table_args__ = (
+        db.Index('idx_tickets_archive_created', 'created_at'),
+        db.Index('idx_tickets_archive_requester_created', 'requester_id', 'created_at'),
+        db.Index('idx_tickets_archive_technician_created', 'technician_id', 'created_at'),
+        db.Index('idx_tickets_archive_category_created', 'category_id', 'created_at'),
+        db.Index('idx_tickets_archive_status_created', 'status_id', 'created_at'),
+    )
+
+class ArchivedComment(db.Model):
+    __tablename__ = 'comments_archive'
+    comment_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    ticket_id = db.Column(db.Integer, db.ForeignKey('tickets_archive.ticket_id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    comment_text = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('idx_comments_archive_ticket_created', 'ticket_id', 'created_at'),
+    )
+
+class ArchivedRating(db.Model):
+    __tablename__ = 'ratings_archive'
+    rating_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    ticket_id = db.Column(db.Integer, db.ForeignKey('tickets_archive.ticket_id'), unique=True, nullable=False)
+    rating_value = db.Column(db.Integer, nullable=False)
+    feedback = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    technician_id = db.Column(db.Integer, db.ForeignKey('users.user_id'))
+    category_id = db.Column(db.Integer)
+
+# Background report/export jobs, run by database/job_worker.py (see reports/jobs.py)
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    job_id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    # job type + normalized params + data version: equal keys produce equal output
+    cache_key = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=QUEUED)
+    manager_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    worker = db.Column(db.String(100))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    output_file = db.Column(db.String(255))  # under JOB_OUTPUT_DIR
+    duration_ms = db.Column(db.Integer)
+    row_count = db.Column(db.Integer)
+    output_size = db.Column(db.BigInteger)
+
+    __table_args__ = (
+        # the worker's next queued job
+        db.Index('idx_jobs_status_id', 'status', 'job_id'),
+        # a finished job with the same output to reuse
+        db.Index('idx_jobs_cache_key', 'cache_key', 'status', 'finished_at'),
+    )
 
 class ReportLog(db.Model):
     __tablename__ = 'report_logs'
@@ -83,3 +189,95 @@ class ReportLog(db.Model):
     manager_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False)
     report_type = db.Column(db.String(50), nullable=False)
     generated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # set for reports run as jobs; the stats are the job's (filled in when it finishes)
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.job_id'))
+    duration_ms = db.Column(db.Integer)
+    row_count = db.Column(db.Integer)
+    output_size = db.Column(db.BigInteger)
+
+    job = db.relationship('Job')
+
+    __table_args__ = (
+        db.Index('idx_report_logs_job_id', 'job_id'),
+    )
+
+# Append-only history of ticket changes (see tickets/lifecycle.py)
+class TicketEvent(db.Model):
+    __tablename__ = 'ticket_events'
+    CREATED = 'created'
+    ASSIGNED = 'assigned'
+    STATUS = 'status'
+
+    event_id = db.Column(db.Integer, primary_key=True)
+    # no foreign key: the history outlives the ticket's move to tickets_archive
+    ticket_id = db.Column(db.Integer, nullable=False)
+    event_type = db.Column(db.String(20), nullable=False)
+    from_status_id = db.Column(db.Integer, db.ForeignKey('ticket_status.status_id'))
+    to_status_id = db.Column(db.Integer, db.ForeignKey('ticket_status.status_id'))
+    # assignee after the event and the ticket's category at the time
+    technician_id = db.Column(db.Integer, db.ForeignKey('users.user_id'))
+    category_id = db.Column(db.Integer)
+    actor_id = db.Column(db.Integer, db.ForeignKey('users.user_id'))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_ticket_events_ticket_type', 'ticket_id', 'event_type', 'to_status_id', 'created_at'),
+        # analytics: events of a kind within a date window (covering)
+        db.Index('idx_ticket_events_type_status_created', 'event_type', 'to_status_id', 'created_at',
+                 'ticket_id', 'technician_id', 'category_id'),
+    )
+
+@db.event.listens_for(TicketEvent, 'before_update')
+@db.event.listens_for(TicketEvent, 'before_delete')
+def _ticket_events_are_append_only(_mapper, _connection, target):
+    raise ValueError('ticket_events is append-only')
+
+# Report rollups: per-day counters maintained as tickets change (see reports/rollups.py)
+class TechnicianDailyStats(db.Model):
+    __tablename__ = 'report_technician_daily'
+    technician_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    resolved_count = db.Column(db.Integer, nullable=False, default=0)
+
+class CategoryDailyStats(db.Model):
+    __tablename__ = 'report_category_daily'
+    # 0 stands for tickets without a category
+    category_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    day = db.Column(db.Date, primary_key=True)
+    ticket_count = db.Column(db.Integer, nullable=False, default=0)
+
+# Rating aggregates, one row per technician / category: count, sum and sum of
+# squares give the mean and standard deviation, rated_1..rated_5 the histogram
+class RatingStats:
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum_sq = db.Column(db.Integer, nullable=False, default=0)
+    rated_1 = db.Column(db.Integer, nullable=False, default=0)
+    rated_2 = db.Column(db.Integer, nullable=False, default=0)
+    rated_3 = db.Column(db.Integer, nullable=False, default=0)
+    rated_4 = db.Column(db.Integer, nullable=False, default=0)
+    rated_5 = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def mean(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+    @property
+    def stddev(self):
+        if not self.rating_count:
+            return None
+        variance = self.rating_sum_sq / self.rating_count - self.mean ** 2
+        return max(variance, 0) ** 0.5
+
+    @property
+    def histogram(self):
+        return [getattr(self, f'rated_{value}') for value in range(1, 6)]
+
+class TechnicianRatingStats(RatingStats, db.Model):
+    __tablename__ = 'report_technician_ratings'
+    technician_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), primary_key=True)
+
+class CategoryRatingStats(RatingStats, db.Model):
+    __tablename__ = 'report_category_ratings'
+    # 0 stands for tickets without a category
+    category_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
@@ -0,0 +1,218 @@
+"""Opt-in per-request performance instrumentation.
+
+With ``PERF_ENABLED`` on, every request records its SQL query count and time
+(engine events), ORM rows loaded (mapper ``load`` events) and template render
+time (Flask signals). The totals are sent back in a ``Server-Timing`` header
+and aggregated per endpoint for the manager ``/reports/perf`` page. A
+statement executed ``PERF_N_PLUS_ONE_THRESHOLD`` times in one request is
+reported as a likely N+1, and with ``PERF_PROFILE`` on each request runs
+under cProfile, whose output is kept for requests slower than
+``PERF_SLOW_MS``.
+"""
+import cProfile
+import io
+import pstats
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from flask import current_app, g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from . import db
+
+DEFAULT_SLOW_MS = 500
+DEFAULT_N_PLUS_ONE_THRESHOLD = 5
+DEFAULT_LOG_SIZE = 50
+PROFILE_LINES = 30
+
+
+class RequestStats:
+    """Counters for the request being served (kept on ``g``)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.rows = 0
+        self.render_time = 0.0
+        self.statements = Counter()
+        self.profiler = None
+        self._render_started = None
+
+    def repeated(self, threshold):
+        """Statements executed at least ``threshold`` times, most repeated first."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+
+class EndpointStats:
+    __slots__ = ('requests', 'total_time', 'max_time', 'queries', 'sql_time', 'rows', 'render_time', 'n_plus_one')
+
+    def __init__(self):
+        self.requests = self.queries = self.rows = self.n_plus_one = 0
+        self.total_time = self.max_time = self.sql_time = self.render_time = 0.0
+
+    def avg(self, name):
+        return getattr(self, name) / self.requests if self.requests else 0
+
+
+class PerfStore:
+    """Per-endpoint aggregates plus recent slow and N+1 requests."""
+
+    def __init__(self, log_size=DEFAULT_LOG_SIZE):
+        self.endpoints = {}
+        self.slow = deque(maxlen=log_size)
+        self.n_plus_one = deque(maxlen=log_size)
+        self.started = datetime.utcnow()
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, stats, elapsed, repeated, profile=None):
+        with self._lock:
+            agg = self.endpoints.get(endpoint)
+            if agg is None:
+                agg = self.endpoints[endpoint] = EndpointStats()
+            agg.requests += 1
+            agg.total_time += elapsed
+            agg.max_time = max(agg.max_time, elapsed)
+            agg.queries += stats.queries
+            agg.sql_time += stats.sql_time
+            agg.rows += stats.rows
+            agg.render_time += stats.render_time
+            entry = {'at': datetime.utcnow(), 'endpoint': endpoint, 'path': request.full_path.rstrip('?'),
+                     'ms': elapsed * 1000, 'queries': stats.queries, 'sql_ms': stats.sql_time * 1000}
+            if repeated:
+                agg.n_plus_one += 1
+                self.n_plus_one.appendleft(dict(entry, statements=repeated))
+            if profile is not None:
+                self.slow.appendleft(dict(entry, profile=profile))
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = sorted(self.endpoints.items(), key=lambda item: item[1].total_time, reverse=True)
+            return endpoints, list(self.slow), list(self.n_plus_one)
+
+    def clear(self):
+        with self._lock:
+            self.endpoints.clear()
+            self.slow.clear()
+            self.n_plus_one.clear()
+            self.started = datetime.utcnow()
+
+
+def enabled():
+    return 'perf' in current_app.extensions
+
+
+def store():
+    return current_app.extensions.get('perf')
+
+
+def _current():
+    return g.get('perf_stats') if has_request_context() else None
+
+
+# Engine and mapper events are process wide; they only count while a request
+# of an app with instrumentation enabled has put a RequestStats on ``g``.
+_listeners_installed = False
+
+
+def _install_listeners():
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    _listeners_installed = True
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current() is not None:
+            conn.info.setdefault('perf_started', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current()
+        started = conn.info.get('perf_started')
+        if stats is None or not started:
+            return
+        stats.sql_time += time.perf_counter() - started.pop()
+        stats.queries += 1
+        stats.statements[statement] += 1
+
+    @event.listens_for(db.Model, 'load', propagate=True)
+    def _loaded(target, context):
+        stats = _current()
+        if stats is not None:
+            stats.rows += 1
+
+
+def _before_render(sender, template, context, **extra):
+    stats = _current()
+    if stats is not None:
+        stats._render_started = time.perf_counter()
+
+
+def _rendered(sender, template, context, **extra):
+    stats = _current()
+    if stats is not None and stats._render_started is not None:
+        stats.render_time += time.perf_counter() - stats._render_started
+        stats._render_started = None
+
+
+def _start_request():
+    stats = g.perf_stats = RequestStats()
+    if current_app.config.get('PERF_PROFILE'):
+        stats.profiler = cProfile.Profile()
+        stats.profiler.enable()
+
+
+def _stop_profiler(stats):
+    if stats.profiler is not None:
+        stats.profiler.disable()
+
+
+def _profile_text(profiler):
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_LINES)
+    return out.getvalue()
+
+
+def _finish_request(response):
+    stats = g.pop('perf_stats', None)
+    if stats is None:
+        return response
+    _stop_profiler(stats)
+    elapsed = time.perf_counter() - stats.started
+    config = current_app.config
+    repeated = stats.repeated(config.get('PERF_N_PLUS_ONE_THRESHOLD', DEFAULT_N_PLUS_ONE_THRESHOLD))
+    if repeated:
+        current_app.logger.warning('Possible N+1 in %s: %d statements repeated (%s x%d)', request.endpoint,
+                                   len(repeated), repeated[0][0].split('\n', 1)[0][:120], repeated[0][1])
+    profile = None
+    if stats.profiler is not None and elapsed * 1000 >= config.get('PERF_SLOW_MS', DEFAULT_SLOW_MS):
+        profile = _profile_text(stats.profiler)
+    store().record(request.endpoint or request.path, stats, elapsed, repeated, profile)
+    response.headers.add('Server-Timing', ', '.join([
+        f'db;dur={stats.sql_time * 1000:.1f};desc="{stats.queries} queries, {stats.rows} rows"',
+        f'render;dur={stats.render_time * 1000:.1f}',
+        f'total;dur={elapsed * 1000:.1f}',
+    ]))
+    return response
+
+
+def _teardown(_exc):
+    # after_request does not run when a view raises; just stop profiling
+    stats = g.pop('perf_stats', None)
+    if stats is not None:
+        _stop_profiler(stats)
+
+
+def init_app(app):
+    """Install the request hooks if ``PERF_ENABLED`` is set."""
+    if not app.config.get('PERF_ENABLED'):
+        return
+    app.extensions['perf'] = PerfStore(app.config.get('PERF_LOG_SIZE', DEFAULT_LOG_SIZE))
+    _install_listeners()
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown)
@@ -0,0 +1,176 @@
+"""Shared ticket list queries.
+
+Listing pages read a ticket's status, category, requester and technician for
+every row. Left to the lazy relationships that is one SELECT per row and
+relation; these helpers load everything a page needs in a fixed number of
+queries. ``TicketFilter`` turns the dashboard filter/sort args into one
+statement, so every listing filters, sorts and pages the same way.
+"""
+from datetime import datetime
+from sqlalchemy.orm import aliased, configure_mappers, joinedload
+from . import refdata
+from .models import Ticket, TicketStatus, Category, User
+from .search import filter_tickets
+from .utils import SortKey, apply_order
+
+# relationship names a listing may ask for (all many-to-one)
+RELATIONS = ('status', 'category', 'requester', 'technician')
+
+
+def ticket_listing(*relations, query=None):
+    """``Ticket.query`` (or ``query``) with ``relations`` joined-eager-loaded."""
+    # requester/technician are backrefs declared on User; make sure they exist
+    configure_mappers()
+    query = Ticket.query if query is None else query
+    options = []
+    for name in relations:
+        if name not in RELATIONS:
+            raise ValueError(f'unknown ticket relation: {name}')
+        options.append(joinedload(getattr(Ticket, name)))
+    return query.options(*options)
+
+
+def export_rows(query):
+    """Project a ticket query onto the CSV export columns.
+
+    Rows are ``(ticket_id, title, status_id, category_id, requester_first_name,
+    technician_first_name, created_at)``; status and category names come from
+    the reference-data cache, so only the two user lookups are joined.
+    """
+    requester = aliased(User)
+    technician = aliased(User)
+    return (
+        query
+        .outerjoin(requester, Ticket.requester_id == requester.user_id)
+        .outerjoin(technician, Ticket.technician_id == technician.user_id)
+        .with_entities(
+            Ticket.ticket_id,
+            Ticket.title,
+            Ticket.status_id,
+            Ticket.category_id,
+            requester.first_name,
+            technician.first_name,
+            Ticket.created_at,
+        )
+    )
+
+
+def _text(value):
+    value = (value or '').strip()
+    return value or None
+
+
+def _int(value):
+    try:
+        return int(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _date(value):
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+SORTS = ('created_desc', 'created_asc', 'status', 'category', 'relevance')
+
+# The filter args each dashboard offers (manager's also drive its exports)
+MANAGER_FILTERS = ('status', 'unassigned', 'q', 'category_id', 'start', 'end', 'sort')
+REQUESTER_FILTERS = ('status', 'q', 'category_id', 'start', 'end', 'sort')
+TECHNICIAN_FILTERS = ('status', 'q', 'category_id')
+
+
+class TicketFilter:
+    """Dashboard filter and sort args compiled into a single ticket query.
+
+    Each field is ``(attribute, request arg, parser)``; a view passes the
+    subset of args it offers and anything else is ignored. Invalid values
+    are dropped the same way the dashboards always have. ``model`` is
+    ``Ticket`` or ``ArchivedTicket``, which has the same columns.
+    """
+
+    FIELDS = (
+        ('status', 'status', _text),
+        ('unassigned', 'unassigned', _int),
+        ('keyword', 'q', _text),
+        ('category_id', 'category_id', _int),
+        ('start', 'start', _date),
+        ('end', 'end', _date),
+        ('sort', 'sort', _text),
+    )
+    ALL_ARGS = tuple(arg for _, arg, _ in FIELDS)
+
+    def __init__(self, args, allowed=ALL_ARGS, model=Ticket):
+        self.model = model
+        self.raw = {}
+        for attr, arg, parse in self.FIELDS:
+            raw = args.get(arg) if arg in allowed else None
+            self.raw[arg] = raw
+            setattr(self, attr, parse(raw))
+        if self.sort not in SORTS:
+            self.sort = 'created_desc'
+        # resolved without a query; an unknown status name filters nothing
+        self.status_id = refdata.status_id(self.status) if self.status else None
+
+    def apply(self, query):
+        """Filter and join ``query``; returns ``(query, sort_keys)``.
+
+        ``query`` is left unordered unless ``sort_keys`` is None (relevance
+        ordering), in which case it can only be paged by offset.
+        """
+        model = self.model
+        if self.status_id:
+            query = query.filter(model.status_id == self.status_id)
+        if self.unassigned:
+            query = query.filter(model.technician_id.is_(None))
+        if self.category_id:
+            query = query.filter(model.category_id == self.category_id)
+        if self.start:
+            query = query.filter(model.created_at >= self.start)
+        if self.end:
+            query = query.filter(model.created_at <= self.end)
+        query, rank = filter_tickets(query, self.keyword, model)
+        return ticket_sort(query, self.sort, rank, model)
+
+    def ordered(self, query):
+        """Like ``apply`` but always returns a fully ordered query."""
+        query, sort_keys = self.apply(query)
+        return apply_order(query, sort_keys) if sort_keys else query
+
+    def key(self, include_sort=True):
+        """Normalized, order-independent form of the effective filters, for cache keys."""
+        parts = []
+        for attr, arg, _ in self.FIELDS:
+            if attr == 'sort' and not include_sort:
+                continue
+            value = self.status_id if attr == 'status' else getattr(self, attr)
+            if attr == 'keyword' and value:
+                value = ' '.join(value.lower().split())
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            if value not in (None, 0, ''):
+                parts.append(f'{arg}={value}')
+        return '&'.join(parts)
+
+
+def ticket_sort(query, sort, rank=None, model=Ticket):
+    """Join what ``sort`` needs and return ``(query, sort_keys)``.
+
+    ``sort_keys`` is None for relevance ordering, which can only be paged by offset.
+    """
+    if sort == 'relevance' and rank is not None:
+        return query.order_by(rank, model.created_at.desc()), None
+    if sort == 'created_asc':
+        keys = [SortKey(model.created_at), SortKey(model.ticket_id)]
+    elif sort == 'status':
+        # join status for sorting by name
+        query = query.join(TicketStatus, model.status_id == TicketStatus.status_id)
+        keys = [SortKey(TicketStatus.status_name), SortKey(model.created_at, True), SortKey(model.ticket_id, True)]
+    elif sort == 'category':
+        query = query.join(Category, model.category_id == Category.category_id, isouter=True)
+        keys = [SortKey(Category.category_name, nulls_last=True), SortKey(model.created_at, True), SortKey(model.ticket_id, True)]
+    else:
+        keys = [SortKey(model.created_at, True), SortKey(model.ticket_id, True)]
+    return query, keys
@@ -1,10 +1,13 @@
 from flask import Blueprint, redirect, url_for, flash, request
 from flask_login import login_required, current_user
-from ..models import Rating, Ticket, TicketStatus
-from .. import db
+from ..models import Rating, Ticket
+from .. import db, refdata
+from ..reports import rollups
 
 ratings_bp = Blueprint('ratings', __name__, url_prefix='/ratings')
 
+RATING_VALUES = range(1, 6)
+
 @ratings_bp.route('/add', methods=['POST'])
 @login_required
 def add_rating():
@@ -14,21 +17,30 @@ def add_rating():
     if not ticket_id or not value:
         flash('Rating value required.', 'warning')
         return redirect(url_for('index'))
+    if value not in RATING_VALUES:
+        flash('Rating must be between 1 and 5.', 'warning')
+        return redirect(url_for('tickets.ticket_detail', ticket_id=ticket_id))
     ticket = Ticket.query.get_or_404(ticket_id)
     # Only requester of ticket can rate, and only if Resolved
     if ticket.requester_id != current_user.user_id:
         flash('Only the requester can rate the ticket.', 'danger')
         return redirect(url_for('tickets.ticket_detail', ticket_id=ticket_id))
-    if not ticket.status or ticket.status.status_name != 'Resolved':
+    if refdata.status_name(ticket.status_id) != 'Resolved':
         flash('You can rate only resolved tickets.', 'warning')
         return redirect(url_for('tickets.ticket_detail', ticket_id=ticket_id))
-    existing = Rating.query.filter_by(ticket_id=ticket_id).first()
+    # locked (where supported), so a concurrent update cannot take the same old value out twice
+    existing = Rating.query.filter_by(ticket_id=ticket_id).with_for_update().first()
+    # the rating aggregates change in the same transaction as the rating; an
+    # updated rating stays credited to the technician and category it was counted for
     if existing:
+        rollups.record_rating(existing.technician_id, existing.category_id, value, existing.rating_value)
         existing.rating_value = value
         existing.feedback = feedback
         flash('Rating updated.', 'success')
     else:
-        r = Rating(ticket_id=ticket_id, rating_value=value, feedback=feedback)
+        rollups.record_rating(ticket.technician_id, ticket.category_id, value)
+        r = Rating(ticket_id=ticket_id, rating_value=value, feedback=feedback,
+                   technician_id=ticket.technician_id, category_id=ticket.category_id)
         db.session.add(r)
         flash('Thank you for your rating.', 'success')
     db.session.commit()
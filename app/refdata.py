@@ -0,0 +1,121 @@
+"""Process-local cache of the ticket status and category lookup tables.
+
+Both tables are tiny and almost never change, yet nearly every request needs
+them. The cache holds an immutable snapshot per app that is swapped
+atomically, so concurrent request threads never see a half-built map. Commits
+that touch either table invalidate it; a TTL bounds staleness for writes made
+by other processes.
+"""
+import threading
+import time
+from collections import namedtuple
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from . import db
+from .models import TicketStatus, Category
+
+StatusRef = namedtuple('StatusRef', 'status_id status_name description')
+CategoryRef = namedtuple('CategoryRef', 'category_id category_name description')
+
+_Snapshot = namedtuple('_Snapshot', 'loaded_at statuses status_by_id status_by_name categories category_by_id')
+
+DEFAULT_TTL = 300
+
+
+class ReferenceCache:
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        statuses = [StatusRef(*row) for row in db.session.execute(
+            select(TicketStatus.status_id, TicketStatus.status_name, TicketStatus.description)
+            .order_by(TicketStatus.status_id))]
+        categories = [CategoryRef(*row) for row in db.session.execute(
+            select(Category.category_id, Category.category_name, Category.description)
+            .order_by(Category.category_id))]
+        return _Snapshot(
+            loaded_at=time.monotonic(),
+            statuses=tuple(statuses),
+            status_by_id={s.status_id: s for s in statuses},
+            status_by_name={s.status_name: s for s in statuses},
+            categories=tuple(categories),
+            category_by_id={c.category_id: c for c in categories},
+        )
+
+    def snapshot(self):
+        snap = self._snapshot
+        if snap is None or time.monotonic() - snap.loaded_at > self.ttl:
+            with self._lock:
+                snap = self._snapshot
+                if snap is None or time.monotonic() - snap.loaded_at > self.ttl:
+                    snap = self._snapshot = self._load()
+        return snap
+
+    def invalidate(self):
+        self._snapshot = None
+
+
+def _cache():
+    cache = current_app.extensions.get('refdata')
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            'refdata', ReferenceCache(current_app.config.get('REFDATA_TTL', DEFAULT_TTL)))
+    return cache
+
+
+def statuses():
+    return _cache().snapshot().statuses
+
+
+def status(status_id):
+    return _cache().snapshot().status_by_id.get(status_id)
+
+
+def status_by_name(name):
+    return _cache().snapshot().status_by_name.get(name)
+
+
+def status_id(name):
+    ref = status_by_name(name)
+    return ref.status_id if ref else None
+
+
+def status_name(status_id):
+    ref = status(status_id)
+    return ref.status_name if ref else None
+
+
+def categories():
+    return _cache().snapshot().categories
+
+
+def category(category_id):
+    return _cache().snapshot().category_by_id.get(category_id)
+
+
+def invalidate():
+    if has_app_context():
+        _cache().invalidate()
+
+
+# Invalidate after any commit that wrote a status or category row
+@event.listens_for(Session, 'after_flush')
+def _note_reference_writes(session, _flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (TicketStatus, Category)):
+            session.info['refdata_dirty'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    if session.info.pop('refdata_dirty', False):
+        invalidate()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_rolled_back_writes(session, _previous_transaction):
+    session.info.pop('refdata_dirty', None)
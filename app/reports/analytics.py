@@ -0,0 +1,120 @@
+"""Time-to-assign and time-to-resolve analytics over the ticket event log.
+
+A ticket's time to assign runs from its ``created`` event to its first
+``assigned`` event, its time to resolve to its first status change to
+Resolved. Tickets are counted in the window their assignment/resolution
+falls in, and grouped by the technician and category recorded on that event.
+Windows are aligned to whole days so repeated requests share one cached result
+per window (``ANALYTICS_CACHE_TTL`` seconds).
+"""
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import exists, func, select
+from sqlalchemy.orm import aliased
+from .. import db, refdata
+from ..cache import TTLCache
+from ..models import TicketEvent
+
+METRICS = ('assign', 'resolve')
+PERCENTILES = (50, 90, 95)
+# report windows offered to managers, in days
+WINDOWS = (7, 30, 90, 365)
+DEFAULT_CACHE_TTL = 300
+
+# durations in seconds; ``percentiles`` maps each of PERCENTILES to a duration
+DurationStats = namedtuple('DurationStats', 'key count mean percentiles')
+
+
+def window(days, end=None):
+    """``(start, end)`` covering the ``days`` whole days up to and including ``end`` (default today)."""
+    end = (end or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    return end - timedelta(days=days), end
+
+
+def percentile(sorted_values, pct):
+    """Linearly interpolated percentile of a sorted, non-empty list."""
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(key, durations):
+    durations.sort()
+    return DurationStats(key, len(durations), sum(durations) / len(durations),
+                         {p: percentile(durations, p) for p in PERCENTILES})
+
+
+def _event_filter(metric, events=TicketEvent):
+    if metric == 'assign':
+        # to_status_id is always NULL here; naming it lets the index range-scan created_at
+        return [events.event_type == TicketEvent.ASSIGNED, events.to_status_id.is_(None)]
+    return [events.event_type == TicketEvent.STATUS, events.to_status_id == refdata.status_id('Resolved')]
+
+
+def _first_events(metric, start, end):
+    """Rows of ``(technician_id, category_id, ticket created_at, event at)`` for the window."""
+    earlier = aliased(TicketEvent)
+    created = aliased(TicketEvent)
+    # from the ticket's "created" event: an index lookup instead of reading the wide tickets row
+    created_at = (
+        select(func.min(created.created_at))
+        .where(created.ticket_id == TicketEvent.ticket_id, created.event_type == TicketEvent.CREATED)
+        .scalar_subquery()
+    )
+    return db.session.execute(
+        select(TicketEvent.technician_id, TicketEvent.category_id, created_at, TicketEvent.created_at)
+        .where(
+            *_event_filter(metric),
+            TicketEvent.created_at >= start,
+            TicketEvent.created_at < end,
+            # only the ticket's first event of the kind counts
+            ~exists().where(earlier.ticket_id == TicketEvent.ticket_id, *_event_filter(metric, earlier),
+                            earlier.created_at < TicketEvent.created_at),
+        )
+        .execution_options(yield_per=10000)
+    )
+
+
+def compute(metric, start, end):
+    """Uncached ``{'all': stats, 'technician': [stats], 'category': [stats]}`` for one window."""
+    if metric not in METRICS:
+        raise ValueError(f'unknown metric: {metric}')
+    everything, by_technician, by_category = [], defaultdict(list), defaultdict(list)
+    for technician_id, category_id, created_at, at in _first_events(metric, start, end):
+        if created_at is None:
+            continue
+        seconds = max(0.0, (at - created_at).total_seconds())
+        everything.append(seconds)
+        by_technician[technician_id].append(seconds)
+        by_category[category_id].append(seconds)
+    return {
+        'all': summarize(None, everything) if everything else None,
+        'technician': [summarize(key, values) for key, values in sorted(by_technician.items(), key=_sort_key)],
+        'category': [summarize(key, values) for key, values in sorted(by_category.items(), key=_sort_key)],
+    }
+
+
+def _sort_key(item):
+    # unassigned / uncategorized (None) last
+    return (item[0] is None, item[0] or 0)
+
+
+def _cache():
+    cache = current_app.extensions.get('ticket_analytics')
+    if cache is None:
+        cache = current_app.extensions.setdefault('ticket_analytics', TTLCache(
+            maxsize=256, ttl=current_app.config.get('ANALYTICS_CACHE_TTL', DEFAULT_CACHE_TTL)))
+    return cache
+
+
+def durations(metric, start, end):
+    """Cached ``compute(metric, start, end)``."""
+    return _cache().get_or_set((metric, start, end), lambda: compute(metric, start, end))
+
+
+def report(days, end=None):
+    """Both metrics for the ``days``-day window ending ``end``."""
+    start, end = window(days, end)
+    return {metric: durations(metric, start, end) for metric in METRICS}
@@ -0,0 +1,325 @@
+"""Background jobs for heavy reports and exports.
+
+Submitting only inserts a ``jobs`` row and the manager's ``report_logs``
+entry; ``database/job_worker.py`` claims queued jobs and runs them on a pool
+of processes, writing each result to a file under ``JOB_OUTPUT_DIR``. The
+jobs page polls ``/reports/jobs/<id>`` and offers the download once it is done.
+
+A job's ``cache_key`` covers its type, its normalized parameters and the data
+version (latest ticket change, ticket count, latest ticket event, rating
+totals). Asking for a job with the same key reuses the stored file, or the job
+still computing it, for up to ``JOB_REUSE_MAX_AGE`` seconds instead of running
+it again.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+import traceback
+from collections import namedtuple
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, func, or_, select, update
+from .. import db, refdata
+from ..models import Job, ReportLog, Ticket, TicketEvent, User, TechnicianRatingStats, CategoryRatingStats
+from ..queries import TicketFilter, MANAGER_FILTERS
+from ..exports import ticket_csv_chunks
+from . import rollups, analytics
+
+DEFAULT_REUSE_MAX_AGE = 3600
+DEFAULT_TIMEOUT = 3600
+DEFAULT_KEEP_DAYS = 7
+MAX_ATTEMPTS = 3
+
+# params(form) -> (params to store, normalized form for the cache key); run(params, out) -> rows written
+JobKind = namedtuple('JobKind', 'label params run')
+
+
+class JobError(ValueError):
+    pass
+
+
+def _write_csv(out, header, rows):
+    """Write ``rows`` as CSV to the binary file ``out``; returns how many."""
+    text = io.TextIOWrapper(out, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow(header)
+    n = 0
+    for n, row in enumerate(rows, 1):
+        writer.writerow(row)
+    text.flush()
+    text.detach()  # leave ``out`` open for the caller
+    return n
+
+
+def _export_params(form):
+    params = {arg: form[arg] for arg in MANAGER_FILTERS if form.get(arg)}
+    return params, TicketFilter(params, MANAGER_FILTERS).key()
+
+
+def _export(params, out):
+    stats = {}
+    query = TicketFilter(params, MANAGER_FILTERS).ordered(Ticket.query)
+    for chunk in ticket_csv_chunks(query, current_app.config.get('CSV_EXPORT_BATCH_SIZE', 1000), stats):
+        out.write(chunk)
+    return stats['rows']
+
+
+def _user_names(ids):
+    ids = [i for i in ids if i]
+    return {u.user_id: f'{u.first_name} {u.last_name}' for u in
+            db.session.execute(select(User.user_id, User.first_name, User.last_name).where(User.user_id.in_(ids)))
+            } if ids else {}
+
+
+def _report(_params, out):
+    """Every row of the manager reports page, unpaginated."""
+    technicians = rollups.resolved_per_technician().all()
+    names = _user_names(tech_id for tech_id, _ in technicians)
+    tech_ratings = rollups.rating_stats(TechnicianRatingStats, [tech_id for tech_id, _ in technicians])
+    categories = {c.category_id: c.category_name for c in refdata.categories()}
+    cat_counts = rollups.tickets_per_category().all()
+    cat_ratings = rollups.rating_stats(CategoryRatingStats, [category_id for category_id, _ in cat_counts])
+    rows = [('Resolved per technician', tech_id, names.get(tech_id, 'Unknown'), count,
+             *_rating_columns(tech_ratings.get(tech_id)))
+            for tech_id, count in technicians]
+    rows += [('Tickets per category', category_id, categories.get(category_id, 'Uncategorized'), count,
+              *_rating_columns(cat_ratings.get(category_id)))
+             for category_id, count in cat_counts]
+    return _write_csv(out, ['Section', 'ID', 'Name', 'Tickets', 'Ratings', 'Average rating', 'Rating std dev'], rows)
+
+
+def _rating_columns(stats):
+    if not stats or not stats.rating_count:
+        return 0, '', ''
+    return stats.rating_count, round(stats.mean, 2), round(stats.stddev, 2)
+
+
+def _analytics_params(form):
+    try:
+        days = int(form.get('days'))
+    except (TypeError, ValueError):
+        days = None
+    if days not in analytics.WINDOWS:
+        raise JobError(f'days must be one of {", ".join(map(str, analytics.WINDOWS))}')
+    return {'days': days}, str(days)
+
+
+def _analytics(params, out):
+    results = analytics.report(params['days'])
+    names = {
+        'all': {},
+        'technician': _user_names({s.key for r in results.values() for s in r['technician']}),
+        'category': {c.category_id: c.category_name for c in refdata.categories()},
+    }
+    rows = (
+        (metric, group, s.key or '', names[group].get(s.key, '') if s.key else '', s.count, _hours(s.mean),
+         *(_hours(s.percentiles[p]) for p in analytics.PERCENTILES))
+        for metric, result in results.items()
+        for group, stats in (('all', [result['all']] if result['all'] else []),
+                             ('technician', result['technician']), ('category', result['category']))
+        for s in stats
+    )
+    return _write_csv(out, ['Metric', 'Group', 'ID', 'Name', 'Tickets', 'Mean hours',
+                            *(f'p{p} hours' for p in analytics.PERCENTILES)], rows)
+
+
+def _hours(seconds):
+    return round(seconds / 3600, 2)
+
+
+KINDS = {
+    'csv': JobKind('Ticket export', _export_params, _export),
+    'report': JobKind('Manager report', lambda form: ({}, ''), _report),
+    'analytics': JobKind('Ticket analytics', _analytics_params, _analytics),
+}
+
+
+def data_version():
+    return tuple(db.session.execute(select(
+        select(func.max(Ticket.updated_at)).scalar_subquery(),
+        select(func.count()).select_from(Ticket).scalar_subquery(),
+        select(func.max(TicketEvent.event_id)).scalar_subquery(),
+        # ratings do not touch their ticket
+        select(func.sum(CategoryRatingStats.rating_count)).scalar_subquery(),
+        select(func.sum(CategoryRatingStats.rating_sum)).scalar_subquery(),
+    )).one())
+
+
+def output_dir():
+    return current_app.config.get('JOB_OUTPUT_DIR') or os.path.join(current_app.instance_path, 'jobs')
+
+
+def output_path(job):
+    return os.path.join(output_dir(), job.output_file) if job.output_file else None
+
+
+def _stats(job):
+    return dict(duration_ms=job.duration_ms, row_count=job.row_count, output_size=job.output_size)
+
+
+def _reusable(cache_key):
+    max_age = current_app.config.get('JOB_REUSE_MAX_AGE', DEFAULT_REUSE_MAX_AGE)
+    candidates = Job.query.filter(
+        Job.cache_key == cache_key,
+        or_(Job.status.in_([Job.QUEUED, Job.RUNNING]),
+            and_(Job.status == Job.DONE, Job.finished_at >= datetime.utcnow() - timedelta(seconds=max_age))),
+    ).order_by(Job.job_id.desc()).limit(5)
+    for job in candidates:
+        if job.status != Job.DONE or os.path.exists(output_path(job) or ''):
+            return job
+    return None
+
+
+def submit(job_type, form, manager_id):
+    """Queue a job, or reuse an equal recent one; returns ``(job, reused)``.
+
+    ``form`` holds the job's parameters (request.form / a dict).
+    """
+    kind = KINDS.get(job_type)
+    if kind is None:
+        raise JobError(f'unknown job type: {job_type}')
+    params, normalized = kind.params(form)
+    raw = json.dumps([job_type, normalized, data_version()], default=str)
+    cache_key = hashlib.sha256(raw.encode()).hexdigest()
+    job = _reusable(cache_key)
+    reused = job is not None
+    if job is None:
+        job = Job(job_type=job_type, params=json.dumps(params, sort_keys=True), cache_key=cache_key,
+                  manager_id=manager_id)
+        db.session.add(job)
+        db.session.flush()
+    log = ReportLog(manager_id=manager_id, report_type=job_type, job_id=job.job_id)
+    if job.status == Job.DONE:
+        for name, value in _stats(job).items():
+            setattr(log, name, value)
+    db.session.add(log)
+    db.session.commit()
+    return job, reused
+
+
+def claim(worker, limit):
+    """Mark up to ``limit`` queued jobs as running by ``worker``; returns their ids."""
+    if limit <= 0:
+        return []
+    candidates = db.session.scalars(
+        select(Job.job_id).where(Job.status == Job.QUEUED).order_by(Job.job_id).limit(limit)).all()
+    claimed = []
+    for job_id in candidates:
+        # guarded, so two workers never take the same job
+        result = db.session.execute(
+            update(Job).where(Job.job_id == job_id, Job.status == Job.QUEUED)
+            .values(status=Job.RUNNING, started_at=datetime.utcnow(), worker=worker, attempts=Job.attempts + 1))
+        if result.rowcount == 1:
+            claimed.append(job_id)
+    db.session.commit()
+    return claimed
+
+
+def fail(job_id, error, **claim):
+    """Mark a job failed.
+
+    ``claim`` (``attempts=`` or ``worker=``) limits this to that run of the
+    job while it is still running, so a run that was presumed dead and
+    requeued cannot fail the retry.
+    """
+    where = [Job.job_id == job_id]
+    if claim:
+        where += [Job.status == Job.RUNNING, *(getattr(Job, name) == value for name, value in claim.items())]
+    db.session.execute(update(Job).where(*where)
+                       .values(status=Job.FAILED, finished_at=datetime.utcnow(), error=error[-4000:]))
+    db.session.commit()
+
+
+def _remove(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def run(job_id):
+    """Run a claimed job in this process and record its stats (or error); True if it succeeded."""
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return False
+    attempt = job.attempts
+    kind = KINDS.get(job.job_type)
+    if kind is None:
+        fail(job_id, f'unknown job type: {job.job_type}', attempts=attempt)
+        return False
+    directory = output_dir()
+    os.makedirs(directory, exist_ok=True)
+    # one file per attempt: a slow run that requeue_stale gave up on may
+    # still be writing while the retry runs
+    name = f'job-{job.job_id}-{attempt}.csv'
+    path = os.path.join(directory, name)
+    params = json.loads(job.params)
+    start = time.perf_counter()
+    try:
+        with open(path + '.tmp', 'wb') as out:
+            rows = kind.run(params, out)
+        os.replace(path + '.tmp', path)
+    except Exception:
+        db.session.rollback()
+        _remove(path + '.tmp')
+        fail(job_id, traceback.format_exc(), attempts=attempt)
+        return False
+    stats = dict(duration_ms=int((time.perf_counter() - start) * 1000), row_count=rows,
+                 output_size=os.path.getsize(path))
+    try:
+        done = db.session.execute(
+            update(Job).where(Job.job_id == job_id, Job.status == Job.RUNNING, Job.attempts == attempt)
+            .values(status=Job.DONE, finished_at=datetime.utcnow(), output_file=name, error=None, **stats)).rowcount
+        if done:
+            db.session.execute(update(ReportLog).where(ReportLog.job_id == job_id).values(**stats))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        _remove(path)
+        raise
+    if not done:
+        # superseded by a retry, or failed meanwhile
+        _remove(path)
+    return bool(done)
+
+
+def requeue_stale():
+    """Jobs left running longer than ``JOB_TIMEOUT`` (a worker died): retry them, or fail after MAX_ATTEMPTS."""
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config.get('JOB_TIMEOUT', DEFAULT_TIMEOUT))
+    stale = (Job.status == Job.RUNNING, Job.started_at < cutoff)
+    requeued = db.session.execute(update(Job).where(*stale, Job.attempts < MAX_ATTEMPTS)
+                                  .values(status=Job.QUEUED, worker=None)).rowcount
+    db.session.execute(update(Job).where(*stale)
+                       .values(status=Job.FAILED, finished_at=datetime.utcnow(), error='timed out'))
+    db.session.commit()
+    return requeued
+
+
+def prune():
+    """Delete output files older than ``JOB_KEEP_DAYS``; returns how many."""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config.get('JOB_KEEP_DAYS', DEFAULT_KEEP_DAYS))
+    old = Job.query.filter(Job.status == Job.DONE, Job.finished_at < cutoff, Job.output_file.isnot(None)).all()
+    for job in old:
+        try:
+            os.remove(output_path(job))
+        except OSError:
+            pass
+        job.output_file = None
+    db.session.commit()
+    return len(old)
+
+
+def describe(job):
+    """``key=value`` summary of a job's parameters, for listing."""
+    return ', '.join(f'{k}={v}' for k, v in json.loads(job.params).items())
+
+
+def job_dict(job):
+    done = job.status == Job.DONE and job.output_file is not None
+    return dict(job_id=job.job_id, job_type=job.job_type, label=KINDS[job.job_type].label if job.job_type in KINDS
+                else job.job_type, status=job.status, params=json.loads(job.params),
+                created_at=job.created_at.isoformat() if job.created_at else None,
+                finished_at=job.finished_at.isoformat() if job.finished_at else None,
+                error=job.error.strip().splitlines()[-1] if job.error else None,
+                downloadable=done, **_stats(job))
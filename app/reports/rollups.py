@@ -0,0 +1,173 @@
+"""Incrementally maintained report rollups.
+
+``report_technician_daily`` counts resolutions credited to each technician per
+day and ``report_category_daily`` counts tickets created per category per day.
+``report_technician_ratings`` and ``report_category_ratings`` hold the count,
+sum, sum of squares and 1-5 histogram of the ratings per technician and
+category. All are bumped inside the transaction that changes the ticket or
+rating, so the reports page only reads a handful of small rows. ``rebuild()``
+recomputes them from the tickets and ratings tables and their archives.
+"""
+from datetime import datetime
+from sqlalchemy import case, delete, func, insert, select, union_all, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from .. import db, refdata
+from ..models import (Ticket, ArchivedTicket, TicketEvent, Rating, ArchivedRating, TechnicianDailyStats,
+                      CategoryDailyStats, TechnicianRatingStats, CategoryRatingStats)
+
+NO_CATEGORY = 0
+
+
+def bump(model, column, delta=1, **key):
+    """Add ``delta`` to ``model.column`` for the row with primary key ``key``, creating it if needed."""
+    bump_many(model, {column: delta}, **key)
+
+
+def bump_many(model, deltas, **key):
+    """Like ``bump`` for several columns at once; ``deltas`` maps column names to amounts."""
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+    added = {column: table.c[column] + delta for column, delta in deltas.items()}
+    if dialect in ('sqlite', 'mysql'):
+        values = dict(key, **deltas)
+        if dialect == 'sqlite':
+            stmt = sqlite_insert(table).values(**values).on_conflict_do_update(
+                index_elements=list(key), set_=added)
+        else:
+            stmt = mysql_insert(table).values(**values).on_duplicate_key_update(added)
+        db.session.execute(stmt)
+        return
+    where = [table.c[name] == value for name, value in key.items()]
+    result = db.session.execute(update(table).where(*where).values(added))
+    if result.rowcount == 0:
+        db.session.execute(insert(table).values(dict(key, **deltas)))
+
+
+def record_created(category_id, created_at=None, count=1):
+    day = (created_at or datetime.utcnow()).date()
+    bump(CategoryDailyStats, 'ticket_count', count, category_id=category_id or NO_CATEGORY, day=day)
+
+
+def record_status_change(technician_id, new_status_id, changed_at=None, count=1):
+    # Resolutions are credited to the assigned technician on the day they
+    # happen, and stay with them if the ticket is reassigned later
+    if technician_id and new_status_id == refdata.status_id('Resolved'):
+        day = (changed_at or datetime.utcnow()).date()
+        bump(TechnicianDailyStats, 'resolved_count', count, technician_id=technician_id, day=day)
+
+
+def _rating_deltas(value, sign):
+    deltas = {'rating_count': sign, 'rating_sum': sign * value, 'rating_sum_sq': sign * value * value}
+    if 1 <= value <= 5:  # older ratings were not range-checked
+        deltas[f'rated_{value}'] = sign
+    return deltas
+
+
+def record_rating(technician_id, category_id, new_value, old_value=None):
+    """Count a new rating, or move an updated one from ``old_value`` to ``new_value``.
+
+    Pass the technician and category stored on the rating (the ticket's when
+    it was first rated), not the ticket's current ones: a reassigned ticket's
+    rating stays credited where it was counted.
+    """
+    if new_value == old_value:
+        return
+    deltas = _rating_deltas(new_value, 1)
+    if old_value is not None:
+        for column, delta in _rating_deltas(old_value, -1).items():
+            deltas[column] = deltas.get(column, 0) + delta
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    if technician_id:
+        bump_many(TechnicianRatingStats, deltas, technician_id=technician_id)
+    bump_many(CategoryRatingStats, deltas, category_id=category_id or NO_CATEGORY)
+
+
+def rebuild():
+    """Recompute the rollups from scratch (caller commits)."""
+    for model in (CategoryDailyStats, TechnicianDailyStats, CategoryRatingStats, TechnicianRatingStats):
+        db.session.execute(delete(model))
+    tickets = union_all(*(
+        select(model.ticket_id, model.category_id, model.status_id, model.technician_id, model.created_at,
+               model.updated_at)
+        for model in (Ticket, ArchivedTicket))).subquery('all_tickets')
+    day = func.date(tickets.c.created_at)
+    category = func.coalesce(tickets.c.category_id, NO_CATEGORY)
+    db.session.execute(insert(CategoryDailyStats).from_select(
+        ['category_id', 'day', 'ticket_count'],
+        select(category, day, func.count()).group_by(category, day)))
+    _rebuild_resolved(tickets)
+    _rebuild_ratings()
+
+
+def _rebuild_resolved(tickets):
+    # Resolutions are credited like record_status_change does: to the
+    # technician on the Resolved event, so a later reassignment does not move
+    # them. Tickets from before the event log fall back to their current
+    # technician and last update, if they are now Resolved or Closed.
+    resolved_id = refdata.status_id('Resolved')
+    done = [sid for sid in (resolved_id, refdata.status_id('Closed')) if sid]
+    if not done:
+        return
+    resolved = [TicketEvent.event_type == TicketEvent.STATUS, TicketEvent.to_status_id == resolved_id]
+    has_event = (select(TicketEvent.event_id)
+                 .where(TicketEvent.ticket_id == tickets.c.ticket_id, *resolved).exists())
+    credited = union_all(
+        select(TicketEvent.technician_id, func.date(TicketEvent.created_at).label('day'))
+        .where(*resolved, TicketEvent.technician_id.isnot(None)),
+        select(tickets.c.technician_id, func.date(tickets.c.updated_at))
+        .where(tickets.c.status_id.in_(done), tickets.c.technician_id.isnot(None), ~has_event),
+    ).subquery('credited')
+    db.session.execute(insert(TechnicianDailyStats).from_select(
+        ['technician_id', 'day', 'resolved_count'],
+        select(credited.c.technician_id, credited.c.day, func.count())
+        .group_by(credited.c.technician_id, credited.c.day)))
+
+
+def _rebuild_ratings():
+    # from the technician and category stored on each rating, as record_rating credits them
+    ratings = union_all(*(select(model.technician_id, model.category_id, model.rating_value)
+                          for model in (Rating, ArchivedRating))).subquery('all_ratings')
+    value = ratings.c.rating_value
+    columns = ['rating_count', 'rating_sum', 'rating_sum_sq', *(f'rated_{v}' for v in range(1, 6))]
+    aggregates = [func.count(), func.sum(value), func.sum(value * value),
+                  *(func.sum(case((value == v, 1), else_=0)) for v in range(1, 6))]
+    category = func.coalesce(ratings.c.category_id, NO_CATEGORY)
+    db.session.execute(insert(CategoryRatingStats).from_select(
+        ['category_id', *columns], select(category, *aggregates).group_by(category)))
+    db.session.execute(insert(TechnicianRatingStats).from_select(
+        ['technician_id', *columns],
+        select(ratings.c.technician_id, *aggregates)
+        .where(ratings.c.technician_id.isnot(None)).group_by(ratings.c.technician_id)))
+
+
+def resolved_per_technician():
+    """Query of ``(technician_id, resolved)`` ordered by technician."""
+    return (
+        db.session.query(TechnicianDailyStats.technician_id, func.sum(TechnicianDailyStats.resolved_count))
+        .group_by(TechnicianDailyStats.technician_id)
+        .order_by(TechnicianDailyStats.technician_id)
+    )
+
+
+def tickets_per_category():
+    """Query of ``(category_id, tickets)``; category 0 collects uncategorized tickets."""
+    return (
+        db.session.query(CategoryDailyStats.category_id, func.sum(CategoryDailyStats.ticket_count))
+        .group_by(CategoryDailyStats.category_id)
+        .order_by(CategoryDailyStats.category_id)
+    )
+
+
+def rating_stats(model, ids):
+    """``{id: stats row}`` of ``model`` (a rating aggregate) for the given technician or category ids."""
+    key = model.__table__.primary_key.columns.values()[0]
+    return {getattr(row, key.name): row for row in model.query.filter(key.in_(ids))} if ids else {}
+
+
+def overall_rating():
+    """Totals over every rating, summed from the per-category rows (each rating is in exactly one)."""
+    columns = ('rating_count', 'rating_sum', 'rating_sum_sq', *(f'rated_{v}' for v in range(1, 6)))
+    sums = db.session.execute(select(*(func.coalesce(func.sum(getattr(CategoryRatingStats, c)), 0)
+                                       for c in columns))).one()
+    return CategoryRatingStats(**dict(zip(columns, sums)))
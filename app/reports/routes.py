@@ -1,11 +1,16 @@
-from flask import Blueprint, render_template, request
-from flask_login import login_required
-from sqlalchemy import func
-from ..models import Ticket, User, Role, TicketStatus, Category
+import os
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, abort
+from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
+from ..models import User, Role, Job, ReportLog, TechnicianRatingStats, CategoryRatingStats
 from ..utils import role_required, paginate
+from .. import refdata, perf, fragments
+from . import rollups, analytics, jobs
 
 reports_bp = Blueprint('reports', __name__, url_prefix='/reports')
 
+JOB_LIST_SIZE = 50
+
 @reports_bp.route('/')
 @login_required
 @role_required(Role.manager)
@@ -15,52 +20,110 @@ def manager_reports():
     cat_page = request.args.get('cat_page', type=int, default=1)
     per_page = 10
 
-    # Tickets resolved per technician
-    resolved = TicketStatus.query.filter_by(status_name='Resolved').first()
-    tickets_per_tech = []
-    if resolved:
-        tickets_per_tech = (
-            Ticket.query
-            .with_entities(Ticket.technician_id, func.count(Ticket.ticket_id))
-            .filter(Ticket.status_id == resolved.status_id, Ticket.technician_id.isnot(None))
-            .group_by(Ticket.technician_id)
-            .all()
-        )
-    tech_map = {u.user_id: f"{u.first_name} {u.last_name}" for u in User.query.filter_by(role=Role.technician).all()}
+    # Tickets resolved per technician, summed from the daily rollup
+    tickets_per_tech_paginated = paginate(rollups.resolved_per_technician(), tech_page, per_page)
+    tech_ids = [tech_id for tech_id, _ in tickets_per_tech_paginated['items']]
+    tech_map = {u.user_id: f"{u.first_name} {u.last_name}"
+                for u in User.query.filter(User.user_id.in_(tech_ids)).all()} if tech_ids else {}
 
     # Tickets by category
-    tickets_by_category = (
-        Ticket.query
-        .with_entities(Ticket.category_id, func.count(Ticket.ticket_id))
-        .group_by(Ticket.category_id)
-        .all()
-    )
-    cat_map = {c.category_id: c.category_name for c in Category.query.all()}
-
-    # Paginate lists and logic
-    def list_paginate(data, page):
-        total = len(data)
-        pages = (total + per_page - 1) // per_page if total else 1
-        if page < 1: page = 1
-        if page > pages: page = pages
-        start = (page - 1) * per_page
-        end = start + per_page
-        items = data[start:end]
-        return {
-            'items': items,
-            'page': page,
-            'per_page': per_page,
-            'total': total,
-            'pages': pages,
-            'has_prev': page > 1,
-            'has_next': page < pages
-        }
+    category_paginated = paginate(rollups.tickets_per_category(), cat_page, per_page)
+    cat_map = {c.category_id: c.category_name for c in refdata.categories()}
 
-    tickets_per_tech_paginated = list_paginate(tickets_per_tech, tech_page)
-    category_paginated = list_paginate(tickets_by_category, cat_page)
+    # Satisfaction from the rating aggregates: one row per listed technician / category
+    tech_ratings = rollups.rating_stats(TechnicianRatingStats, tech_ids)
+    cat_ratings = rollups.rating_stats(CategoryRatingStats,
+                                       [cat_id for cat_id, _ in category_paginated['items']])
 
     return render_template('reports/manager.html',
                            tickets_per_tech_paginated=tickets_per_tech_paginated,
                            tech_map=tech_map,
                            category_paginated=category_paginated,
-                           cat_map=cat_map)
+                           cat_map=cat_map,
+                           tech_ratings=tech_ratings,
+                           cat_ratings=cat_ratings,
+                           overall=rollups.overall_rating())
+
+@reports_bp.route('/analytics')
+@login_required
+@role_required(Role.manager)
+def ticket_analytics():
+    days = request.args.get('days', type=int)
+    if days not in analytics.WINDOWS:
+        days = 30
+    results = analytics.report(days)
+    tech_ids = {s.key for r in results.values() for s in r['technician'] if s.key}
+    tech_map = {u.user_id: f"{u.first_name} {u.last_name}"
+                for u in User.query.filter(User.user_id.in_(tech_ids)).all()} if tech_ids else {}
+    cat_map = {c.category_id: c.category_name for c in refdata.categories()}
+    return render_template('reports/analytics.html', results=results, days=days, windows=analytics.WINDOWS,
+                           percentiles=analytics.PERCENTILES, tech_map=tech_map, cat_map=cat_map)
+
+@reports_bp.route('/perf', methods=['GET', 'POST'])
+@login_required
+@role_required(Role.manager)
+def perf_report():
+    store = perf.store()
+    fragment_cache = fragments.fragment_cache()
+    if request.method == 'POST':
+        if store is not None:
+            store.clear()
+        if fragment_cache is not None:
+            fragment_cache.reset_stats()
+        flash('Performance counters reset.', 'success')
+        return redirect(url_for('reports.perf_report'))
+    endpoints, slow, n_plus_one = store.snapshot() if store is not None else ([], [], [])
+    return render_template('reports/perf.html', enabled=store is not None, store=store,
+                           endpoints=endpoints, slow=slow, n_plus_one=n_plus_one,
+                           fragment_stats=fragment_cache.stats() if fragment_cache is not None else None)
+
+@reports_bp.route('/jobs', methods=['POST'])
+@login_required
+@role_required(Role.manager)
+def submit_job():
+    # the form carries the job type and its parameters (dashboard filters, days)
+    try:
+        job, reused = jobs.submit(request.form.get('job_type'), request.form, current_user.user_id)
+    except jobs.JobError as e:
+        flash(str(e), 'warning')
+        return redirect(url_for('reports.job_list'))
+    label = jobs.KINDS[job.job_type].label
+    if not reused:
+        flash(f'{label} #{job.job_id} queued.', 'success')
+    elif job.status == Job.DONE:
+        flash(f'Nothing changed since {label.lower()} #{job.job_id}; it is ready to download.', 'info')
+    else:
+        flash(f'{label} #{job.job_id} with the same data is already being prepared.', 'info')
+    return redirect(url_for('reports.job_list'))
+
+@reports_bp.route('/jobs')
+@login_required
+@role_required(Role.manager)
+def job_list():
+    logs = (ReportLog.query.options(joinedload(ReportLog.job))
+            .filter(ReportLog.manager_id == current_user.user_id, ReportLog.job_id.isnot(None))
+            .order_by(ReportLog.report_id.desc())
+            .limit(JOB_LIST_SIZE).all())
+    return render_template('reports/jobs.html', logs=logs, kinds=jobs.KINDS, describe=jobs.describe,
+                           finished=(Job.DONE, Job.FAILED))
+
+@reports_bp.route('/jobs/<int:job_id>')
+@login_required
+@role_required(Role.manager)
+def job_status(job_id):
+    """Polled by the jobs page until the job is done or failed."""
+    job = Job.query.get_or_404(job_id)
+    out = jobs.job_dict(job)
+    out['download_url'] = url_for('reports.job_download', job_id=job_id) if out['downloadable'] else None
+    return jsonify(job=out)
+
+@reports_bp.route('/jobs/<int:job_id>/download')
+@login_required
+@role_required(Role.manager)
+def job_download(job_id):
+    job = Job.query.get_or_404(job_id)
+    path = jobs.output_path(job) if job.status == Job.DONE else None
+    if not path or not os.path.exists(path):
+        abort(404)
+    return send_file(path, mimetype='text/csv', as_attachment=True,
+                     download_name=f'{job.job_type}-{job.job_id}.csv')
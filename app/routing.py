@@ -0,0 +1,86 @@
+"""Read-replica routing.
+
+With ``DB_REPLICA_URLS`` set, each replica becomes a ``replica_<n>`` bind and
+``RoutingSession`` sends the reads of GET/HEAD requests to blueprints listed
+in ``DB_REPLICA_BLUEPRINTS`` to one of them (picked per request). Everything
+else uses the primary: flushes and DML, other blueprints, work outside a
+request, the rest of a request once it has written, and, for
+``DB_READ_AFTER_WRITE_SECONDS`` after a write, the same browser (a cookie),
+so users see their own changes despite replication lag.
+"""
+import random
+import time
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND_PREFIX = 'replica_'
+READ_AFTER_WRITE_COOKIE = 'db_primary_until'
+READ_METHODS = ('GET', 'HEAD')
+
+
+def replica_binds(urls):
+    """``SQLALCHEMY_BINDS`` keys for ``urls``, in order."""
+    return [f'{REPLICA_BIND_PREFIX}{i}' for i in range(len(urls))]
+
+
+def force_primary():
+    """Serve the rest of this request's reads from the primary."""
+    if has_request_context():
+        g.db_use_primary = True
+
+
+def _replica_key():
+    """The replica bind this request reads from, or None for the primary."""
+    if not has_request_context() or g.get('db_wrote') or g.get('db_use_primary'):
+        return None
+    key = g.get('db_replica', False)
+    if key is not False:
+        return key
+    key = None
+    config = current_app.config
+    urls = config.get('DB_REPLICA_URLS')
+    if (urls and request.method in READ_METHODS
+            and request.blueprint in config.get('DB_REPLICA_BLUEPRINTS', ())
+            and request.cookies.get(READ_AFTER_WRITE_COOKIE, type=float, default=0) < time.time()):
+        key = random.choice(replica_binds(urls))
+    g.db_replica = key
+    return key
+
+
+def _note_write():
+    if has_request_context():
+        g.db_wrote = True
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that reads from a replica when the request allows it."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                _note_write()
+            else:
+                key = _replica_key()
+                if key is not None:
+                    return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _read_after_write_cookie(response):
+    if g.get('db_wrote'):
+        window = current_app.config.get('DB_READ_AFTER_WRITE_SECONDS', 5)
+        if window:
+            response.set_cookie(READ_AFTER_WRITE_COOKIE, f'{time.time() + window:.3f}', max_age=int(window) + 1,
+                                httponly=True, samesite='Lax')
+    return response
+
+
+def configure(app, engine_options):
+    """Add the replica binds to the config; call before ``db.init_app``."""
+    urls = app.config.get('DB_REPLICA_URLS') or []
+    if not urls:
+        return
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    for key, url in zip(replica_binds(urls), urls):
+        binds.setdefault(key, dict(engine_options(app.config, url), url=url))
+    app.after_request(_read_after_write_cookie)
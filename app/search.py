@@ -0,0 +1,135 @@
+"""Keyword search over ticket titles and descriptions.
+
+SQLite databases get an FTS5 table (``tickets_fts``) kept in sync with
+``tickets`` by triggers, MySQL gets a FULLTEXT index. Any other backend, or a
+database where the index has not been created yet, falls back to ILIKE.
+"""
+import re
+import weakref
+from sqlalchemy import column, event, literal_column, or_, select, table, text
+from sqlalchemy.dialects.mysql import match as mysql_match
+from . import db
+from .models import Ticket
+
+FTS_TABLE = 'tickets_fts'
+FULLTEXT_INDEX = 'idx_tickets_fulltext'
+
+# MySQL ignores words shorter than innodb_ft_min_token_size (3 by default)
+MYSQL_MIN_TOKEN = 3
+
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "title, description, content='tickets', content_rowid='ticket_id')",
+    f"""CREATE TRIGGER IF NOT EXISTS tickets_fts_ai AFTER INSERT ON tickets BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.ticket_id, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tickets_fts_ad AFTER DELETE ON tickets BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) VALUES ('delete', old.ticket_id, old.title, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS tickets_fts_au AFTER UPDATE OF title, description ON tickets BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) VALUES ('delete', old.ticket_id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.ticket_id, new.title, new.description);
+    END""",
+]
+MYSQL_DDL = [f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX} ON tickets (title, description)"]
+
+_fts = table(FTS_TABLE, column('rowid'), column('rank'))
+
+# engine -> 'fts5' | 'mysql' | 'like'
+_backends = weakref.WeakKeyDictionary()
+
+
+def install_search_index(connection):
+    """Create the search index for ``connection``'s backend if it supports one."""
+    name = connection.dialect.name
+    if name == 'sqlite':
+        statements = SQLITE_DDL
+    elif name == 'mysql':
+        statements = MYSQL_DDL
+    else:
+        return
+    for stmt in statements:
+        connection.execute(text(stmt))
+    if name == 'sqlite':
+        connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def _on_tickets_created(target, connection, **kw):
+    try:
+        install_search_index(connection)
+    except Exception:
+        # e.g. SQLite compiled without FTS5; searches fall back to ILIKE
+        pass
+
+
+def register_search_index():
+    """Build the index whenever ``db.create_all()`` creates the tickets table."""
+    if not event.contains(Ticket.__table__, 'after_create', _on_tickets_created):
+        event.listen(Ticket.__table__, 'after_create', _on_tickets_created)
+
+
+def search_backend(engine=None):
+    engine = engine or db.engine
+    backend = _backends.get(engine)
+    if backend is None:
+        backend = 'like'
+        with engine.connect() as conn:
+            if engine.dialect.name == 'sqlite':
+                found = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"), {'name': FTS_TABLE}).first()
+                if found:
+                    backend = 'fts5'
+            elif engine.dialect.name == 'mysql':
+                found = conn.execute(text(
+                    "SHOW INDEX FROM tickets WHERE Index_type = 'FULLTEXT'")).first()
+                if found:
+                    backend = 'mysql'
+        _backends[engine] = backend
+    return backend
+
+
+def reset_search_backend(engine=None):
+    """Forget the detected backend, e.g. after installing the index at runtime."""
+    _backends.pop(engine or db.engine, None)
+
+
+def _like_filter(query, tokens, model=Ticket):
+    for token in tokens:
+        like = f"%{token}%"
+        query = query.filter(model.title.ilike(like) | model.description.ilike(like))
+    return query
+
+
+def filter_tickets(query, keyword, model=Ticket):
+    """Restrict ``query`` to tickets matching ``keyword``.
+
+    Returns ``(query, rank)``; ``rank`` is an ORDER BY clause putting the best
+    matches first, or None when the backend cannot rank results. Only
+    ``tickets`` is indexed; other models (the archive) are searched with ILIKE.
+    """
+    keyword = (keyword or '').strip()
+    if not keyword:
+        return query, None
+    tokens = re.findall(r'\w+', keyword)
+    backend = search_backend() if tokens and model is Ticket else 'like'
+    if backend == 'fts5':
+        # every token must match, as a prefix so "print" finds "printer"
+        expr = ' '.join('"%s"*' % t.replace('"', '""') for t in tokens)
+        hits = (
+            select(_fts.c.rowid.label('ticket_id'), _fts.c.rank.label('rank'))
+            .where(literal_column(FTS_TABLE).op('MATCH')(expr))
+            .subquery('search_hits')
+        )
+        query = query.join(hits, hits.c.ticket_id == Ticket.ticket_id)
+        return query, hits.c.rank.asc()
+    if backend == 'mysql':
+        indexed = [t for t in tokens if len(t) >= MYSQL_MIN_TOKEN]
+        short = [t for t in tokens if len(t) < MYSQL_MIN_TOKEN]
+        if not indexed:
+            return _like_filter(query, short), None
+        relevance = mysql_match(Ticket.title, Ticket.description,
+                                against=' '.join(f'+{t}*' for t in indexed)).in_boolean_mode()
+        query = _like_filter(query.filter(relevance > 0), short)
+        return query, relevance.desc()
+    like = f"%{keyword}%"
+    return query.filter(or_(model.title.ilike(like), model.description.ilike(like))), None
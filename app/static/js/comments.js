@@ -0,0 +1,101 @@
+// Comment thread on ticket detail (app/comments/thread.py). Loads older pages
+// and newer comments as HTML fragments, posts new comments without reloading
+// the page and, with the change feed on, picks up other people's comments.
+(function () {
+  const script = document.currentScript;
+  const thread = document.querySelector('[data-comments-url]');
+  if (!thread || !window.fetch) return;
+  const list = thread.querySelector('ul');
+
+  function load(cursor) {
+    const url = new URL(thread.dataset.commentsUrl, location.href);
+    if (cursor) url.searchParams.set('cursor', cursor);
+    return fetch(url, { credentials: 'same-origin', headers: { Accept: 'application/json' } })
+      .then((r) => (r.ok ? r.json() : Promise.reject(r.status)));
+  }
+
+  function fragment(html) {
+    const t = document.createElement('template');
+    t.innerHTML = html;
+    return t.content;
+  }
+
+  const older = thread.querySelector('[data-older]');
+  if (older) {
+    older.addEventListener('click', () => {
+      older.disabled = true;
+      load(older.dataset.older).then((page) => {
+        // keep the comments being read where they are
+        const height = list.scrollHeight;
+        list.prepend(fragment(page.html));
+        list.scrollTop += list.scrollHeight - height;
+        if (page.older) {
+          older.dataset.older = page.older;
+          older.disabled = false;
+        } else {
+          older.remove();
+        }
+      }).catch(() => { older.disabled = false; });
+    });
+  }
+
+  let busy = false;
+  let again = false;
+  function loadNewer() {
+    if (busy) {
+      again = true;
+      return;
+    }
+    busy = true;
+    load(thread.dataset.newer).then((page) => {
+      const items = fragment(page.html);
+      // a comment posted from this page may also arrive through the feed
+      items.querySelectorAll('[data-comment-id]').forEach((li) => {
+        if (list.querySelector(`[data-comment-id="${li.dataset.commentId}"]`)) li.remove();
+      });
+      if (items.children.length) {
+        list.append(items);
+        list.scrollTop = list.scrollHeight;
+        const empty = thread.querySelector('[data-no-comments]');
+        if (empty) empty.remove();
+      }
+      if (page.newer) thread.dataset.newer = page.newer;
+      if (page.more_newer) again = true;
+    }).catch(() => {}).finally(() => {
+      busy = false;
+      if (again) {
+        again = false;
+        loadNewer();
+      }
+    });
+  }
+
+  const form = document.getElementById('comment-form');
+  if (form) {
+    form.addEventListener('submit', (e) => {
+      e.preventDefault();
+      const button = form.querySelector('button[type=submit]');
+      button.disabled = true;
+      fetch(form.action, {
+        method: 'POST', body: new FormData(form), credentials: 'same-origin', headers: { Accept: 'application/json' },
+      }).then((r) => r.json().then((body) => (r.ok ? body : Promise.reject(body.error))))
+        .then(() => {
+          form.reset();
+          loadNewer();
+        })
+        .catch((error) => alert(typeof error === 'string' ? error : 'The comment could not be posted.'))
+        .finally(() => { button.disabled = false; });
+    });
+  }
+
+  const liveUrl = script && script.dataset.liveUrl;
+  if (liveUrl && window.EventSource) {
+    const ticketId = Number(script.dataset.ticketId);
+    const source = new EventSource(liveUrl, { withCredentials: true });
+    source.addEventListener('ticket', (e) => {
+      const change = JSON.parse(e.data);
+      if (change.ticket_id === ticketId && change.type === 'comment') loadNewer();
+    });
+    source.addEventListener('reset', () => source.close());
+  }
+})();
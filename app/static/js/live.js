@@ -0,0 +1,86 @@
+// Live dashboard rows. Listens to the change feed (app/changefeed.py) and
+// re-fetches only the rows of tickets that changed, with the page's filters.
+(function () {
+  const body = document.querySelector('tbody[data-live-url]');
+  if (!body || !window.EventSource) return;
+  const pageArgs = new URLSearchParams(location.search);
+  pageArgs.delete('cursor');
+  pageArgs.delete('page');
+
+  const withArgs = (base) => {
+    const url = new URL(base, location.href);
+    pageArgs.forEach((value, key) => url.searchParams.append(key, value));
+    return url;
+  };
+
+  const source = new EventSource(withArgs(body.dataset.liveUrl), { withCredentials: true });
+  const changed = new Set();
+  let timer = null;
+  let unseen = 0;
+
+  source.addEventListener('ticket', (e) => {
+    changed.add(String(JSON.parse(e.data).ticket_id));
+    // a burst of events (bulk actions) becomes one request
+    if (!timer) timer = setTimeout(refresh, 300);
+  });
+  // events were missed (slow client, server restart): the page may be stale
+  source.addEventListener('reset', () => {
+    source.close();
+    notice('Live updates stopped.');
+  });
+
+  function notice(text) {
+    let box = document.getElementById('live-notice');
+    if (!box) {
+      box = document.createElement('div');
+      box.id = 'live-notice';
+      box.className = 'live-notice';
+      body.closest('table').before(box);
+    }
+    box.textContent = text + ' ';
+    const link = document.createElement('a');
+    link.href = location.href;
+    link.textContent = 'Refresh';
+    box.append(link);
+  }
+
+  function highlight(row) {
+    row.classList.add('row-updated');
+    setTimeout(() => row.classList.remove('row-updated'), 2000);
+  }
+
+  function refresh() {
+    timer = null;
+    const ids = [...changed];
+    changed.clear();
+    const url = withArgs(body.dataset.rowsUrl);
+    url.searchParams.set('ids', ids.join(','));
+    fetch(url, { credentials: 'same-origin' })
+      .then((r) => (r.ok ? r.text() : Promise.reject(r.status)))
+      .then((html) => {
+        const fresh = document.createElement('tbody');
+        fresh.innerHTML = html;
+        const rows = new Map([...fresh.querySelectorAll('tr[data-ticket-id]')].map((r) => [r.dataset.ticketId, r]));
+        ids.forEach((id) => {
+          const current = body.querySelector(`tr[data-ticket-id="${id}"]`);
+          const next = rows.get(id);
+          if (current && next) {
+            const box = current.querySelector('input[name=ticket_ids]');
+            if (box && box.checked) next.querySelector('input[name=ticket_ids]').checked = true;
+            current.replaceWith(next);
+            highlight(next);
+          } else if (current) {
+            current.remove(); // no longer matches this page's filters
+          } else if (next && body.dataset.livePrepend) {
+            body.querySelectorAll('tr:not([data-ticket-id])').forEach((r) => r.remove());
+            body.prepend(next);
+            highlight(next);
+          } else if (next) {
+            unseen += 1;
+          }
+        });
+        if (unseen) notice(`${unseen} matching ticket(s) changed outside this page.`);
+      })
+      .catch(() => {});
+  }
+})();
@@ -0,0 +1,125 @@
+"""Archival of long-closed tickets.
+
+Tickets that have been ``Closed`` for more than ``ARCHIVE_AFTER_DAYS``
+(counted from their last update) move, with their comments and rating, to
+``tickets_archive``, ``comments_archive`` and ``ratings_archive``. Ids are
+kept, so links to an archived ticket still work: the detail page falls back
+to ``find()`` and managers browse the archive with ``?archived=1``. The live
+tables, and every dashboard query, count and report over them, then only hold
+the tickets still being worked on. ``ticket_events`` keeps the full history.
+
+``archive()`` moves ``ARCHIVE_BATCH_SIZE`` tickets per transaction (copy, then
+delete), so a run can be stopped at any point and simply started again;
+``database/archive_tickets.py`` runs it.
+"""
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.orm import joinedload
+from .. import db, refdata
+from ..models import Ticket, Comment, Rating, ArchivedTicket, ArchivedComment, ArchivedRating
+from ..queries import RELATIONS
+
+DEFAULT_AFTER_DAYS = 365
+DEFAULT_BATCH_SIZE = 500
+
+# (live, archive): copied in this order, deleted in reverse
+MOVES = ((Ticket, ArchivedTicket), (Comment, ArchivedComment), (Rating, ArchivedRating))
+
+
+def _newest_kept():
+    # SQLite hands out max(rowid) + 1, so moving the row with the highest id
+    # away would let a new ticket, comment or rating reuse an archived id
+    def owner(model, pk):
+        newest = select(func.max(pk)).scalar_subquery()
+        return func.coalesce(select(model.ticket_id).where(pk == newest).scalar_subquery(), 0)
+    return [Ticket.ticket_id != owner(Ticket, Ticket.ticket_id),
+            Ticket.ticket_id != owner(Comment, Comment.comment_id),
+            Ticket.ticket_id != owner(Rating, Rating.rating_id)]
+
+
+def _archivable(cutoff):
+    closed_id = refdata.status_id('Closed')
+    if not closed_id:
+        return None
+    where = [Ticket.status_id == closed_id, Ticket.updated_at < cutoff]
+    if db.session.get_bind().dialect.name == 'sqlite':
+        where += _newest_kept()
+    return where
+
+
+def cutoff(after_days=None):
+    if after_days is None:
+        after_days = current_app.config.get('ARCHIVE_AFTER_DAYS', DEFAULT_AFTER_DAYS)
+    return datetime.utcnow() - timedelta(days=after_days)
+
+
+def pending(before):
+    """How many tickets ``archive(before=...)`` would move."""
+    where = _archivable(before)
+    return db.session.scalar(select(func.count()).select_from(Ticket).where(*where)) if where else 0
+
+
+def archive_batch(before, limit):
+    """Move up to ``limit`` tickets closed before ``before``; returns how many (caller commits)."""
+    where = _archivable(before)
+    if not where:
+        return 0
+    # lock the rows (where supported) so nothing changes them between copy and delete
+    ids = db.session.scalars(
+        select(Ticket.ticket_id).where(*where).order_by(Ticket.ticket_id).limit(limit).with_for_update()).all()
+    if not ids:
+        return 0
+    now = datetime.utcnow()
+    for live, archived in MOVES:
+        columns = [c.name for c in live.__table__.columns]
+        source = select(*live.__table__.columns).where(live.ticket_id.in_(ids))
+        if archived is ArchivedTicket:
+            columns.append('archived_at')
+            source = source.add_columns(literal(now, db.DateTime))
+        db.session.execute(insert(archived.__table__).from_select(columns, source))
+    for live, _ in reversed(MOVES):
+        db.session.execute(delete(live.__table__).where(live.ticket_id.in_(ids)))
+    return len(ids)
+
+
+def archive(after_days=None, batch_size=None, max_batches=None, pause=0, progress=None):
+    """Archive every ticket closed for over ``after_days``, one committed batch at a time.
+
+    ``pause`` seconds between batches leaves the database room for other
+    work; ``progress(moved_so_far)`` is called after each batch.
+    """
+    before = cutoff(after_days)
+    batch_size = batch_size or current_app.config.get('ARCHIVE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(before, batch_size)
+        db.session.commit()
+        if not moved:
+            break
+        total += moved
+        batches += 1
+        if progress:
+            progress(total)
+        if pause:
+            time.sleep(pause)
+    return total
+
+
+def listing(*relations):
+    """``ArchivedTicket.query`` with ``relations`` joined-eager-loaded, like ``queries.ticket_listing``."""
+    options = []
+    for name in relations:
+        if name not in RELATIONS:
+            raise ValueError(f'unknown ticket relation: {name}')
+        options.append(joinedload(getattr(ArchivedTicket, name)))
+    return ArchivedTicket.query.options(*options)
+
+
+def find(ticket_id):
+    return listing(*RELATIONS).filter(ArchivedTicket.ticket_id == ticket_id).first()
+
+
+def rating(ticket_id):
+    return ArchivedRating.query.filter_by(ticket_id=ticket_id).first()
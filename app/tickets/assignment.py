@@ -0,0 +1,242 @@
+"""Automatic, load-balanced assignment of new tickets.
+
+Each app keeps a ``WorkloadQueue``: a min-heap of active technicians keyed by
+their open ticket count (optionally the count in the ticket's category
+first), so picking the least loaded technician is O(log k) and a batch of n
+tickets costs O(n log k). The counts are reloaded from the database every
+``AUTO_ASSIGN_REFRESH`` seconds and before every batch, which also picks up
+manual assignments, resolutions and changes made by other processes.
+
+``AUTO_ASSIGN`` selects the mode:
+
+* ``off`` (default): managers assign every ticket by hand.
+* ``immediate``: ``new_ticket`` assigns the ticket before committing it.
+* ``batch``: Pending tickets wait for ``assign_pending()``, run from the
+  manager dashboard or on a schedule by ``database/auto_assign.py``.
+"""
+import heapq
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func, select
+from .. import db, refdata
+from ..models import Ticket, User, Role
+from . import bulk, lifecycle
+
+MODES = ('off', 'immediate', 'batch')
+DEFAULT_REFRESH = 60
+DEFAULT_BATCH_SIZE = 1000
+
+# Tickets in these statuses no longer count towards a technician's workload
+DONE_STATUSES = ('Resolved', 'Closed')
+
+
+class WorkloadQueue:
+    """Technicians ordered by open tickets, least loaded first.
+
+    Changing a load pushes a fresh heap entry instead of searching the heap
+    for the old one; entries whose key no longer matches the current load are
+    dropped when they reach the top. With ``by_category`` each category has
+    its own heap ordered by (open in category, open in total).
+    """
+
+    def __init__(self, loads, category_loads=None, by_category=False, max_open=0):
+        self.loads = dict(loads)
+        self.category_loads = defaultdict(Counter)
+        for (technician_id, category_id), count in (category_loads or {}).items():
+            self.category_loads[category_id][technician_id] = count
+        self.by_category = by_category
+        self.max_open = max_open
+        self._heaps = {}
+
+    def _key(self, technician_id, category_id):
+        if self.by_category:
+            return (self.category_loads[category_id][technician_id], self.loads[technician_id], technician_id)
+        return (self.loads[technician_id], technician_id)
+
+    def _heap(self, category_id):
+        category_id = category_id if self.by_category else None
+        heap = self._heaps.get(category_id)
+        if heap is None or len(heap) > 2 * len(self.loads) + 64:
+            # (re)build without the stale entries: O(k)
+            heap = self._heaps[category_id] = [self._key(t, category_id) for t in self.loads]
+            heapq.heapify(heap)
+        return heap
+
+    def _changed(self, technician_id, category_id):
+        # the total changed, so the technician moves in every heap
+        for heap_category, heap in self._heaps.items():
+            heapq.heappush(heap, self._key(technician_id, heap_category))
+
+    def pick(self, category_id=None):
+        """Least loaded technician with room for one more ticket (counted as assigned), or None."""
+        heap = self._heap(category_id)
+        full = []
+        technician_id = None
+        while heap:
+            key = heap[0]
+            candidate = key[-1]
+            if candidate not in self.loads or key != self._key(candidate, category_id):
+                heapq.heappop(heap)  # stale
+            elif self.max_open and self.loads[candidate] >= self.max_open:
+                full.append(heapq.heappop(heap))
+            else:
+                technician_id = candidate
+                break
+        for key in full:
+            heapq.heappush(heap, key)
+        if technician_id is not None:
+            self.add(technician_id, category_id)
+        return technician_id
+
+    def add(self, technician_id, category_id=None):
+        self.loads[technician_id] += 1
+        self.category_loads[category_id][technician_id] += 1
+        self._changed(technician_id, category_id)
+
+    def release(self, technician_id, category_id=None):
+        """One of the technician's tickets was closed or moved away."""
+        if technician_id in self.loads and self.loads[technician_id] > 0:
+            self.loads[technician_id] -= 1
+            if self.category_loads[category_id][technician_id] > 0:
+                self.category_loads[category_id][technician_id] -= 1
+            self._changed(technician_id, category_id)
+
+
+def mode():
+    value = (current_app.config.get('AUTO_ASSIGN') or 'off').lower()
+    return value if value in MODES else 'off'
+
+
+def _load_queue():
+    config = current_app.config
+    by_category = config.get('AUTO_ASSIGN_BY_CATEGORY', False)
+    technicians = db.session.scalars(
+        select(User.user_id).where(User.role == Role.technician, User.is_active.is_(True))).all()
+    done = [sid for sid in map(refdata.status_id, DONE_STATUSES) if sid]
+    columns = [Ticket.technician_id, Ticket.category_id] if by_category else [Ticket.technician_id]
+    rows = db.session.execute(
+        select(*columns, func.count())
+        .where(Ticket.technician_id.in_(technicians), Ticket.status_id.notin_(done))
+        .group_by(*columns)
+    ).all() if technicians else []
+    loads = dict.fromkeys(technicians, 0)
+    category_loads = {}
+    for *key, count in rows:
+        loads[key[0]] += count
+        if by_category:
+            category_loads[tuple(key)] = count
+    return WorkloadQueue(loads, category_loads, by_category, config.get('AUTO_ASSIGN_MAX_OPEN', 0))
+
+
+class AssignmentEngine:
+    """Per-app ``WorkloadQueue`` reloaded from the database when it gets old."""
+
+    def __init__(self, refresh):
+        self.refresh = refresh
+        self.lock = threading.Lock()
+        self._queue = None
+        self._loaded_at = 0
+
+    def queue(self, reload=False):
+        # call with self.lock held
+        if reload or self._queue is None or time.monotonic() - self._loaded_at > self.refresh:
+            self._queue = _load_queue()
+            self._loaded_at = time.monotonic()
+        return self._queue
+
+    def invalidate(self):
+        self._queue = None
+
+
+def engine():
+    eng = current_app.extensions.get('assignment')
+    if eng is None:
+        eng = current_app.extensions.setdefault(
+            'assignment', AssignmentEngine(current_app.config.get('AUTO_ASSIGN_REFRESH', DEFAULT_REFRESH)))
+    return eng
+
+
+def workloads():
+    """``{technician_id: open tickets}`` for the active technicians."""
+    eng = engine()
+    with eng.lock:
+        return dict(eng.queue().loads)
+
+
+def assign_new(ticket, actor_id=None):
+    """In ``immediate`` mode give a just-created (flushed) ticket to the least loaded technician.
+
+    Returns the technician id, or None when the ticket stays Pending.
+    """
+    if mode() != 'immediate' or ticket.technician_id is not None:
+        return None
+    eng = engine()
+    with eng.lock:
+        technician_id = eng.queue().pick(ticket.category_id)
+    if technician_id is None:
+        return None
+    ticket.technician_id = technician_id
+    lifecycle.ticket_assigned(ticket, None, actor_id)
+    pending_id, in_progress_id = refdata.status_id('Pending'), refdata.status_id('In Progress')
+    if in_progress_id and ticket.status_id == pending_id:
+        ticket.status_id = in_progress_id
+        lifecycle.ticket_status_changed(ticket, pending_id, actor_id)
+    return technician_id
+
+
+def assign_pending(limit=None, actor_id=None, batch_size=None):
+    """Assign unassigned Pending tickets, oldest first, in transactions of ``batch_size`` tickets.
+
+    Returns ``(assigned, left)``: tickets assigned and unassigned Pending
+    tickets left over (``limit`` reached, or every technician is at
+    ``AUTO_ASSIGN_MAX_OPEN``).
+    """
+    batch_size = batch_size or current_app.config.get('AUTO_ASSIGN_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    pending_id, in_progress_id = refdata.status_id('Pending'), refdata.status_id('In Progress')
+    if not pending_id or not in_progress_id:
+        return 0, 0
+    unassigned = (Ticket.status_id == pending_id) & Ticket.technician_id.is_(None)
+    eng = engine()
+    assigned, after = 0, 0
+    with eng.lock:
+        queue = eng.queue(reload=True)
+        while limit is None or assigned < limit:
+            size = batch_size if limit is None else min(batch_size, limit - assigned)
+            tickets = [bulk.TicketState(*row) for row in db.session.execute(
+                select(Ticket.ticket_id, Ticket.status_id, Ticket.technician_id, Ticket.category_id,
+                       Ticket.requester_id)
+                .where(unassigned, Ticket.ticket_id > after)
+                .order_by(Ticket.ticket_id)
+                .limit(size)
+                .with_for_update()
+            )]
+            if not tickets:
+                break
+            after = tickets[-1].ticket_id
+            by_technician = defaultdict(list)
+            changes = []
+            for ticket in tickets:
+                technician_id = queue.pick(ticket.category_id)
+                if technician_id is not None:
+                    by_technician[technician_id].append(ticket.ticket_id)
+                    changes.append((ticket, ticket._replace(technician_id=technician_id, status_id=in_progress_id)))
+            now = datetime.utcnow()
+            try:
+                # one UPDATE per technician
+                for technician_id, ids in by_technician.items():
+                    bulk.guarded_update(ids, unassigned,
+                                        dict(technician_id=technician_id, status_id=in_progress_id, updated_at=now))
+                lifecycle.tickets_changed(changes, actor_id, now)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                eng.invalidate()
+                raise
+            assigned += len(changes)
+            if not changes:
+                break  # nobody has room left
+    left = db.session.scalar(select(func.count()).select_from(Ticket).where(unassigned))
+    return assigned, left
@@ -0,0 +1,156 @@
+"""Bulk ticket operations for the dashboards.
+
+Each operation reads the selected tickets once, checks every ticket against
+the rules the single-ticket routes apply, then changes all the valid ones
+with a few set-based UPDATEs in one transaction. Tickets that cannot be
+changed are reported back with the reason instead of failing the whole batch.
+"""
+from collections import namedtuple
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, update
+from .. import db, refdata
+from ..models import Ticket, User, Role
+from . import lifecycle
+
+DEFAULT_MAX_TICKETS = 1000
+
+TicketState = namedtuple('TicketState', 'ticket_id status_id technician_id category_id requester_id')
+
+
+class BulkResult:
+    """Ticket ids that were changed and ``{ticket_id: reason}`` for the ones that were not."""
+
+    def __init__(self):
+        self.updated = []
+        self.failed = {}
+
+    def fail(self, ticket_id, reason):
+        self.failed[ticket_id] = reason
+
+
+class BulkError(ValueError):
+    """The request as a whole is invalid (nothing was changed)."""
+
+
+def parse_ticket_ids(values):
+    """Unique ticket ids from form values, in the order given."""
+    ids = []
+    for value in values:
+        try:
+            ticket_id = int(value)
+        except (TypeError, ValueError):
+            continue
+        if ticket_id not in ids:
+            ids.append(ticket_id)
+    if not ids:
+        raise BulkError('Select at least one ticket.')
+    limit = current_app.config.get('BULK_MAX_TICKETS', DEFAULT_MAX_TICKETS)
+    if len(ids) > limit:
+        raise BulkError(f'At most {limit} tickets can be changed at once.')
+    return ids
+
+
+def _load(ticket_ids, result):
+    # Lock the rows (where supported) so the checks hold until the commit
+    rows = db.session.execute(
+        select(Ticket.ticket_id, Ticket.status_id, Ticket.technician_id, Ticket.category_id, Ticket.requester_id)
+        .where(Ticket.ticket_id.in_(ticket_ids))
+        .with_for_update()
+    ).all()
+    found = {row.ticket_id: TicketState(*row) for row in rows}
+    for ticket_id in ticket_ids:
+        if ticket_id not in found:
+            result.fail(ticket_id, 'not found')
+    return found
+
+
+def guarded_update(ticket_ids, guard, values):
+    """UPDATE the tickets in ``ticket_ids`` whose row still satisfies ``guard``; all must match."""
+    if not ticket_ids:
+        return
+    changed = db.session.execute(
+        update(Ticket).where(Ticket.ticket_id.in_(ticket_ids), guard).values(**values)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if changed != len(ticket_ids):
+        raise BulkError('Some tickets were changed by someone else meanwhile, nothing was saved. Please retry.')
+
+
+def assign(ticket_ids, technician_id, actor_id=None):
+    """Assign the tickets to ``technician_id``, moving Pending ones to In Progress."""
+    technician = db.session.get(User, technician_id) if technician_id else None
+    if not technician or technician.role != Role.technician or not technician.is_active:
+        raise BulkError('Select an active technician.')
+    result = BulkResult()
+    pending_id, in_progress_id = refdata.status_id('Pending'), refdata.status_id('In Progress')
+    changes, pending = [], []
+    for ticket in _load(ticket_ids, result).values():
+        if ticket.technician_id == technician_id:
+            result.fail(ticket.ticket_id, 'already assigned to this technician')
+            continue
+        status_id = ticket.status_id
+        if status_id == pending_id and in_progress_id:
+            status_id = in_progress_id
+            pending.append(ticket.ticket_id)
+        changes.append((ticket, ticket._replace(technician_id=technician_id, status_id=status_id)))
+
+    now = datetime.utcnow()
+    try:
+        guarded_update([before.ticket_id for before, _ in changes],
+                       Ticket.technician_id.is_distinct_from(technician_id),
+                       dict(technician_id=technician_id, updated_at=now))
+        guarded_update(pending, Ticket.status_id == pending_id, dict(status_id=in_progress_id))
+        lifecycle.tickets_changed(changes, actor_id, now)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    result.updated = [after.ticket_id for _, after in changes]
+    return result
+
+
+def advance(ticket_ids, actor_id=None, technician_id=None):
+    """Move each ticket one workflow step forward.
+
+    With ``technician_id`` only tickets assigned to that technician may be
+    changed. Tickets without a technician cannot leave Pending.
+    """
+    result = BulkResult()
+    # tickets grouped by their current status, so each group is one guarded UPDATE
+    steps = {}
+    changes = []
+    for ticket in _load(ticket_ids, result).values():
+        if technician_id is not None and ticket.technician_id != technician_id:
+            result.fail(ticket.ticket_id, 'not assigned to you')
+            continue
+        name = refdata.status_name(ticket.status_id) or 'Pending'
+        if name not in lifecycle.WORKFLOW:
+            result.fail(ticket.ticket_id, f'unsupported status {name}')
+            continue
+        index = lifecycle.WORKFLOW.index(name)
+        if index == len(lifecycle.WORKFLOW) - 1:
+            result.fail(ticket.ticket_id, f'already {name}')
+            continue
+        if ticket.technician_id is None:
+            result.fail(ticket.ticket_id, 'assign a technician first')
+            continue
+        next_id = refdata.status_id(lifecycle.WORKFLOW[index + 1])
+        if not next_id:
+            result.fail(ticket.ticket_id, f'status {lifecycle.WORKFLOW[index + 1]} does not exist')
+            continue
+        steps.setdefault((ticket.status_id, next_id), []).append(ticket.ticket_id)
+        changes.append((ticket, ticket._replace(status_id=next_id)))
+
+    now = datetime.utcnow()
+    try:
+        for (status_id, next_id), ids in steps.items():
+            current = Ticket.status_id == status_id if status_id is not None else Ticket.status_id.is_(None)
+            guarded_update(ids, current, dict(status_id=next_id, updated_at=now))
+        lifecycle.tickets_changed(changes, actor_id, now)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    result.updated = [after.ticket_id for _, after in changes]
+    return result
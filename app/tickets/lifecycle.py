@@ -0,0 +1,97 @@
+"""Hooks run by every route that creates or changes a ticket.
+
+Call them after the change is flushed and before the commit, so everything
+they write lands in the same transaction as the ticket itself. Each hook
+appends to the ticket event log, keeps the report rollups current and queues
+the change for the live dashboards (sent on commit). ``tickets_changed`` does
+the same for set-based updates of many tickets, and also marks their cached
+fragments stale, which ORM writes do by themselves.
+"""
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import insert
+from .. import db, changefeed, fragments
+from ..models import TicketEvent
+from ..reports import rollups
+
+# Statuses move one step forward at a time and never backward
+WORKFLOW = ['Pending', 'In Progress', 'Resolved', 'Closed']
+
+
+def _event(ticket, event_type, actor_id=None, **fields):
+    db.session.add(TicketEvent(ticket_id=ticket.ticket_id, event_type=event_type, technician_id=ticket.technician_id,
+                               category_id=ticket.category_id, actor_id=actor_id,
+                               created_at=fields.pop('created_at', None) or datetime.utcnow(), **fields))
+
+
+def ticket_created(ticket, actor_id=None):
+    _event(ticket, TicketEvent.CREATED, actor_id or ticket.requester_id, to_status_id=ticket.status_id,
+           created_at=ticket.created_at)
+    rollups.record_created(ticket.category_id, ticket.created_at)
+    changefeed.publish(changefeed.ticket_event('created', ticket))
+
+
+def tickets_created(tickets, actor_id=None):
+    """Bulk ``ticket_created`` for many flushed tickets: one executemany, one rollup bump per category and day."""
+    if not tickets:
+        return
+    db.session.execute(insert(TicketEvent), [
+        dict(ticket_id=t.ticket_id, event_type=TicketEvent.CREATED, to_status_id=t.status_id,
+             technician_id=t.technician_id, category_id=t.category_id, actor_id=actor_id or t.requester_id,
+             created_at=t.created_at or datetime.utcnow())
+        for t in tickets])
+    days = Counter((t.category_id, (t.created_at or datetime.utcnow()).date()) for t in tickets)
+    for (category_id, day), count in days.items():
+        rollups.record_created(category_id, datetime.combine(day, datetime.min.time()), count)
+    changefeed.publish(*(changefeed.ticket_event('created', t) for t in tickets))
+
+
+def ticket_assigned(ticket, previous_technician_id, actor_id=None):
+    if ticket.technician_id != previous_technician_id:
+        _event(ticket, TicketEvent.ASSIGNED, actor_id)
+        changefeed.publish(changefeed.ticket_event('assigned', ticket, technician_id=previous_technician_id))
+
+
+def ticket_status_changed(ticket, previous_status_id, actor_id=None):
+    if ticket.status_id != previous_status_id:
+        _event(ticket, TicketEvent.STATUS, actor_id, from_status_id=previous_status_id, to_status_id=ticket.status_id)
+        rollups.record_status_change(ticket.technician_id, ticket.status_id)
+        changefeed.publish(changefeed.ticket_event('status', ticket, status_id=previous_status_id))
+
+
+def tickets_changed(changes, actor_id=None, changed_at=None):
+    """Bulk ``ticket_assigned``/``ticket_status_changed``.
+
+    ``changes`` are ``(before, after)`` pairs of objects with ``ticket_id``,
+    ``status_id``, ``technician_id``, ``category_id`` and ``requester_id``. The
+    events go in one executemany and the rollups get one bump per technician.
+    """
+    changed_at = changed_at or datetime.utcnow()
+    events, resolved = [], Counter()
+    for before, after in changes:
+        event = dict(ticket_id=after.ticket_id, technician_id=after.technician_id, category_id=after.category_id,
+                     actor_id=actor_id, created_at=changed_at, from_status_id=None, to_status_id=None)
+        if after.technician_id != before.technician_id:
+            events.append(dict(event, event_type=TicketEvent.ASSIGNED))
+        if after.status_id != before.status_id:
+            events.append(dict(event, event_type=TicketEvent.STATUS, from_status_id=before.status_id,
+                               to_status_id=after.status_id))
+            resolved[after.technician_id, after.status_id] += 1
+        if after != before:
+            kind = 'status' if after.status_id != before.status_id else 'assigned'
+            changefeed.publish(changefeed.ticket_event(kind, after, technician_id=before.technician_id,
+                                                       status_id=before.status_id))
+    if events:
+        db.session.execute(insert(TicketEvent), events)
+    # set-based updates bypass the fragment cache's flush listener
+    fragments.note_ticket_writes(after.ticket_id for before, after in changes if after != before)
+    for (technician_id, status_id), count in resolved.items():
+        rollups.record_status_change(technician_id, status_id, changed_at, count)
+
+
+def comment_added(ticket):
+    """Comments are not in the event log; only the live dashboards hear of them.
+
+    ``ticket`` may be any object with the ticket's columns.
+    """
+    changefeed.publish(changefeed.ticket_event('comment', ticket))
@@ -1,8 +1,12 @@
-from flask import Blueprint, render_template, redirect, url_for, flash
+from flask import Blueprint, render_template, redirect, url_for, flash, abort, jsonify, request
 from flask_login import login_required, current_user
 from ..forms import TicketForm
-from ..models import Ticket, Category, TicketStatus, Role, Comment, Rating
-from .. import db
+from ..models import Ticket, Role, Comment, Rating, ArchivedTicket, ArchivedComment
+from ..queries import ticket_listing, RELATIONS
+from . import lifecycle, assignment, archive
+from ..conditional import conditional, requester_version, ticket_version
+from ..comments import thread
+from .. import db, refdata, changefeed
 
 tickets_bp = Blueprint('tickets', __name__, url_prefix='/tickets')
 
@@ -11,10 +15,10 @@ tickets_bp = Blueprint('tickets', __name__, url_prefix='/tickets')
 def new_ticket():
     form = TicketForm()
     # populate categories
-    form.category_id.choices = [(c.category_id, c.category_name) for c in Category.query.all()]
+    form.category_id.choices = [(c.category_id, c.category_name) for c in refdata.categories()]
     if form.validate_on_submit():
         # validate category exists
-        category = Category.query.get(form.category_id.data)
+        category = refdata.category(form.category_id.data)
         if not category:
             flash('Please select a valid category.', 'warning')
             return render_template('tickets/new.html', form=form)
@@ -24,9 +28,12 @@ def new_ticket():
             location=form.location.data,
             category_id=form.category_id.data,
             requester_id=current_user.user_id,
-            status_id=TicketStatus.query.filter_by(status_name='Pending').first().status_id
+            status_id=refdata.status_id('Pending')
         )
         db.session.add(ticket)
+        db.session.flush()
+        lifecycle.ticket_created(ticket)
+        assignment.assign_new(ticket)
         db.session.commit()
         flash('Ticket submitted.', 'success')
         return redirect(url_for('tickets.my_tickets'))
@@ -34,18 +41,51 @@ def new_ticket():
 
 @tickets_bp.route('/mine')
 @login_required
+@conditional(requester_version)
 def my_tickets():
-    tickets = Ticket.query.filter_by(requester_id=current_user.user_id).order_by(Ticket.created_at.desc()).all()
+    tickets = ticket_listing('category', 'status').filter_by(requester_id=current_user.user_id).order_by(Ticket.created_at.desc()).all()
     return render_template('tickets/my_tickets.html', tickets=tickets)
 
+def can_view(ticket):
+    # Access: requester of ticket, assigned technician, or manager can view
+    return (ticket.requester_id == current_user.user_id or ticket.technician_id == current_user.user_id
+            or getattr(current_user.role, 'value', str(current_user.role)) == 'manager')
+
 @tickets_bp.route('/<int:ticket_id>')
 @login_required
+@conditional(ticket_version)
 def ticket_detail(ticket_id):
-    ticket = Ticket.query.get_or_404(ticket_id)
-    # Access: requester of ticket, assigned technician, or manager can view
-    if ticket.requester_id != current_user.user_id and ticket.technician_id != current_user.user_id and getattr(current_user.role, 'value', str(current_user.role)) != 'manager':
+    ticket = ticket_listing(*RELATIONS).filter(Ticket.ticket_id == ticket_id).first()
+    # long-closed tickets live in the archive, read-only
+    archived = ticket is None
+    if archived:
+        ticket = archive.find(ticket_id) or abort(404)
+    if not can_view(ticket):
         flash('You are not authorized to view this ticket.', 'danger')
         return redirect(url_for('index'))
-    comments = Comment.query.filter_by(ticket_id=ticket_id).order_by(Comment.created_at.asc()).all()
+    if archived:
+        return render_template('tickets/detail.html', ticket=ticket, archived=True,
+                               load_comments=lambda: thread.load(ArchivedComment, ticket_id),
+                               rating=archive.rating(ticket_id))
+    # called by the template only when the comment thread is not in the fragment cache
+    load_comments = lambda: thread.load(Comment, ticket_id)
     existing_rating = Rating.query.filter_by(ticket_id=ticket_id).first()
-    return render_template('tickets/detail.html', ticket=ticket, comments=comments, rating=existing_rating)
+    return render_template('tickets/detail.html', ticket=ticket, load_comments=load_comments, rating=existing_rating,
+                           live_url=changefeed.stream_url())
+
+@tickets_bp.route('/<int:ticket_id>/comments')
+@login_required
+def ticket_comments(ticket_id):
+    """A page of the comment thread as HTML, for the detail page's "load older" and new comments.
+
+    ``?cursor=`` takes the ``older`` or ``newer`` cursor of a previous page;
+    without one this is the newest page.
+    """
+    ticket, model = db.session.get(Ticket, ticket_id), Comment
+    if ticket is None:
+        ticket, model = db.session.get(ArchivedTicket, ticket_id) or abort(404), ArchivedComment
+    if not can_view(ticket):
+        abort(403)
+    page = thread.load(model, ticket_id, request.args.get('cursor') or None)
+    return jsonify(html=render_template('tickets/_comments.html', ticket=ticket, thread=page),
+                   count=len(page.comments), older=page.older, newer=page.newer, more_newer=page.more_newer)
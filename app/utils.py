@@ -1,6 +1,11 @@
+from collections import namedtuple
+from datetime import datetime
 from functools import wraps
-from flask import abort
+from flask import abort, current_app
 from flask_login import current_user
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import and_, false, or_
+from .cache import TTLCache
 from .models import Role
 
 def paginate(query, page: int, per_page: int):
@@ -17,17 +22,132 @@ def paginate(query, page: int, per_page: int):
         'total': total,
         'pages': pages,
         'has_prev': page > 1,
-        'has_next': page < pages
+        'has_next': page < pages,
+        'prev_cursor': None,
+        'next_cursor': None,
+    }
+
+# One ORDER BY term of a keyset-paginated query. The last key must be unique
+# (normally the primary key) so every row has a distinct position.
+SortKey = namedtuple('SortKey', 'column descending nulls_last', defaults=(False, False))
+
+def apply_order(query, keys, reverse=False):
+    """Order ``query`` by ``keys``, or in the exact opposite order if ``reverse``."""
+    terms = []
+    for key in keys:
+        descending = key.descending != reverse
+        term = key.column.desc() if descending else key.column.asc()
+        if key.nulls_last:
+            term = term.nulls_first() if reverse else term.nulls_last()
+        terms.append(term)
+    return query.order_by(*terms)
+
+def _beyond(key, value, reverse):
+    # Rows strictly after ``value`` for one key, in the (possibly reversed) order
+    descending = key.descending != reverse
+    nulls_last = key.nulls_last and not reverse
+    if value is None:
+        return false() if nulls_last else key.column.isnot(None)
+    cond = key.column < value if descending else key.column > value
+    return or_(cond, key.column.is_(None)) if nulls_last else cond
+
+def _same(key, value):
+    return key.column.is_(None) if value is None else key.column == value
+
+def _seek(keys, values, reverse):
+    # (k1, k2, ...) > (v1, v2, ...) expanded to OR-of-ANDs so mixed directions work
+    clauses = []
+    for i, (key, value) in enumerate(zip(keys, values)):
+        equal = [_same(k, v) for k, v in zip(keys[:i], values[:i])]
+        clauses.append(and_(*equal, _beyond(key, value, reverse)))
+    return or_(*clauses)
+
+def _cursor_serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='keyset-cursor')
+
+def _encode_cursor(direction, values):
+    packed = [{'dt': v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    return _cursor_serializer().dumps([direction, packed])
+
+def keyset_cursor(direction, values):
+    """Cursor for the rows after (``'next'``) or before (``'prev'``) the position ``values``.
+
+    ``keyset_paginate`` only hands out cursors for pages that exist; this one
+    can point past the end, e.g. to poll for rows newer than the newest shown.
+    """
+    return _encode_cursor(direction, values)
+
+def _decode_cursor(token, size):
+    try:
+        direction, packed = _cursor_serializer().loads(token)
+    except (BadSignature, TypeError, ValueError):
+        return None, None
+    if direction not in ('next', 'prev') or not isinstance(packed, list) or len(packed) != size:
+        return None, None
+    try:
+        values = [datetime.fromisoformat(v['dt']) if isinstance(v, dict) else v for v in packed]
+    except (KeyError, TypeError, ValueError):
+        return None, None
+    return direction, values
+
+def _cached_total(query, count_key):
+    if count_key is None:
+        return query.order_by(None).count()
+    totals = current_app.extensions.get('pagination_totals')
+    if totals is None:
+        totals = TTLCache(maxsize=4096, ttl=current_app.config.get('PAGINATION_COUNT_TTL', 60))
+        current_app.extensions['pagination_totals'] = totals
+    return totals.get_or_set(count_key, lambda: query.order_by(None).count())
+
+def keyset_paginate(query, keys, cursor=None, per_page=10, with_total=False, count_key=None):
+    """Cursor pagination over ``keys``; no OFFSET, no COUNT unless asked for.
+
+    ``query`` must not be ordered yet. ``cursor`` is an opaque token taken from
+    ``next_cursor``/``prev_cursor`` of a previous page. The total is only
+    computed when ``with_total`` is set, and is cached for a short while
+    under ``count_key`` when one is given.
+    """
+    direction, values = _decode_cursor(cursor, len(keys)) if cursor else (None, None)
+    reverse = direction == 'prev'
+    total = _cached_total(query, count_key) if with_total else None
+
+    page_q = query
+    if values is not None:
+        page_q = page_q.filter(_seek(keys, values, reverse))
+    page_q = apply_order(page_q, keys, reverse)
+    page_q = page_q.add_columns(*[k.column.label(f'_keyset_{i}') for i, k in enumerate(keys)])
+    rows = page_q.limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if reverse:
+        rows.reverse()
+
+    items = [row[0] for row in rows]
+    first = list(rows[0][1:]) if rows else None
+    last = list(rows[-1][1:]) if rows else None
+    has_prev = (more if reverse else values is not None) and first is not None
+    has_next = (values is not None if reverse else more) and last is not None
+    return {
+        'items': items,
+        'page': None,
+        'per_page': per_page,
+        'total': total,
+        'pages': None,
+        'has_prev': has_prev,
+        'has_next': has_next,
+        'prev_cursor': _encode_cursor('prev', first) if has_prev else None,
+        'next_cursor': _encode_cursor('next', last) if has_next else None,
     }
 
 def role_required(*roles):
+    # resolved once at decoration time, not on every request
+    allowed_values = frozenset(str(getattr(r, 'value', r)) for r in roles)
     def decorator(fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
             if not current_user.is_authenticated:
                 abort(403)
             current_role_value = getattr(current_user.role, 'value', str(current_user.role))
-            allowed_values = [r if isinstance(r, str) else getattr(r, 'value', str(r)) for r in roles]
             if current_role_value not in allowed_values:
                 abort(403)
             return fn(*args, **kwargs)
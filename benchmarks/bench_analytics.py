@@ -0,0 +1,82 @@
+# Times the ticket analytics (time to assign / resolve per technician and
+# category) on a large event log: cold computation and cached lookups for
+# several window sizes. The default temporary database has ~1.1M events.
+# Usage:
+#   python benchmarks/bench_analytics.py [--tickets 300000] [--windows 7,30,90,365]
+#   python benchmarks/bench_analytics.py --database-url mysql+pymysql://...
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Ensure project root is on sys.path when running as a script
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from sqlalchemy import func, select
+from app import create_app, db
+from app.models import TicketEvent
+from app.reports import analytics
+from database.seed import seed
+
+
+def timed(fn, repeat=1):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(app, windows, repeat):
+    results = []
+    with app.app_context():
+        events = db.session.scalar(select(func.count()).select_from(TicketEvent))
+        print(f'{events} ticket events')
+        print(f"{'window':>7} {'metric':>8} {'tickets':>8} {'cold ms':>9} {'cached ms':>10}")
+        for days in windows:
+            start, end = analytics.window(days)
+            for metric in analytics.METRICS:
+                cold, result = timed(lambda: analytics.compute(metric, start, end), repeat)
+                analytics.durations(metric, start, end)
+                cached, _ = timed(lambda: analytics.durations(metric, start, end), 100)
+                tickets = result['all'].count if result['all'] else 0
+                print(f'{days:>7} {metric:>8} {tickets:>8} {cold * 1000:>9.1f} {cached * 1000:>10.3f}')
+                results.append({'window_days': days, 'metric': metric, 'tickets': tickets,
+                                'cold_ms': round(cold * 1000, 1), 'cached_ms': round(cached * 1000, 3)})
+    return {'events': events, 'results': results}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', help='use an existing (seeded) database instead of a temporary one')
+    parser.add_argument('--tickets', type=int, default=300_000, help='tickets to seed (about 3.6 events each)')
+    parser.add_argument('--windows', default='7,30,90,365', help='comma separated window sizes in days')
+    parser.add_argument('--repeat', type=int, default=3, help='cold runs per case (best is reported)')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+    windows = [int(w) for w in args.windows.split(',')]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': args.database_url or 'sqlite:///' + os.path.join(tmp, 'bench.db')})
+        if not args.database_url:
+            with app.app_context():
+                db.create_all()
+                print(f'seeding {args.tickets} tickets...')
+                seed(args.tickets)
+        results = run(app, windows, args.repeat)
+        with app.app_context():
+            db.engine.dispose()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
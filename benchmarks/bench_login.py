@@ -0,0 +1,74 @@
+# Measures logins per second against a throwaway SQLite database for several
+# password hashing pool sizes (PASSWORD_HASH_WORKERS, 0 = hash inline).
+# Usage: python benchmarks/bench_login.py [--users 8] [--logins 200] [--threads 8] [--workers 0,1,2,4]
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Ensure project root is on sys.path when running as a script
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app, db
+from app.auth import hashing
+from app.models import User, Role
+
+
+def make_app(db_path):
+    return create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path, 'WTF_CSRF_ENABLED': False})
+
+
+def seed_users(app, count, password):
+    with app.app_context():
+        db.create_all()
+        pwhash = hashing.hash_password(password)
+        for i in range(count):
+            db.session.add(User(email=f'bench{i}@example.com', first_name='Bench', last_name=str(i),
+                                role=Role.requester, password_hash=pwhash))
+        db.session.commit()
+
+
+def run(app, workers, users, logins, threads, password):
+    app.config['PASSWORD_HASH_WORKERS'] = workers
+
+    def login(i):
+        client = app.test_client()
+        r = client.post('/auth/login', data={'email': f'bench{i % users}@example.com', 'password': password})
+        assert r.status_code == 302, r.status_code
+
+    # warm up: start the pool processes before timing
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(login, range(threads)))
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(login, range(logins)))
+    return logins / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=8)
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--workers', default=','.join(map(str, sorted({0, 1, 2, os.cpu_count() or 1}))),
+                        help='comma separated pool sizes to try')
+    args = parser.parse_args()
+    password = 'bench-password'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'))
+        seed_users(app, args.users, password)
+        print(f'{args.logins} logins, {args.threads} concurrent clients, {os.cpu_count()} CPUs')
+        for workers in (int(w) for w in args.workers.split(',')):
+            rate = run(app, workers, args.users, args.logins, args.threads, password)
+            print(f'workers={workers:<3} {rate:8.1f} logins/s')
+            hashing.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# Concurrent dashboard throughput under different connection pool settings.
+# Each thread logs in as a requester, technician or manager and loads its
+# dashboard (with a few filters) in a loop for --duration seconds.
+# Usage:
+#   python benchmarks/bench_pool.py --threads 16 --pools 1:0,5:0,10:20,20:40
+#   python benchmarks/bench_pool.py --database-url mysql+pymysql://... --no-pre-ping
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Ensure project root is on sys.path when running as a script
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app, db
+from benchmarks.run_benchmarks import benchmark_users, percentile
+from database.seed import SCALES, DEFAULT_PASSWORD, seed
+
+PAGES = {
+    'requester': ['/dashboard/requester', '/dashboard/requester?status=Pending', '/dashboard/requester?sort=status'],
+    'technician': ['/dashboard/technician', '/dashboard/technician?status=In%20Progress'],
+    'manager': ['/dashboard/manager', '/dashboard/manager?unassigned=1', '/dashboard/manager?sort=category',
+                '/dashboard/manager?q=printer'],
+}
+
+
+def run(database_url, pool_size, max_overflow, args):
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'WTF_CSRF_ENABLED': False,
+        'DB_POOL_SIZE': pool_size,
+        'DB_MAX_OVERFLOW': max_overflow,
+        'DB_POOL_TIMEOUT': args.pool_timeout,
+        'DB_POOL_PRE_PING': args.pre_ping,
+    })
+    with app.app_context():
+        emails = {role: user.email for role, user in benchmark_users().items()}
+    roles = list(PAGES)
+    timings, errors = [], []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(args.threads)
+
+    def worker(index):
+        role = roles[index % len(roles)]
+        client = app.test_client()
+        client.post('/auth/login', data={'email': emails[role], 'password': args.password})
+        local, failed, i = [], 0, 0
+        start_barrier.wait()
+        deadline = time.perf_counter() + args.duration
+        while time.perf_counter() < deadline:
+            path = PAGES[role][i % len(PAGES[role])]
+            i += 1
+            t0 = time.perf_counter()
+            response = client.get(path)
+            response.close()
+            local.append(time.perf_counter() - t0)
+            failed += response.status_code != 200
+        with lock:
+            timings.extend(local)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with app.app_context():
+        db.engine.dispose()
+    timings.sort()
+    return {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pre_ping': args.pre_ping,
+        'threads': args.threads,
+        'requests': len(timings),
+        'errors': sum(errors),
+        'throughput_rps': round(len(timings) / args.duration, 1),
+        'p50_ms': round(percentile(timings, 50) * 1000, 2),
+        'p99_ms': round(percentile(timings, 99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', help='benchmark an existing (seeded) database instead of a temporary one')
+    parser.add_argument('--scale', default='10k', help='size of the temporary database')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10, help='seconds per pool setting')
+    parser.add_argument('--pools', default='1:0,5:0,10:20,20:40', help='comma separated pool_size:max_overflow pairs')
+    parser.add_argument('--pool-timeout', type=int, default=30)
+    parser.add_argument('--no-pre-ping', dest='pre_ping', action='store_false')
+    parser.add_argument('--password', default=DEFAULT_PASSWORD)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        if not args.database_url:
+            app = create_app({'SQLALCHEMY_DATABASE_URI': database_url})
+            with app.app_context():
+                db.create_all()
+                seed(SCALES.get(args.scale.lower()) or int(args.scale), password=args.password)
+                db.engine.dispose()
+        print(f"{'pool':>6} {'overflow':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6}")
+        for pair in args.pools.split(','):
+            pool_size, max_overflow = (int(n) for n in pair.split(':'))
+            result = run(database_url, pool_size, max_overflow, args)
+            results.append(result)
+            print(f"{pool_size:>6} {max_overflow:>8} {result['throughput_rps']:>8} {result['p50_ms']:>8} "
+                  f"{result['p99_ms']:>8} {result['errors']:>6}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+# Load-test benchmark: drives the real blueprints (dashboards with every filter
+# and sort, ticket detail, CSV export, reports, login) through the Flask test
+# client and reports p50/p99 latency, SQL queries per request and throughput
+# per scenario. Results are written as JSON so runs can be compared.
+# Usage:
+#   python benchmarks/run_benchmarks.py                      # temporary SQLite db seeded with --scale
+#   python benchmarks/run_benchmarks.py --database-url mysql+pymysql://... --label mysql-100k
+#   python benchmarks/run_benchmarks.py --compare benchmarks/results/old.json
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Ensure project root is on sys.path when running as a script
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from sqlalchemy import event, func, select
+from app import create_app, db
+from app.models import Ticket, User, Role
+from app.queries import REQUESTER_FILTERS, TECHNICIAN_FILTERS, MANAGER_FILTERS
+from database.explain_queries import FILTER_CASES, SORTS
+from database.seed import SCALES, DEFAULT_PASSWORD, seed
+
+RESULTS_DIR = os.path.join(CURRENT_DIR, 'results')
+DASHBOARDS = [
+    ('requester', '/dashboard/requester', REQUESTER_FILTERS),
+    ('technician', '/dashboard/technician', TECHNICIAN_FILTERS),
+    ('manager', '/dashboard/manager', MANAGER_FILTERS),
+]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+class QueryCounter:
+    """Counts statements executed on ``engine`` while benchmarking."""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def benchmark_users():
+    """The busiest requester and technician, and a manager."""
+    def busiest(column):
+        return db.session.scalar(select(column).where(column.isnot(None)).group_by(column)
+                                 .order_by(func.count().desc()).limit(1))
+    requester = db.session.get(User, busiest(Ticket.requester_id))
+    technician = db.session.get(User, busiest(Ticket.technician_id))
+    manager = User.query.filter_by(role=Role.manager).first()
+    return {'requester': requester, 'technician': technician, 'manager': manager}
+
+
+def scenarios(users, export_requests):
+    """Yield ``(name, role, method, path, data, requests)``; ``requests`` None means the default count."""
+    for role, path, allowed in DASHBOARDS:
+        seen = set()
+        for case in FILTER_CASES:
+            for sort in SORTS:
+                args = {k: v for k, v in dict(case, sort=sort).items() if k in allowed}
+                query = '&'.join(f'{k}={v}' for k, v in sorted(args.items()))
+                if query in seen:
+                    continue
+                seen.add(query)
+                yield f'{role} dashboard?{query}', role, 'GET', f'{path}?{query}', None, None
+    ticket_id = db.session.scalar(select(Ticket.ticket_id).where(Ticket.requester_id == users['requester'].user_id)
+                                  .order_by(Ticket.created_at.desc()).limit(1))
+    yield 'ticket detail', 'requester', 'GET', f'/tickets/{ticket_id}', None, None
+    yield 'my tickets', 'requester', 'GET', '/tickets/mine', None, None
+    yield 'reports', 'manager', 'GET', '/reports/', None, None
+    yield 'csv export', 'manager', 'GET', '/dashboard/manager/export.csv', None, export_requests
+    yield 'login', None, 'POST', '/auth/login', {'email': users['requester'].email}, None
+
+
+def run_scenario(app, clients, counter, scenario, requests, password):
+    name, role, method, path, data, n = scenario
+    n = n or requests
+    timings, queries, statuses = [], 0, {}
+    if role is None:
+        data = dict(data, password=password)
+    started = time.perf_counter()
+    for _ in range(n):
+        client = clients[role] if role else app.test_client()
+        before = counter.count
+        t0 = time.perf_counter()
+        response = client.open(path, method=method, data=data)
+        response.get_data()
+        response.close()
+        timings.append(time.perf_counter() - t0)
+        queries += counter.count - before
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    return {
+        'path': path,
+        'requests': n,
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3),
+        'mean_ms': round(sum(timings) / n * 1000, 3),
+        'queries_per_request': round(queries / n, 2),
+        'throughput_rps': round(n / elapsed, 1),
+        'status_codes': {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(app, args):
+    app.config['WTF_CSRF_ENABLED'] = False
+    results = {}
+    with app.app_context():
+        users = benchmark_users()
+        meta = {
+            'label': args.label,
+            'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'database': db.engine.dialect.name,
+            'tickets': db.session.scalar(select(func.count()).select_from(Ticket)),
+            'requests_per_scenario': args.requests,
+        }
+        counter = QueryCounter(db.engine)
+        scenario_list = list(scenarios(users, args.export_requests))
+        emails = {role: user.email for role, user in users.items()}
+    clients = {}
+    for role, email in emails.items():
+        clients[role] = app.test_client()
+        r = clients[role].post('/auth/login', data={'email': email, 'password': args.password})
+        if r.status_code != 302:
+            sys.exit(f'could not log in as {email}; pass the seed password with --password')
+    for scenario in scenario_list:
+        if args.only and args.only not in scenario[0]:
+            continue
+        results[scenario[0]] = result = run_scenario(app, clients, counter, scenario, args.requests, args.password)
+        print(f"{result['p50_ms']:9.2f} {result['p99_ms']:9.2f} {result['queries_per_request']:7.1f} "
+              f"{result['throughput_rps']:8.1f}  {scenario[0]}")
+    return {'meta': meta, 'scenarios': results}
+
+
+def compare(current, previous):
+    print(f"\nChange vs {previous['meta'].get('label') or previous['meta'].get('timestamp')} (p50, queries/request):")
+    for name, result in current['scenarios'].items():
+        old = previous['scenarios'].get(name)
+        if not old:
+            continue
+        delta = (result['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0
+        print(f"{delta:+8.1f}% {result['queries_per_request'] - old['queries_per_request']:+6.1f}  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database-url', help='benchmark an existing (seeded) database instead of a temporary one')
+    parser.add_argument('--scale', default='1k', help='size of the temporary database (1k, 10k, 100k, 1m or a count)')
+    parser.add_argument('--requests', type=int, default=50, help='requests per scenario')
+    parser.add_argument('--export-requests', type=int, default=3, help='requests for the CSV export scenario')
+    parser.add_argument('--password', default=DEFAULT_PASSWORD)
+    parser.add_argument('--only', help='run only scenarios whose name contains this text')
+    parser.add_argument('--label', default='', help='stored with the results')
+    parser.add_argument('--output', help='JSON file to write (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': args.database_url or 'sqlite:///' + os.path.join(tmp, 'bench.db')})
+        if not args.database_url:
+            with app.app_context():
+                db.create_all()
+                seed(SCALES.get(args.scale.lower()) or int(args.scale), password=args.password)
+        print(f"{'p50 ms':>9} {'p99 ms':>9} {'queries':>7} {'req/s':>8}  scenario")
+        results = run(app, args)
+        with app.app_context():
+            db.engine.dispose()
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.utcnow().strftime('%Y%m%dT%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'\nResults written to {output}')
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+# Queue simulator for automatic ticket assignment. Tickets arrive at random
+# (Poisson) at the given hourly rates; every technician works their own queue
+# one ticket at a time with exponentially distributed work times. Tickets are
+# assigned on arrival or every --batch-minutes by the WorkloadQueue of
+# app/tickets/assignment.py (least-loaded), or round-robin / at random for
+# comparison. Reports how long tickets wait before work starts, then how fast
+# the queue itself assigns n tickets over k technicians.
+# Usage:
+#   python benchmarks/sim_assignment.py --technicians 20 --rates 10,15,18 --batch-minutes 0,15,60
+import argparse
+import heapq
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+
+# Ensure project root is on sys.path when running as a script
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app.tickets.assignment import WorkloadQueue
+from benchmarks.run_benchmarks import percentile
+
+POLICIES = ('least-loaded', 'round-robin', 'random')
+ARRIVAL, BATCH, DONE = 0, 1, 2
+
+
+def make_picker(policy, technicians, rng):
+    if policy == 'least-loaded':
+        queue = WorkloadQueue(dict.fromkeys(technicians, 0))
+        return queue.pick, queue.release
+    if policy == 'round-robin':
+        cycle = itertools.cycle(technicians)
+        return (lambda category_id=None: next(cycle)), (lambda technician_id: None)
+    return (lambda category_id=None: rng.choice(technicians)), (lambda technician_id: None)
+
+
+def simulate(technicians, rate, work_minutes, hours, batch_minutes, policy, seed):
+    """Wait times (minutes, arrival to start of work) of the tickets that got worked on."""
+    rng = random.Random(seed)
+    techs = list(range(technicians))
+    pick, release = make_picker(policy, techs, random.Random(seed + 1))
+    queues = {t: deque() for t in techs}
+    busy = dict.fromkeys(techs, False)
+    unassigned = []
+    waits = []
+    end = hours * 60
+    events = []  # (minute, kind, seq, payload)
+    seq = itertools.count()
+    at = rng.expovariate(rate / 60)
+    while at < end:
+        heapq.heappush(events, (at, ARRIVAL, next(seq), at))
+        at += rng.expovariate(rate / 60)
+    if batch_minutes:
+        for tick in range(batch_minutes, int(end) + 1, batch_minutes):
+            heapq.heappush(events, (tick, BATCH, next(seq), None))
+
+    def start_next(technician, now):
+        if queues[technician]:
+            arrived = queues[technician].popleft()
+            waits.append(now - arrived)
+            busy[technician] = True
+            heapq.heappush(events, (now + rng.expovariate(1 / work_minutes), DONE, next(seq), technician))
+        else:
+            busy[technician] = False
+
+    def assign(arrived, now):
+        technician = pick(None)
+        queues[technician].append(arrived)
+        if not busy[technician]:
+            start_next(technician, now)
+
+    while events:
+        now, kind, _, payload = heapq.heappop(events)
+        if kind == ARRIVAL:
+            if batch_minutes:
+                unassigned.append(payload)
+            else:
+                assign(payload, now)
+        elif kind == BATCH:
+            for arrived in unassigned:
+                assign(arrived, now)
+            unassigned.clear()
+        else:
+            release(payload)
+            start_next(payload, now)
+    return waits
+
+
+def summarize(waits):
+    waits.sort()
+    return {
+        'tickets': len(waits),
+        'mean_min': round(sum(waits) / len(waits), 1) if waits else None,
+        'p50_min': round(percentile(waits, 50), 1) if waits else None,
+        'p90_min': round(percentile(waits, 90), 1) if waits else None,
+        'p99_min': round(percentile(waits, 99), 1) if waits else None,
+    }
+
+
+def throughput(n, technician_counts):
+    """Microseconds per assignment for ``n`` tickets over each number of technicians."""
+    results = {}
+    for k in technician_counts:
+        queue = WorkloadQueue({t: random.randint(0, 20) for t in range(k)})
+        start = time.perf_counter()
+        for _ in range(n):
+            queue.pick()
+        results[k] = (time.perf_counter() - start) / n * 1e6
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--technicians', type=int, default=20)
+    parser.add_argument('--rates', default='10,15,18', help='comma separated arrival rates, tickets per hour')
+    parser.add_argument('--work-minutes', type=float, default=60, help='mean time a technician spends on a ticket')
+    parser.add_argument('--hours', type=int, default=2000, help='simulated time')
+    parser.add_argument('--batch-minutes', default='0,15,60', help='assignment intervals to compare (0: on arrival)')
+    parser.add_argument('--policies', default=','.join(POLICIES))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--throughput-tickets', type=int, default=200_000)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = {'simulation': [], 'throughput_us': {}}
+    print(f"{'rate/h':>6} {'util':>5} {'batch':>5} {'policy':>12} {'tickets':>8} "
+          f"{'mean':>7} {'p50':>7} {'p90':>7} {'p99':>7}  (wait before work starts, minutes)")
+    for rate in (float(r) for r in args.rates.split(',')):
+        utilization = rate * args.work_minutes / 60 / args.technicians
+        for batch in (int(b) for b in args.batch_minutes.split(',')):
+            for policy in args.policies.split(','):
+                stats = summarize(simulate(args.technicians, rate, args.work_minutes, args.hours, batch, policy,
+                                           args.seed))
+                print(f"{rate:>6g} {utilization:>5.0%} {batch:>5} {policy:>12} {stats['tickets']:>8} "
+                      f"{stats['mean_min']:>7} {stats['p50_min']:>7} {stats['p90_min']:>7} {stats['p99_min']:>7}")
+                results['simulation'].append(dict(stats, rate_per_hour=rate, utilization=round(utilization, 3),
+                                                  batch_minutes=batch, policy=policy))
+
+    print(f'\nWorkloadQueue.pick over {args.throughput_tickets} tickets:')
+    for k, us in throughput(args.throughput_tickets, (10, 100, 1000, 10000)).items():
+        print(f'{k:>6} technicians: {us:.2f} us per ticket')
+        results['throughput_us'][k] = round(us, 3)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
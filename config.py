@@ -3,7 +3,93 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def env_bool(name, default=False):
+    value = os.getenv(name)
+    return default if value is None else value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_list(name, default=''):
+    return [item.strip() for item in os.getenv(name, default).split(',') if item.strip()]
+
+
+def env_int(name, default):
+    value = os.getenv(name)
+    return default if value in (None, '') else int(value)
+
+
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
-    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///instance/ticket_system.db')
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///ticket_system.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Connection pool (see app/engine.py; not used for in-memory SQLite)
+    DB_POOL_SIZE = env_int('DB_POOL_SIZE', 10)
+    DB_MAX_OVERFLOW = env_int('DB_MAX_OVERFLOW', 20)
+    DB_POOL_TIMEOUT = env_int('DB_POOL_TIMEOUT', 30)
+    # recycle before MySQL's wait_timeout drops idle connections ("server has gone away")
+    DB_POOL_RECYCLE = env_int('DB_POOL_RECYCLE', 1800)
+    DB_POOL_PRE_PING = env_bool('DB_POOL_PRE_PING', True)
+    # MySQL max_execution_time / PostgreSQL statement_timeout; 0 = no limit
+    DB_STATEMENT_TIMEOUT_MS = env_int('DB_STATEMENT_TIMEOUT_MS', 30000)
+
+    # Read replicas (see app/routing.py): comma separated URLs, and the blueprints whose GET requests use them
+    DB_REPLICA_URLS = env_list('DB_REPLICA_URLS')
+    DB_REPLICA_BLUEPRINTS = env_list('DB_REPLICA_BLUEPRINTS', 'dashboard,tickets,reports,api')
+    DB_READ_AFTER_WRITE_SECONDS = env_int('DB_READ_AFTER_WRITE_SECONDS', 5)
+
+    # SQLite pragmas set on every new connection
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_CACHE_SIZE = env_int('SQLITE_CACHE_SIZE', -20000)  # negative = KiB
+    SQLITE_BUSY_TIMEOUT_MS = env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)
+
+    PASSWORD_HASH_WORKERS = env_int('PASSWORD_HASH_WORKERS', 0)
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD')
+    PASSWORD_HASH_TIMEOUT = env_int('PASSWORD_HASH_TIMEOUT', 30)  # seconds before a queued hash gets a 503
+
+    PERF_ENABLED = env_bool('PERF_ENABLED')
+    PERF_PROFILE = env_bool('PERF_PROFILE')
+    PERF_SLOW_MS = env_int('PERF_SLOW_MS', 500)
+
+    CSV_EXPORT_BATCH_SIZE = env_int('CSV_EXPORT_BATCH_SIZE', 1000)
+    CSV_EXPORT_GZIP = env_bool('CSV_EXPORT_GZIP', True)
+    ETAGS_ENABLED = env_bool('ETAGS_ENABLED', True)
+    # memory | filesystem (shared by the workers of one host) | off
+    FRAGMENT_CACHE = os.getenv('FRAGMENT_CACHE', 'memory')
+    FRAGMENT_CACHE_MAX_BYTES = env_int('FRAGMENT_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+    FRAGMENT_CACHE_DIR = os.getenv('FRAGMENT_CACHE_DIR')
+    PAGINATION_COUNT_TTL = env_int('PAGINATION_COUNT_TTL', 60)
+    REFDATA_TTL = env_int('REFDATA_TTL', 300)
+    ANALYTICS_CACHE_TTL = env_int('ANALYTICS_CACHE_TTL', 300)
+    COMMENTS_PAGE_SIZE = env_int('COMMENTS_PAGE_SIZE', 20)
+    BULK_MAX_TICKETS = env_int('BULK_MAX_TICKETS', 1000)
+    API_MAX_PAGE_SIZE = env_int('API_MAX_PAGE_SIZE', 200)
+    API_MAX_BATCH = env_int('API_MAX_BATCH', 500)
+
+    # Background report/export jobs (database/job_worker.py, app/reports/jobs.py)
+    JOB_OUTPUT_DIR = os.getenv('JOB_OUTPUT_DIR')  # default: instance/jobs
+    JOB_WORKERS = env_int('JOB_WORKERS', 2)
+    JOB_REUSE_MAX_AGE = env_int('JOB_REUSE_MAX_AGE', 3600)
+    JOB_TIMEOUT = env_int('JOB_TIMEOUT', 3600)
+    JOB_KEEP_DAYS = env_int('JOB_KEEP_DAYS', 7)
+
+    # Closed tickets older than this move to the archive tables (database/archive_tickets.py)
+    ARCHIVE_AFTER_DAYS = env_int('ARCHIVE_AFTER_DAYS', 365)
+    ARCHIVE_BATCH_SIZE = env_int('ARCHIVE_BATCH_SIZE', 500)
+
+    # off | immediate | batch (see app/tickets/assignment.py)
+    AUTO_ASSIGN = os.getenv('AUTO_ASSIGN', 'off')
+    AUTO_ASSIGN_BY_CATEGORY = env_bool('AUTO_ASSIGN_BY_CATEGORY')
+    AUTO_ASSIGN_MAX_OPEN = env_int('AUTO_ASSIGN_MAX_OPEN', 0)
+    AUTO_ASSIGN_REFRESH = env_int('AUTO_ASSIGN_REFRESH', 60)
+    AUTO_ASSIGN_BATCH_SIZE = env_int('AUTO_ASSIGN_BATCH_SIZE', 1000)
+
+    # Live dashboard updates: SSE server on this port (0 = off), see app/changefeed.py
+    CHANGEFEED_PORT = env_int('CHANGEFEED_PORT', 0)
+    CHANGEFEED_HOST = os.getenv('CHANGEFEED_HOST', '127.0.0.1')
+    CHANGEFEED_URL = os.getenv('CHANGEFEED_URL')  # public stream URL when proxied
+    CHANGEFEED_HEARTBEAT = env_int('CHANGEFEED_HEARTBEAT', 15)
+    USER_CACHE_SIZE = env_int('USER_CACHE_SIZE', 4096)
+    # other processes see a role change or deactivation only after this many seconds (0 = no cache)
+    USER_CACHE_TTL = env_int('USER_CACHE_TTL', 30)
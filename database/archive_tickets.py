@@ -0,0 +1,44 @@
+# Moves tickets closed for longer than ARCHIVE_AFTER_DAYS, with their comments
+# and ratings, to the archive tables (app/tickets/archive.py). Each batch is
+# its own transaction, so the run can be interrupted and started again at any
+# time. Run it nightly from cron / Task Scheduler.
+# Usage: python database/archive_tickets.py [--days 365] [--batch-size 500] [--max-batches N] [--pause 0.5] [--dry-run]
+import argparse
+import os
+import sys
+import time
+
+# Ensure project root is on sys.path when running as a script
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app
+from app.tickets import archive
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, help='archive tickets closed more than this many days ago '
+                                                 '(default: ARCHIVE_AFTER_DAYS)')
+    parser.add_argument('--batch-size', type=int, help='tickets per transaction (default: ARCHIVE_BATCH_SIZE)')
+    parser.add_argument('--max-batches', type=int, help='stop after this many batches (default: all)')
+    parser.add_argument('--pause', type=float, default=0, help='seconds to wait between batches')
+    parser.add_argument('--dry-run', action='store_true', help='only count the tickets that would be archived')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        before = archive.cutoff(args.days)
+        if args.dry_run:
+            print(f'{archive.pending(before)} tickets closed before {before:%Y-%m-%d} would be archived')
+            return
+        start = time.perf_counter()
+        moved = archive.archive(args.days, args.batch_size, args.max_batches, args.pause,
+                                progress=lambda n: print(f'{n} tickets archived', flush=True))
+        print(f'{moved} tickets closed before {before:%Y-%m-%d} archived in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
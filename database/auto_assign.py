@@ -0,0 +1,43 @@
+# Assigns unassigned Pending tickets to the least loaded technicians (the
+# AUTO_ASSIGN=batch mode). Run it from cron / Task Scheduler, or keep it
+# running with --interval.
+# Usage: python database/auto_assign.py [--interval 60] [--limit 5000]
+import argparse
+import os
+import sys
+import time
+
+# Ensure project root is on sys.path when running as a script
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app
+from app.tickets import assignment
+
+
+def run_once(app, limit=None):
+    with app.app_context():
+        start = time.perf_counter()
+        assigned, left = assignment.assign_pending(limit)
+        elapsed = time.perf_counter() - start
+    print(f'{assigned} tickets assigned in {elapsed:.2f}s, {left} still unassigned', flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--interval', type=int, default=0, help='repeat every this many seconds (default: run once)')
+    parser.add_argument('--limit', type=int, help='assign at most this many tickets per run')
+    args = parser.parse_args()
+
+    app = create_app()
+    while True:
+        run_once(app, args.limit)
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+# Runs EXPLAIN on every query the dashboards can issue and exits non-zero if
+# any of them reads a large table without an index (a full table scan).
+# Usage: python database/explain_queries.py [-v]
+import os
+import re
+import sys
+from contextlib import contextmanager
+
+# Ensure project root is on sys.path when running as a script
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from sqlalchemy import event
+from app import create_app, db
+from app.models import Ticket, Comment, ArchivedTicket, ArchivedComment
+from app.queries import TicketFilter, ticket_listing, REQUESTER_FILTERS, TECHNICIAN_FILTERS, MANAGER_FILTERS
+from app.tickets import archive
+from app.comments import thread
+from app.utils import apply_order
+
+# Tables that grow with usage; scanning the small lookup tables is fine
+LARGE_TABLES = {'tickets', 'comments', 'ratings', 'report_logs', 'users', 'ticket_events', 'tickets_archive',
+                'comments_archive'}
+
+FILTER_CASES = [
+    {},
+    {'status': 'Pending'},
+    {'status': 'In Progress', 'category_id': '1'},
+    {'category_id': '1'},
+    {'unassigned': '1'},
+    {'q': 'printer'},
+    {'start': '2024-01-01', 'end': '2024-12-31'},
+]
+SORTS = ['created_desc', 'created_asc', 'status', 'category']
+
+VIEWS = [
+    ('requester', REQUESTER_FILTERS, Ticket, lambda: ticket_listing('status', 'technician').filter_by(requester_id=1)),
+    ('technician', TECHNICIAN_FILTERS, Ticket, lambda: ticket_listing('status').filter(Ticket.technician_id == 1)),
+    ('manager', MANAGER_FILTERS, Ticket, lambda: ticket_listing('status', 'technician')),
+    ('archive', MANAGER_FILTERS, ArchivedTicket, lambda: archive.listing('status', 'technician')),
+]
+
+
+class _Captured(Exception):
+    pass
+
+
+def dashboard_queries(per_page=10):
+    """Yield ``(label, query)`` for each distinct listing and count query."""
+    seen = set()
+    for view, allowed, model, base in VIEWS:
+        for case in FILTER_CASES:
+            if model is ArchivedTicket and case.get('q'):
+                continue  # the archive has no search index: keyword searches scan it
+            for sort in SORTS:
+                filters = TicketFilter(dict(case, sort=sort), allowed, model)
+                label = f"{view}?{filters.key()}"
+                if label in seen:
+                    continue
+                seen.add(label)
+                q, sort_keys = filters.apply(base())
+                yield label + ' [count]', q.order_by(None).with_entities(model.ticket_id)
+                yield label, (apply_order(q, sort_keys) if sort_keys else q).limit(per_page + 1)
+    # the newest page of a comment thread (older pages add a keyset condition)
+    for model in (Comment, ArchivedComment):
+        label = 'ticket_detail comments' if model is Comment else 'archived ticket_detail comments'
+        yield label, apply_order(model.query.filter_by(ticket_id=1), thread.sort_keys(model)).limit(per_page + 1)
+
+
+@contextmanager
+def explain_plans(engine, plans):
+    """Replace statements executed on ``engine`` by their EXPLAIN output."""
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        cursor.execute(prefix + statement, parameters)
+        columns = [d[0] for d in cursor.description]
+        plans.extend(dict(zip(columns, row)) for row in cursor.fetchall())
+        raise _Captured()
+
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        yield
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+
+
+def full_scans(plan, dialect):
+    """Classify what ``plan`` reads from the large tables.
+
+    Returns ``(scans, sorted_scans)``: tables read without any index, and
+    tables walked end to end through an index only to be sorted again
+    (reported, but not a failure).
+    """
+    scans, sorted_scans = [], []
+    needs_sort = any('TEMP B-TREE FOR ORDER BY' in str(step.get('detail', '')) or
+                     'filesort' in str(step.get('Extra', '')) for step in plan)
+    for step in plan:
+        if dialect == 'sqlite':
+            m = re.match(r'SCAN (\w+)(?: AS \w+)?( USING .*)?$', step.get('detail', ''))
+            table, via_index = (m.group(1), bool(m.group(2))) if m else (None, False)
+        else:
+            table = step.get('table') if step.get('type') in ('ALL', 'index') else None
+            via_index = step.get('type') == 'index'
+        if not table:
+            continue
+        table = re.sub(r'_\d+$', '', table)
+        if table not in LARGE_TABLES:
+            continue
+        if not via_index:
+            scans.append(table)
+        elif needs_sort:
+            sorted_scans.append(table)
+    return scans, sorted_scans
+
+
+def main(verbose=False):
+    app = create_app()
+    failures = 0
+    with app.app_context():
+        engine = db.engine
+        for label, query in dashboard_queries():
+            plan = []
+            with explain_plans(engine, plan):
+                try:
+                    query.all()
+                except _Captured:
+                    pass
+                except Exception as exc:
+                    if not isinstance(getattr(exc, 'orig', None), _Captured) and not isinstance(exc.__cause__, _Captured):
+                        raise
+            db.session.rollback()
+            scans, sorted_scans = full_scans(plan, engine.dialect.name)
+            if scans:
+                failures += 1
+            if scans or sorted_scans or verbose:
+                status = 'FULL SCAN' if scans else ('SORT SCAN' if sorted_scans else 'ok')
+                print(f"{status:9}  {label}  {', '.join(scans + sorted_scans)}")
+                for step in plan:
+                    print('           ', step.get('detail') or step)
+    print(f"{failures} queries with full table scans")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(verbose='-v' in sys.argv))
@@ -0,0 +1,111 @@
+# Runs queued report/export jobs (app/reports/jobs.py) on a pool of worker
+# processes. Keep it running next to the web app, or run it with --once from
+# cron / Task Scheduler to work through the queue and exit.
+# Usage: python database/job_worker.py [--workers 2] [--interval 2] [--once]
+import argparse
+import multiprocessing
+import os
+import socket
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+# Ensure project root is on sys.path when running as a script
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app
+from app.reports import jobs
+
+MAINTENANCE_INTERVAL = 60
+
+_app = None
+
+
+def _init_process():
+    global _app
+    _app = create_app()
+
+
+def _run(job_id):
+    with _app.app_context():
+        return jobs.run(job_id)
+
+
+def _fail(app, job_id, error, worker):
+    try:
+        with app.app_context():
+            jobs.fail(job_id, error, worker=worker)
+    except Exception as e:
+        # left running; requeue_stale picks it up after JOB_TIMEOUT
+        print(f'job {job_id}: could not record the failure: {e}', flush=True)
+
+
+def _pool(workers):
+    # spawn: each job process starts clean, with its own database connections
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_process)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, help='job processes (default: JOB_WORKERS)')
+    parser.add_argument('--interval', type=float, default=2, help='seconds between polls of the queue')
+    parser.add_argument('--once', action='store_true', help='exit when the queue is empty')
+    args = parser.parse_args()
+
+    app = create_app()
+    workers = args.workers or app.config.get('JOB_WORKERS', 2)
+    name = f'{socket.gethostname()}:{os.getpid()}'
+    pool = _pool(workers)
+    running = {}  # future -> job id
+    maintained = 0
+    print(f'job worker {name} with {workers} processes', flush=True)
+    try:
+        while True:
+            try:
+                with app.app_context():
+                    if time.monotonic() - maintained > MAINTENANCE_INTERVAL:
+                        requeued, pruned = jobs.requeue_stale(), jobs.prune()
+                        if requeued or pruned:
+                            print(f'{requeued} stale jobs requeued, {pruned} old outputs deleted', flush=True)
+                        maintained = time.monotonic()
+                    for job_id in jobs.claim(name, workers - len(running)):
+                        running[pool.submit(_run, job_id)] = job_id
+            except Exception as e:
+                # e.g. the database is locked or unreachable: try again next poll
+                print(f'polling the queue failed: {e}', flush=True)
+            if not running:
+                if args.once:
+                    break
+                time.sleep(args.interval)
+                continue
+            done, _ = wait(running, timeout=args.interval, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                job_id = running.pop(future)
+                try:
+                    ok = future.result()
+                except BrokenProcessPool as e:
+                    broken = True
+                    ok = False
+                    _fail(app, job_id, f'job process died: {e}', name)
+                except Exception:
+                    ok = False
+                    _fail(app, job_id, traceback.format_exc(), name)
+                print(f'job {job_id} {"done" if ok else "failed"}', flush=True)
+            if broken:
+                pool.shutdown(wait=False)
+                pool = _pool(workers)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.shutdown(wait=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+# Recomputes the report rollup tables (report_technician_daily,
+# report_category_daily) and rating aggregates (report_technician_ratings,
+# report_category_ratings) from the tickets and ratings tables and their archives.
+# Usage: python database/rebuild_rollups.py
+import os
+import sys
+
+# Ensure project root is on sys.path when running as a script
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app, db
+from app.reports import rollups
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        rollups.rebuild()
+        db.session.commit()
+        print('Report rollups rebuilt.')
@@ -58,6 +58,7 @@ CREATE TABLE comments (
     FOREIGN KEY (user_id) REFERENCES users(user_id),
     
     INDEX idx_comments_ticket_id (ticket_id),
+    INDEX idx_comments_ticket_created (ticket_id, created_at),
     INDEX idx_comments_user_id (user_id)
 );
 
@@ -69,32 +70,200 @@ CREATE TABLE ratings (
     rating_value INT NOT NULL CHECK (rating_value BETWEEN 1 AND 5),
     feedback TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- the ticket's technician and category when first rated (credited in the rating aggregates)
+    technician_id INT NULL,
+    category_id INT NULL,
     
     FOREIGN KEY (ticket_id) REFERENCES tickets(ticket_id) ON DELETE CASCADE,
+    FOREIGN KEY (technician_id) REFERENCES users(user_id),
     
     INDEX idx_ratings_ticket_id (ticket_id)
 );
 
 -- Report log table Managers generate reports
+-- Closed tickets moved out of the live tables by database/archive_tickets.py (ids kept)
+CREATE TABLE tickets_archive (
+    ticket_id INT PRIMARY KEY,
+    title VARCHAR(255) NOT NULL,
+    description TEXT NOT NULL,
+    location VARCHAR(255) NOT NULL,
+    category_id INT,
+    status_id INT,
+    requester_id INT,
+    technician_id INT,
+    created_at TIMESTAMP NULL,
+    updated_at TIMESTAMP NULL,
+    archived_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    FOREIGN KEY (category_id) REFERENCES categories(category_id),
+    FOREIGN KEY (status_id) REFERENCES ticket_status(status_id),
+    FOREIGN KEY (requester_id) REFERENCES users(user_id),
+    FOREIGN KEY (technician_id) REFERENCES users(user_id),
+
+    INDEX idx_tickets_archive_created (created_at),
+    INDEX idx_tickets_archive_requester_created (requester_id, created_at),
+    INDEX idx_tickets_archive_technician_created (technician_id, created_at),
+    INDEX idx_tickets_archive_category_created (category_id, created_at),
+    INDEX idx_tickets_archive_status_created (status_id, created_at)
+);
+
+CREATE TABLE comments_archive (
+    comment_id INT PRIMARY KEY,
+    ticket_id INT NOT NULL,
+    user_id INT NOT NULL,
+    comment_text TEXT NOT NULL,
+    created_at TIMESTAMP NULL,
+
+    FOREIGN KEY (ticket_id) REFERENCES tickets_archive(ticket_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id),
+
+    INDEX idx_comments_archive_ticket_created (ticket_id, created_at)
+);
+
+CREATE TABLE ratings_archive (
+    rating_id INT PRIMARY KEY,
+    ticket_id INT NOT NULL UNIQUE,
+    rating_value INT NOT NULL,
+    feedback TEXT,
+    created_at TIMESTAMP NULL,
+    technician_id INT NULL,
+    category_id INT NULL,
+
+    FOREIGN KEY (ticket_id) REFERENCES tickets_archive(ticket_id),
+    FOREIGN KEY (technician_id) REFERENCES users(user_id)
+);
+
+-- Background report/export jobs (database/job_worker.py)
+CREATE TABLE jobs (
+    job_id INT AUTO_INCREMENT PRIMARY KEY,
+    job_type VARCHAR(50) NOT NULL,
+    params TEXT NOT NULL,
+    cache_key VARCHAR(64) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    manager_id INT NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME NULL,
+    finished_at DATETIME NULL,
+    worker VARCHAR(100) NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    error TEXT NULL,
+    output_file VARCHAR(255) NULL,
+    duration_ms INT NULL,
+    row_count INT NULL,
+    output_size BIGINT NULL,
+
+    FOREIGN KEY (manager_id) REFERENCES users(user_id),
+
+    INDEX idx_jobs_status_id (status, job_id),
+    INDEX idx_jobs_cache_key (cache_key, status, finished_at)
+);
+
 CREATE TABLE report_logs (
     report_id INT AUTO_INCREMENT PRIMARY KEY,
     manager_id INT NOT NULL,
     report_type VARCHAR(50) NOT NULL,
     generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    job_id INT NULL,
+    duration_ms INT NULL,
+    row_count INT NULL,
+    output_size BIGINT NULL,
     
     FOREIGN KEY (manager_id) REFERENCES users(user_id),
+    FOREIGN KEY (job_id) REFERENCES jobs(job_id),
     
     INDEX idx_report_logs_manager_id (manager_id),
-    INDEX idx_report_logs_generated_at (generated_at)
+    INDEX idx_report_logs_generated_at (generated_at),
+    INDEX idx_report_logs_job_id (job_id)
+);
+
+-- Append-only history: creation, assignments and status changes
+CREATE TABLE ticket_events (
+    event_id INT AUTO_INCREMENT PRIMARY KEY,
+    ticket_id INT NOT NULL,
+    event_type VARCHAR(20) NOT NULL,
+    from_status_id INT,
+    to_status_id INT,
+    technician_id INT,
+    category_id INT,
+    actor_id INT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    -- no foreign key on ticket_id: the history stays when a ticket moves to tickets_archive
+    FOREIGN KEY (from_status_id) REFERENCES ticket_status(status_id),
+    FOREIGN KEY (to_status_id) REFERENCES ticket_status(status_id),
+    FOREIGN KEY (technician_id) REFERENCES users(user_id),
+    FOREIGN KEY (actor_id) REFERENCES users(user_id),
+
+    INDEX idx_ticket_events_ticket_type (ticket_id, event_type, to_status_id, created_at),
+    INDEX idx_ticket_events_type_status_created (event_type, to_status_id, created_at, ticket_id, technician_id, category_id)
+);
+
+-- Report rollups, bumped as tickets are created and resolved
+CREATE TABLE report_technician_daily (
+    technician_id INT NOT NULL,
+    day DATE NOT NULL,
+    resolved_count INT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (technician_id, day),
+    FOREIGN KEY (technician_id) REFERENCES users(user_id)
+);
+
+-- category_id 0 collects tickets without a category
+CREATE TABLE report_category_daily (
+    category_id INT NOT NULL,
+    day DATE NOT NULL,
+    ticket_count INT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (category_id, day)
+);
+
+-- Rating aggregates, bumped as ratings are given or changed: count, sum and
+-- sum of squares (mean, standard deviation) and a 1-5 histogram
+CREATE TABLE report_technician_ratings (
+    technician_id INT NOT NULL,
+    rating_count INT NOT NULL DEFAULT 0,
+    rating_sum INT NOT NULL DEFAULT 0,
+    rating_sum_sq INT NOT NULL DEFAULT 0,
+    rated_1 INT NOT NULL DEFAULT 0,
+    rated_2 INT NOT NULL DEFAULT 0,
+    rated_3 INT NOT NULL DEFAULT 0,
+    rated_4 INT NOT NULL DEFAULT 0,
+    rated_5 INT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (technician_id),
+    FOREIGN KEY (technician_id) REFERENCES users(user_id)
+);
+
+-- category_id 0 collects ratings of tickets without a category
+CREATE TABLE report_category_ratings (
+    category_id INT NOT NULL,
+    rating_count INT NOT NULL DEFAULT 0,
+    rating_sum INT NOT NULL DEFAULT 0,
+    rating_sum_sq INT NOT NULL DEFAULT 0,
+    rated_1 INT NOT NULL DEFAULT 0,
+    rated_2 INT NOT NULL DEFAULT 0,
+    rated_3 INT NOT NULL DEFAULT 0,
+    rated_4 INT NOT NULL DEFAULT 0,
+    rated_5 INT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (category_id)
 );
 
 -- Indexes
 CREATE INDEX idx_email ON users(email);
 CREATE INDEX idx_role ON users(role);
-CREATE INDEX idx_requester_id ON tickets(requester_id);
-CREATE INDEX idx_technician_id ON tickets(technician_id);
-CREATE INDEX idx_status_id ON tickets(status_id);
-CREATE INDEX idx_category_id ON tickets(category_id);
+-- Dashboards filter on one column and order by created_at; the composite
+-- indexes also cover the foreign key columns (leftmost prefix)
+CREATE INDEX idx_tickets_created ON tickets(created_at);
+CREATE INDEX idx_tickets_requester_created ON tickets(requester_id, created_at);
+CREATE INDEX idx_tickets_technician_status_created ON tickets(technician_id, status_id, created_at);
+CREATE INDEX idx_tickets_status_created ON tickets(status_id, created_at);
+CREATE INDEX idx_tickets_category_created ON tickets(category_id, created_at);
+-- Latest change across all tickets (ETag of the manager dashboard)
+CREATE INDEX idx_tickets_updated ON tickets(updated_at);
+
+-- Keyword search on the dashboards (MATCH ... AGAINST)
+CREATE FULLTEXT INDEX idx_tickets_fulltext ON tickets(title, description);
 
 -- Default data
 INSERT INTO ticket_status (status_name, description) VALUES
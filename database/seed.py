@@ -0,0 +1,201 @@
+# Generates a synthetic dataset for load testing: users of every role, tickets
+# spread over the last year with their event history, comments, ratings and
+# report logs, inserted in bulk batches. Report rollups are rebuilt at the end.
+# Usage: python database/seed.py --scale 100k [--seed 1] [--batch-size 5000]
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Ensure project root is on sys.path when running as a script
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from sqlalchemy import func, insert, select
+from app import create_app, db
+from app.auth import hashing
+from app.models import User, Role, Category, TicketStatus, Ticket, TicketEvent, Comment, Rating, ReportLog
+from app.reports import rollups
+from database.init_db import DEFAULT_STATUSES, DEFAULT_CATEGORIES
+
+SCALES = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+DEFAULT_PASSWORD = 'password123'
+
+# share of tickets in each status
+STATUS_WEIGHTS = {'Pending': 15, 'In Progress': 25, 'Resolved': 25, 'Closed': 35}
+STATUS_FLOW = ['In Progress', 'Resolved', 'Closed']
+
+ISSUES = ['Printer jam', 'Broken projector', 'Wifi drops', 'Leaking sink', 'No heat', 'Flickering lights',
+          'Password reset', 'Clogged drain', 'Power outlet dead', 'Slow laptop', 'AC too cold', 'Door lock stuck',
+          'Email not syncing', 'Ceiling leak', 'Monitor flicker', 'VPN access']
+PLACES = ['Library', 'Science Hall', 'Room 101', 'Room 204', 'Gym', 'Cafeteria', 'Admin Building', 'Dorm A',
+          'Dorm B', 'Lab 3', 'Parking Office', 'Art Studio']
+DETAILS = ['Started this morning.', 'Happens every few hours.', 'Affects the whole floor.',
+           'Already tried restarting.', 'Urgent, class at 2pm.', 'Reported before but came back.']
+COMMENTS = ['Looking into it.', 'Parts ordered.', 'Any update?', 'Fixed for now, monitoring.',
+            'Could not reproduce, please send details.', 'Thanks!', 'Still happening.', 'Scheduled a visit.']
+FEEDBACK = [None, 'Quick fix, thanks.', 'Took a while.', 'Great service.', 'Issue came back later.']
+
+
+def user_counts(tickets):
+    return {
+        Role.requester: max(20, tickets // 20),
+        Role.technician: max(5, tickets // 400),
+        Role.manager: max(2, tickets // 100_000),
+    }
+
+
+def ensure_reference_data():
+    if not db.session.scalar(select(func.count()).select_from(TicketStatus)):
+        db.session.execute(insert(TicketStatus), [dict(status_name=n, description=d) for n, d in DEFAULT_STATUSES])
+    if not db.session.scalar(select(func.count()).select_from(Category)):
+        db.session.execute(insert(Category), [dict(category_name=n, description=d) for n, d in DEFAULT_CATEGORIES])
+    db.session.commit()
+    statuses = dict(db.session.execute(select(TicketStatus.status_name, TicketStatus.status_id)).all())
+    categories = db.session.scalars(select(Category.category_id)).all()
+    return statuses, categories
+
+
+def next_id(column):
+    return (db.session.scalar(select(func.max(column))) or 0) + 1
+
+
+def insert_batches(model, rows, batch_size):
+    """Insert ``rows`` (an iterable of dicts) with one executemany per batch."""
+    batch, total = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(insert(model), batch)
+            db.session.commit()
+            total += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(model), batch)
+        db.session.commit()
+        total += len(batch)
+    return total
+
+
+def seed_users(rng, tickets, password, now):
+    pwhash = hashing.hash_password(password)
+    first_id = next_id(User.user_id)
+    ids = {}
+    rows = []
+    user_id = first_id
+    for role, count in user_counts(tickets).items():
+        ids[role] = list(range(user_id, user_id + count))
+        for uid in ids[role]:
+            rows.append(dict(user_id=uid, email=f'{role.value}{uid}@seed.example.com', password_hash=pwhash,
+                             role=role, first_name=role.value.title(), last_name=str(uid),
+                             created_at=now - timedelta(days=rng.randint(365, 730)), updated_at=now, is_active=True))
+        user_id += count
+    db.session.execute(insert(User), rows)
+    db.session.commit()
+    return ids
+
+
+def seed(tickets, seed_value=1, batch_size=5000, days=365, password=DEFAULT_PASSWORD):
+    """Add ``tickets`` tickets with events, proportional users, comments, ratings and report logs; returns row counts."""
+    rng = random.Random(seed_value)
+    now = datetime.utcnow().replace(microsecond=0)
+    statuses, categories = ensure_reference_data()
+    users = seed_users(rng, tickets, password, now)
+    requesters, technicians, managers = users[Role.requester], users[Role.technician], users[Role.manager]
+    # a few technicians carry most of the load, like in practice
+    tech_weights = [1 / (i + 1) for i in range(len(technicians))]
+    status_names = list(STATUS_WEIGHTS)
+    status_weights = list(STATUS_WEIGHTS.values())
+    first_ticket = next_id(Ticket.ticket_id)
+    comments, ratings, events = [], [], []
+
+    def ticket_rows():
+        for ticket_id in range(first_ticket, first_ticket + tickets):
+            created = now - timedelta(seconds=rng.randint(0, days * 86400))
+            status = rng.choices(status_names, status_weights)[0]
+            requester = rng.choice(requesters)
+            technician = None if status == 'Pending' else rng.choices(technicians, tech_weights)[0]
+            category_id = rng.choice(categories) if rng.random() > 0.05 else None
+            place = rng.choice(PLACES)
+            # event history consistent with the final status: created -> assigned (In Progress) -> Resolved -> Closed
+            event = dict(ticket_id=ticket_id, category_id=category_id, technician_id=None)
+            events.append(dict(event, event_type=TicketEvent.CREATED, from_status_id=None,
+                               to_status_id=statuses['Pending'], actor_id=requester, created_at=created))
+            updated = created
+            steps = STATUS_FLOW[:status_names.index(status)]
+            for previous, current in zip(['Pending'] + steps, steps):
+                updated = min(now, updated + timedelta(minutes=rng.randint(5, 60 * 72)))
+                actor = rng.choice(managers) if current == 'In Progress' else technician
+                if current == 'In Progress':
+                    events.append(dict(event, event_type=TicketEvent.ASSIGNED, from_status_id=None, to_status_id=None,
+                                       technician_id=technician, actor_id=actor, created_at=updated))
+                events.append(dict(event, event_type=TicketEvent.STATUS, from_status_id=statuses[previous],
+                                   to_status_id=statuses[current], technician_id=technician, actor_id=actor,
+                                   created_at=updated))
+            yield dict(ticket_id=ticket_id, title=f'{rng.choice(ISSUES)} in {place}',
+                       description=f'{rng.choice(ISSUES)}. {rng.choice(DETAILS)}', location=place,
+                       category_id=category_id, status_id=statuses[status], requester_id=requester,
+                       technician_id=technician, created_at=created, updated_at=updated)
+            for _ in range(rng.choices((0, 1, 2, 3, 4), (20, 30, 25, 15, 10))[0]):
+                author = technician if technician and rng.random() < 0.5 else requester
+                comments.append(dict(ticket_id=ticket_id, user_id=author, comment_text=rng.choice(COMMENTS),
+                                     created_at=min(now, created + timedelta(minutes=rng.randint(1, 20000)))))
+            if status in ('Resolved', 'Closed') and rng.random() < 0.7:
+                ratings.append(dict(ticket_id=ticket_id, rating_value=rng.choices((1, 2, 3, 4, 5), (5, 7, 15, 33, 40))[0],
+                                    feedback=rng.choice(FEEDBACK), created_at=updated,
+                                    technician_id=technician, category_id=category_id))
+
+    children = {'comments': (Comment, comments), 'ratings': (Rating, ratings), 'ticket_events': (TicketEvent, events)}
+    counts = dict({'users': sum(len(v) for v in users.values()), 'tickets': 0}, **{name: 0 for name in children})
+
+    def write_batch(batch):
+        # the tickets, then the rows that reference them
+        counts['tickets'] += insert_batches(Ticket, batch, batch_size)
+        for name, (model, rows) in children.items():
+            counts[name] += insert_batches(model, rows, batch_size)
+            rows.clear()
+
+    batch = []
+    for row in ticket_rows():
+        batch.append(row)
+        if len(batch) >= batch_size:
+            write_batch(batch)
+            batch = []
+    write_batch(batch)
+
+    logs = (dict(manager_id=rng.choice(managers), report_type=rng.choice(('csv', 'view')),
+                 generated_at=now - timedelta(seconds=rng.randint(0, days * 86400)))
+            for _ in range(max(10, tickets // 1000)))
+    counts['report_logs'] = insert_batches(ReportLog, logs, batch_size)
+
+    rollups.rebuild()
+    db.session.commit()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', default='1k', help='1k, 10k, 100k, 1m or a ticket count')
+    parser.add_argument('--seed', type=int, default=1, help='random seed, for repeatable datasets')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=365, help='spread ticket creation over this many days')
+    parser.add_argument('--password', default=DEFAULT_PASSWORD, help='password of every generated user')
+    args = parser.parse_args()
+    tickets = SCALES.get(args.scale.lower()) or int(args.scale)
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        counts = seed(tickets, args.seed, args.batch_size, args.days, args.password)
+        elapsed = time.perf_counter() - start
+    print(', '.join(f'{n} {name}' for name, n in counts.items()) + f' inserted in {elapsed:.1f}s')
+    print(f'All generated users log in with password {args.password!r}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+# Copies the primary SQLite database over the local stand-in replica(s) so
+# read-replica routing can be tried without a real replication setup. Run it
+# again whenever the "replica" should catch up; until then it lags behind.
+# Usage: python database/sync_sqlite_replica.py
+import os
+import sqlite3
+import sys
+
+# Ensure project root is on sys.path when running as a script
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from app import create_app, db
+from app.routing import replica_binds
+
+
+def sync(app):
+    with app.app_context():
+        primary = db.engines[None]
+        replicas = [db.engines[key] for key in replica_binds(app.config.get('DB_REPLICA_URLS') or [])]
+        if primary.dialect.name != 'sqlite' or not replicas:
+            sys.exit('DATABASE_URL and DB_REPLICA_URLS must point at SQLite files')
+        source = sqlite3.connect(primary.url.database)
+        try:
+            for replica in replicas:
+                replica.dispose()
+                target = sqlite3.connect(replica.url.database)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                print(f'{primary.url.database} -> {replica.url.database}')
+        finally:
+            source.close()
+
+
+if __name__ == '__main__':
+    sync(create_app())
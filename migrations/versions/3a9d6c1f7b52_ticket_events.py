@@ -0,0 +1,54 @@
+"""append-only ticket event log
+
+Revision ID: 3a9d6c1f7b52
+Revises: e2b7f05c9d13
+Create Date: 2026-10-18 14:20:11.402913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a9d6c1f7b52'
+down_revision = 'e2b7f05c9d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ticket_events',
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('ticket_id', sa.Integer(), nullable=False),
+        sa.Column('event_type', sa.String(length=20), nullable=False),
+        sa.Column('from_status_id', sa.Integer(), nullable=True),
+        sa.Column('to_status_id', sa.Integer(), nullable=True),
+        sa.Column('technician_id', sa.Integer(), nullable=True),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column('actor_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['actor_id'], ['users.user_id'], ),
+        sa.ForeignKeyConstraint(['from_status_id'], ['ticket_status.status_id'], ),
+        sa.ForeignKeyConstraint(['technician_id'], ['users.user_id'], ),
+        sa.ForeignKeyConstraint(['ticket_id'], ['tickets.ticket_id'], ),
+        sa.ForeignKeyConstraint(['to_status_id'], ['ticket_status.status_id'], ),
+        sa.PrimaryKeyConstraint('event_id')
+    )
+    op.create_index('idx_ticket_events_ticket_type', 'ticket_events',
+                    ['ticket_id', 'event_type', 'to_status_id', 'created_at'])
+    op.create_index('idx_ticket_events_type_status_created', 'ticket_events',
+                    ['event_type', 'to_status_id', 'created_at', 'ticket_id', 'technician_id', 'category_id'])
+
+    # Earlier status changes were not recorded; only the creation of existing tickets is known
+    op.execute("""
+        INSERT INTO ticket_events (ticket_id, event_type, to_status_id, category_id, actor_id, created_at)
+        SELECT t.ticket_id, 'created', (SELECT s.status_id FROM ticket_status s WHERE s.status_name = 'Pending'),
+               t.category_id, t.requester_id, COALESCE(t.created_at, CURRENT_TIMESTAMP)
+        FROM tickets t
+    """)
+
+
+def downgrade():
+    op.drop_index('idx_ticket_events_type_status_created', table_name='ticket_events')
+    op.drop_index('idx_ticket_events_ticket_type', table_name='ticket_events')
+    op.drop_table('ticket_events')
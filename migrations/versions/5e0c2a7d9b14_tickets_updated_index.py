@@ -0,0 +1,25 @@
+"""index on tickets.updated_at
+
+Revision ID: 5e0c2a7d9b14
+Revises: 3a9d6c1f7b52
+Create Date: 2026-10-18 16:05:42.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e0c2a7d9b14'
+down_revision = '3a9d6c1f7b52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # MAX(updated_at) over all tickets versions the manager dashboard for ETags
+    op.create_index('idx_tickets_updated', 'tickets', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('idx_tickets_updated', table_name='tickets')
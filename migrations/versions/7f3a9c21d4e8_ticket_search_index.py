@@ -0,0 +1,49 @@
+"""ticket keyword search index
+
+Revision ID: 7f3a9c21d4e8
+Revises: 543b5d388194
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7f3a9c21d4e8'
+down_revision = '543b5d388194'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # External-content FTS5 table over tickets, kept in sync by triggers
+        op.execute("CREATE VIRTUAL TABLE tickets_fts USING fts5("
+                   "title, description, content='tickets', content_rowid='ticket_id')")
+        op.execute("""CREATE TRIGGER tickets_fts_ai AFTER INSERT ON tickets BEGIN
+            INSERT INTO tickets_fts(rowid, title, description) VALUES (new.ticket_id, new.title, new.description);
+        END""")
+        op.execute("""CREATE TRIGGER tickets_fts_ad AFTER DELETE ON tickets BEGIN
+            INSERT INTO tickets_fts(tickets_fts, rowid, title, description) VALUES ('delete', old.ticket_id, old.title, old.description);
+        END""")
+        op.execute("""CREATE TRIGGER tickets_fts_au AFTER UPDATE OF title, description ON tickets BEGIN
+            INSERT INTO tickets_fts(tickets_fts, rowid, title, description) VALUES ('delete', old.ticket_id, old.title, old.description);
+            INSERT INTO tickets_fts(rowid, title, description) VALUES (new.ticket_id, new.title, new.description);
+        END""")
+        # Index tickets that already exist
+        op.execute("INSERT INTO tickets_fts(tickets_fts) VALUES ('rebuild')")
+    elif dialect == 'mysql':
+        op.create_index('idx_tickets_fulltext', 'tickets', ['title', 'description'], mysql_prefix='FULLTEXT')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS tickets_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS tickets_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS tickets_fts_ai")
+        op.execute("DROP TABLE IF EXISTS tickets_fts")
+    elif dialect == 'mysql':
+        op.drop_index('idx_tickets_fulltext', table_name='tickets')
@@ -0,0 +1,62 @@
+"""background report/export jobs
+
+Revision ID: 9c4e2f7a1d36
+Revises: 5e0c2a7d9b14
+Create Date: 2026-10-18 19:12:40.551902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e2f7a1d36'
+down_revision = '5e0c2a7d9b14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('jobs',
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('job_type', sa.String(length=50), nullable=False),
+        sa.Column('params', sa.Text(), nullable=False),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('manager_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('worker', sa.String(length=100), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('output_file', sa.String(length=255), nullable=True),
+        sa.Column('duration_ms', sa.Integer(), nullable=True),
+        sa.Column('row_count', sa.Integer(), nullable=True),
+        sa.Column('output_size', sa.BigInteger(), nullable=True),
+        sa.ForeignKeyConstraint(['manager_id'], ['users.user_id'], ),
+        sa.PrimaryKeyConstraint('job_id')
+    )
+    op.create_index('idx_jobs_status_id', 'jobs', ['status', 'job_id'])
+    op.create_index('idx_jobs_cache_key', 'jobs', ['cache_key', 'status', 'finished_at'])
+    # batch mode so SQLite can add the foreign key
+    with op.batch_alter_table('report_logs') as batch_op:
+        batch_op.add_column(sa.Column('job_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('duration_ms', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('row_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('output_size', sa.BigInteger(), nullable=True))
+        batch_op.create_foreign_key('fk_report_logs_job_id', 'jobs', ['job_id'], ['job_id'])
+        batch_op.create_index('idx_report_logs_job_id', ['job_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('report_logs') as batch_op:
+        batch_op.drop_index('idx_report_logs_job_id')
+        batch_op.drop_constraint('fk_report_logs_job_id', type_='foreignkey')
+        batch_op.drop_column('output_size')
+        batch_op.drop_column('row_count')
+        batch_op.drop_column('duration_ms')
+        batch_op.drop_column('job_id')
+    op.drop_index('idx_jobs_cache_key', table_name='jobs')
+    op.drop_index('idx_jobs_status_id', table_name='jobs')
+    op.drop_table('jobs')
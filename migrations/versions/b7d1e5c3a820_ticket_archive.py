@@ -0,0 +1,124 @@
+"""archive tables for long-closed tickets
+
+Revision ID: b7d1e5c3a820
+Revises: 9c4e2f7a1d36
+Create Date: 2026-10-18 21:03:17.204519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d1e5c3a820'
+down_revision = '9c4e2f7a1d36'
+branch_labels = None
+depends_on = None
+
+
+def _ticket_events(with_ticket_fk):
+    # ticket_events as created by 3a9d6c1f7b52, with or without the ticket
+    # foreign key, for SQLite's copy-and-rename (the foreign keys are unnamed,
+    # so they cannot be dropped one by one)
+    constraints = [
+        sa.ForeignKeyConstraint(['actor_id'], ['users.user_id'], ),
+        sa.ForeignKeyConstraint(['from_status_id'], ['ticket_status.status_id'], ),
+        sa.ForeignKeyConstraint(['technician_id'], ['users.user_id'], ),
+        sa.ForeignKeyConstraint(['to_status_id'], ['ticket_status.status_id'], ),
+    ]
+    if with_ticket_fk:
+        constraints.append(sa.ForeignKeyConstraint(['ticket_id'], ['tickets.ticket_id'], ))
+    return sa.Table('ticket_events', sa.MetaData(),
+        sa.Column('event_id', sa.Integer(), nullable=False),
+        sa.Column('ticket_id', sa.Integer(), nullable=False),
+        sa.Column('event_type', sa.String(length=20), nullable=False),
+        sa.Column('from_status_id', sa.Integer(), nullable=True),
+        sa.Column('to_status_id', sa.Integer(), nullable=True),
+        sa.Column('technician_id', sa.Integer(), nullable=True),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column('actor_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('event_id'),
+        sa.Index('idx_ticket_events_ticket_type', 'ticket_id', 'event_type', 'to_status_id', 'created_at'),
+        sa.Index('idx_ticket_events_type_status_created',
+                 'event_type', 'to_status_id', 'created_at', 'ticket_id', 'technician_id', 'category_id'),
+        *constraints
+    )
+
+
+def _set_ticket_events_fk(present):
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        with op.batch_alter_table('ticket_events', recreate='always', copy_from=_ticket_events(present)):
+            pass
+        return
+    if present:
+        op.create_foreign_key('fk_ticket_events_ticket_id', 'ticket_events', 'tickets', ['ticket_id'], ['ticket_id'])
+        return
+    for fk in sa.inspect(bind).get_foreign_keys('ticket_events'):
+        if fk['referred_table'] == 'tickets':
+            op.drop_constraint(fk['name'], 'ticket_events', type_='foreignkey')
+
+
+def upgrade():
+    op.create_table('tickets_archive',
+        sa.Column('ticket_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.Column('location', sa.String(length=255), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=True),
+        sa.Column('status_id', sa.Integer(), nullable=True),
+        sa.Column('requester_id', sa.Integer(), nullable=True),
+        sa.Column('technician_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.category_id'], ),
+        sa.ForeignKeyConstraint(['requester_id'], ['users.user_id'], ),
+        sa.ForeignKeyConstraint(['status_id'], ['ticket_status.status_id'], ),
+        sa.ForeignKeyConstraint(['technician_id'], ['users.user_id'], ),
+        sa.PrimaryKeyConstraint('ticket_id')
+    )
+    op.create_index('idx_tickets_archive_created', 'tickets_archive', ['created_at'])
+    op.create_index('idx_tickets_archive_requester_created', 'tickets_archive', ['requester_id', 'created_at'])
+    op.create_index('idx_tickets_archive_technician_created', 'tickets_archive', ['technician_id', 'created_at'])
+    op.create_index('idx_tickets_archive_category_created', 'tickets_archive', ['category_id', 'created_at'])
+    op.create_index('idx_tickets_archive_status_created', 'tickets_archive', ['status_id', 'created_at'])
+    op.create_table('comments_archive',
+        sa.Column('comment_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('ticket_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('comment_text', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['ticket_id'], ['tickets_archive.ticket_id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ),
+        sa.PrimaryKeyConstraint('comment_id')
+    )
+    op.create_index('idx_comments_archive_ticket_created', 'comments_archive', ['ticket_id', 'created_at'])
+    op.create_table('ratings_archive',
+        sa.Column('rating_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('ticket_id', sa.Integer(), nullable=False),
+        sa.Column('rating_value', sa.Integer(), nullable=False),
+        sa.Column('feedback', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['ticket_id'], ['tickets_archive.ticket_id'], ),
+        sa.PrimaryKeyConstraint('rating_id'),
+        sa.UniqueConstraint('ticket_id')
+    )
+    # the history stays in ticket_events when a ticket moves to the archive
+    _set_ticket_events_fk(present=False)
+
+
+def downgrade():
+    # archived tickets are lost on downgrade; their events would then point nowhere
+    op.execute('DELETE FROM ticket_events WHERE ticket_id NOT IN (SELECT ticket_id FROM tickets)')
+    _set_ticket_events_fk(present=True)
+    op.drop_table('ratings_archive')
+    op.drop_index('idx_comments_archive_ticket_created', table_name='comments_archive')
+    op.drop_table('comments_archive')
+    op.drop_index('idx_tickets_archive_status_created', table_name='tickets_archive')
+    op.drop_index('idx_tickets_archive_category_created', table_name='tickets_archive')
+    op.drop_index('idx_tickets_archive_technician_created', table_name='tickets_archive')
+    op.drop_index('idx_tickets_archive_requester_created', table_name='tickets_archive')
+    op.drop_index('idx_tickets_archive_created', table_name='tickets_archive')
+    op.drop_table('tickets_archive')
@@ -0,0 +1,39 @@
+"""composite indexes for dashboard access paths
+
+Revision ID: c4d81e6b2a90
+Revises: 7f3a9c21d4e8
+Create Date: 2026-10-18 10:41:07.552391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d81e6b2a90'
+down_revision = '7f3a9c21d4e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Each dashboard filters on one column and orders by created_at, so the
+    # index delivers rows already in order instead of sorting afterwards
+    op.create_index('idx_tickets_created', 'tickets', ['created_at'])
+    op.create_index('idx_tickets_requester_created', 'tickets', ['requester_id', 'created_at'])
+    op.create_index('idx_tickets_technician_status_created', 'tickets', ['technician_id', 'status_id', 'created_at'])
+    op.create_index('idx_tickets_status_created', 'tickets', ['status_id', 'created_at'])
+    op.create_index('idx_tickets_category_created', 'tickets', ['category_id', 'created_at'])
+    # Ticket detail loads a ticket's comments in created_at order
+    op.create_index('idx_comments_ticket_id', 'comments', ['ticket_id'])
+    op.create_index('idx_comments_ticket_created', 'comments', ['ticket_id', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('idx_comments_ticket_created', table_name='comments')
+    op.drop_index('idx_comments_ticket_id', table_name='comments')
+    op.drop_index('idx_tickets_category_created', table_name='tickets')
+    op.drop_index('idx_tickets_status_created', table_name='tickets')
+    op.drop_index('idx_tickets_technician_status_created', table_name='tickets')
+    op.drop_index('idx_tickets_requester_created', table_name='tickets')
+    op.drop_index('idx_tickets_created', table_name='tickets')
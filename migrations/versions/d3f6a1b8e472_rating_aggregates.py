@@ -0,0 +1,70 @@
+"""rating aggregates per technician and category
+
+Revision ID: d3f6a1b8e472
+Revises: b7d1e5c3a820
+Create Date: 2026-10-18 23:41:06.530918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f6a1b8e472'
+down_revision = 'b7d1e5c3a820'
+branch_labels = None
+depends_on = None
+
+STATS_COLUMNS = ['rating_count', 'rating_sum', 'rating_sum_sq', 'rated_1', 'rated_2', 'rated_3', 'rated_4', 'rated_5']
+
+# Ratings with their ticket, live and archived (a ticket and its rating are archived together)
+RATED = """
+    (SELECT ticket_id, rating_value FROM ratings
+     UNION ALL SELECT ticket_id, rating_value FROM ratings_archive) r
+    JOIN (SELECT ticket_id, technician_id, category_id FROM tickets
+          UNION ALL SELECT ticket_id, technician_id, category_id FROM tickets_archive) t
+      ON t.ticket_id = r.ticket_id
+"""
+
+AGGREGATES = """
+    COUNT(*), SUM(r.rating_value), SUM(r.rating_value * r.rating_value),
+    SUM(CASE WHEN r.rating_value = 1 THEN 1 ELSE 0 END), SUM(CASE WHEN r.rating_value = 2 THEN 1 ELSE 0 END),
+    SUM(CASE WHEN r.rating_value = 3 THEN 1 ELSE 0 END), SUM(CASE WHEN r.rating_value = 4 THEN 1 ELSE 0 END),
+    SUM(CASE WHEN r.rating_value = 5 THEN 1 ELSE 0 END)
+"""
+
+
+def _stats_columns():
+    return [sa.Column(name, sa.Integer(), nullable=False) for name in STATS_COLUMNS]
+
+
+def upgrade():
+    op.create_table('report_technician_ratings',
+        sa.Column('technician_id', sa.Integer(), nullable=False),
+        *_stats_columns(),
+        sa.ForeignKeyConstraint(['technician_id'], ['users.user_id'], ),
+        sa.PrimaryKeyConstraint('technician_id')
+    )
+    op.create_table('report_category_ratings',
+        sa.Column('category_id', sa.Integer(), autoincrement=False, nullable=False),
+        *_stats_columns(),
+        sa.PrimaryKeyConstraint('category_id')
+    )
+
+    # Backfill from existing ratings (same logic as app.reports.rollups.rebuild)
+    columns = ', '.join(STATS_COLUMNS)
+    op.execute(f"""
+        INSERT INTO report_category_ratings (category_id, {columns})
+        SELECT COALESCE(t.category_id, 0), {AGGREGATES}
+        FROM {RATED} GROUP BY COALESCE(t.category_id, 0)
+    """)
+    op.execute(f"""
+        INSERT INTO report_technician_ratings (technician_id, {columns})
+        SELECT t.technician_id, {AGGREGATES}
+        FROM {RATED} WHERE t.technician_id IS NOT NULL GROUP BY t.technician_id
+    """)
+
+
+def downgrade():
+    op.drop_table('report_category_ratings')
+    op.drop_table('report_technician_ratings')
@@ -0,0 +1,51 @@
+"""daily report rollup tables
+
+Revision ID: e2b7f05c9d13
+Revises: c4d81e6b2a90
+Create Date: 2026-10-18 12:05:52.817730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7f05c9d13'
+down_revision = 'c4d81e6b2a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('report_technician_daily',
+        sa.Column('technician_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('resolved_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['technician_id'], ['users.user_id'], ),
+        sa.PrimaryKeyConstraint('technician_id', 'day')
+    )
+    op.create_table('report_category_daily',
+        sa.Column('category_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('ticket_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('category_id', 'day')
+    )
+
+    # Backfill from existing tickets (same logic as app.reports.rollups.rebuild)
+    op.execute("""
+        INSERT INTO report_category_daily (category_id, day, ticket_count)
+        SELECT COALESCE(category_id, 0), DATE(created_at), COUNT(*)
+        FROM tickets GROUP BY COALESCE(category_id, 0), DATE(created_at)
+    """)
+    op.execute("""
+        INSERT INTO report_technician_daily (technician_id, day, resolved_count)
+        SELECT t.technician_id, DATE(t.updated_at), COUNT(*)
+        FROM tickets t JOIN ticket_status s ON s.status_id = t.status_id
+        WHERE s.status_name IN ('Resolved', 'Closed') AND t.technician_id IS NOT NULL
+        GROUP BY t.technician_id, DATE(t.updated_at)
+    """)
+
+
+def downgrade():
+    op.drop_table('report_category_daily')
+    op.drop_table('report_technician_daily')
@@ -0,0 +1,70 @@
+"""technician and category credited with each rating
+
+Revision ID: f1a7c3e9b254
+Revises: d3f6a1b8e472
+Create Date: 2026-10-19 10:12:44.381206
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a7c3e9b254'
+down_revision = 'd3f6a1b8e472'
+branch_labels = None
+depends_on = None
+
+# (ratings table, its tickets table)
+TABLES = (('ratings', 'tickets'), ('ratings_archive', 'tickets_archive'))
+
+STATS_COLUMNS = ['rating_count', 'rating_sum', 'rating_sum_sq', 'rated_1', 'rated_2', 'rated_3', 'rated_4', 'rated_5']
+
+RATINGS = """
+    (SELECT technician_id, category_id, rating_value FROM ratings
+     UNION ALL SELECT technician_id, category_id, rating_value FROM ratings_archive) r
+"""
+
+AGGREGATES = """
+    COUNT(*), SUM(r.rating_value), SUM(r.rating_value * r.rating_value),
+    SUM(CASE WHEN r.rating_value = 1 THEN 1 ELSE 0 END), SUM(CASE WHEN r.rating_value = 2 THEN 1 ELSE 0 END),
+    SUM(CASE WHEN r.rating_value = 3 THEN 1 ELSE 0 END), SUM(CASE WHEN r.rating_value = 4 THEN 1 ELSE 0 END),
+    SUM(CASE WHEN r.rating_value = 5 THEN 1 ELSE 0 END)
+"""
+
+
+def upgrade():
+    for ratings, tickets in TABLES:
+        with op.batch_alter_table(ratings) as batch_op:
+            batch_op.add_column(sa.Column('technician_id', sa.Integer(), nullable=True))
+            batch_op.add_column(sa.Column('category_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key(f'fk_{ratings}_technician_id', 'users', ['technician_id'], ['user_id'])
+        # existing ratings are credited to their ticket's current technician and category
+        op.execute(f"""
+            UPDATE {ratings} SET
+                technician_id = (SELECT t.technician_id FROM {tickets} t WHERE t.ticket_id = {ratings}.ticket_id),
+                category_id = (SELECT t.category_id FROM {tickets} t WHERE t.ticket_id = {ratings}.ticket_id)
+        """)
+
+    # Recount the aggregates from the stored credit (same logic as app.reports.rollups.rebuild)
+    columns = ', '.join(STATS_COLUMNS)
+    op.execute('DELETE FROM report_category_ratings')
+    op.execute('DELETE FROM report_technician_ratings')
+    op.execute(f"""
+        INSERT INTO report_category_ratings (category_id, {columns})
+        SELECT COALESCE(r.category_id, 0), {AGGREGATES}
+        FROM {RATINGS} GROUP BY COALESCE(r.category_id, 0)
+    """)
+    op.execute(f"""
+        INSERT INTO report_technician_ratings (technician_id, {columns})
+        SELECT r.technician_id, {AGGREGATES}
+        FROM {RATINGS} WHERE r.technician_id IS NOT NULL GROUP BY r.technician_id
+    """)
+
+
+def downgrade():
+    for ratings, _tickets in TABLES:
+        with op.batch_alter_table(ratings) as batch_op:
+            batch_op.drop_constraint(f'fk_{ratings}_technician_id', type_='foreignkey')
+            batch_op.drop_column('category_id')
+            batch_op.drop_column('technician_id')